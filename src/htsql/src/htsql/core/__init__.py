@@ -5,8 +5,8 @@
 
 from . import (adapter, addon, application, cache, cmd, connect, context,
         domain, entity, error, introspect, split_sql, syn, tr, util, validator,
-        wsgi)
-from .validator import DBVal, StrVal, BoolVal, UIntVal
+        warmup, wsgi)
+from .validator import DBVal, StrVal, BoolVal, UIntVal, PIntVal
 from .addon import Addon, Parameter, Variable, addon_registry
 from .connect import connect
 from .error import Error
@@ -41,7 +41,21 @@ class HTSQLAddon(Addon):
     the password given as a part of `db` parameter.
 
     The parameter `query_cache_size` specifies the number of cached
-    query plans.  The default value is 1024.
+    query plans and the number of cached parsed queries.  The default
+    value is 1024.
+
+    The parameter `stream_size`, if set, makes the HTTP service fetch
+    flat query results incrementally, the given number of rows at a time,
+    and render the output while the rows are being fetched.
+
+    The parameter `warm_up`, if set, makes the application build
+    adapter realizations on startup rather than on first use.
+
+    The parameter `realization_index` specifies a file where the
+    application saves, on exit, the list of realizations it has built.
+    On startup, these realizations are built eagerly.  When the
+    application is created before the server forks worker processes,
+    the workers share the prebuilt realizations.
 
     The parameter `debug`, if set to `True`, enables debug output.
     """
@@ -55,6 +69,14 @@ class HTSQLAddon(Addon):
             Parameter('query_cache_size', UIntVal(), default=1024,
                       value_name="""size""",
                       hint="""max size of the query cache"""),
+            Parameter('stream_size', PIntVal(is_nullable=True), default=None,
+                      value_name="""size""",
+                      hint="""fetch query results incrementally"""),
+            Parameter('warm_up', BoolVal(), default=False,
+                      hint="""build realizations on startup"""),
+            Parameter('realization_index', StrVal(),
+                      value_name="""file""",
+                      hint="""list of realizations to build on startup"""),
             Parameter('debug', BoolVal(), default=False,
                       hint="""dump debug information""")
     ]
@@ -85,6 +107,12 @@ class HTSQLAddon(Addon):
             introspect()
         except Error as exc:
             raise ValueError("failed to introspect the database: %s" % exc)
+        if self.realization_index is not None:
+            warmup.warm_up(
+                    warmup.load_realization_index(self.realization_index))
+            warmup.register_realization_index(self.realization_index)
+        if self.warm_up:
+            warmup.warm_up(warmup.guess_realizations())
 
 
 class EngineAddon(Addon):
@@ -4,6 +4,7 @@
 
 
 from ..adapter import Adapter, adapt
+from ..context import context
 from ..error import Error, act_guard
 from ..util import Clonable
 from .command import Command, UniversalCmd, DefaultCmd, FormatCmd, FetchCmd
@@ -25,18 +26,21 @@ class Action(Clonable):
 
 class ProduceAction(Action):
 
-    def __init__(self, environment=None, batch=None):
+    def __init__(self, environment=None, batch=None, stream=None):
         self.environment = environment
         self.batch = batch
+        self.stream = stream
 
 
 class SafeProduceAction(ProduceAction):
 
-    def __init__(self, environment=None, cut=None, offset=None, batch=None):
+    def __init__(self, environment=None, cut=None, offset=None, batch=None,
+                 stream=None):
         self.environment = environment
         self.cut = cut
         self.offset = offset
         self.batch = batch
+        self.stream = stream
 
 
 class AnalyzeAction(Action):
@@ -88,7 +92,7 @@ class RenderFormat(Act):
 
     def __call__(self):
         format = self.command.format
-        product = produce(self.command.feed)
+        product = render_produce(self.command.feed)
         status = "200 OK"
         headers = emit_headers(format, product)
         body = emit(format, product)
@@ -105,7 +109,7 @@ class RenderProducer(Act):
 
     def __call__(self):
         format = accept(self.action.environ)
-        product = produce(self.command)
+        product = render_produce(self.command)
         status = "200 OK"
         headers = emit_headers(format, product)
         body = emit(format, product)
@@ -127,6 +131,19 @@ def produce(command, environment=None, **parameters):
     return act(command, action)
 
 
+def stream_produce(command, size, environment=None, **parameters):
+    environment = embed(environment, **parameters)
+    action = ProduceAction(environment, stream=size)
+    return act(command, action)
+
+
+def render_produce(command, environment=None, **parameters):
+    size = context.app.htsql.stream_size
+    if size:
+        return stream_produce(command, size, environment, **parameters)
+    return produce(command, environment, **parameters)
+
+
 def safe_produce(command, cut, offset=None, environment=None, **parameters):
     environment = embed(environment, **parameters)
     action = SafeProduceAction(environment, cut, offset)
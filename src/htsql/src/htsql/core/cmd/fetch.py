@@ -23,8 +23,10 @@ class ProduceFetch(Act):
             limit = self.action.cut
             offset = self.action.offset
         batch = self.action.batch
+        stream = self.action.stream
         pipe = translate(self.command.syntax, self.action.environment,
-                         limit=limit, offset=offset, batch=batch)
+                         limit=limit, offset=offset, batch=batch,
+                         stream=stream)
         output = pipe()(None)
         return output
 
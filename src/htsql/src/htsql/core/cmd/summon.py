@@ -7,8 +7,10 @@ from ..adapter import Adapter, Protocol, adapt, call
 from ..error import Error, recognize_guard, point, MarkRef
 from ..util import to_name
 from ..syn.syntax import (Syntax, SkipSyntax, FunctionSyntax, PipeSyntax,
-        ApplySyntax, CollectSyntax)
+        ApplySyntax, CollectSyntax, IdentifierSyntax)
 from ..syn.parse import parse
+from ..introspect import introspect
+from ..tr.translate import cache_command, get_cached_command
 from ..fmt.format import (TextFormat, HTMLFormat, RawFormat, JSONFormat,
         CSVFormat, TSVFormat, XMLFormat)
 from .command import SkipCmd, FetchCmd, FormatCmd, SQLCmd, DefaultCmd
@@ -124,13 +126,30 @@ class SummonHTML(SummonFormat):
     format = HTMLFormat
 
 
-class SummonRaw(SummonFormat):
+class SummonCompactFormat(SummonFormat):
+    # Accepts an optional `compact` flag: `/query/:json(compact)`.
+
+    def __call__(self):
+        if len(self.arguments) != 2:
+            return super(SummonCompactFormat, self).__call__()
+        [syntax, flag] = self.arguments
+        if not (isinstance(flag, IdentifierSyntax) and
+                flag.name == 'compact'):
+            with recognize_guard(flag):
+                raise Error("Expected flag 'compact'")
+        feed = recognize(syntax)
+        format = self.format()
+        format.compact = True
+        return FormatCmd(feed, format)
+
+
+class SummonRaw(SummonCompactFormat):
 
     call('raw')
     format = RawFormat
 
 
-class SummonJSON(SummonFormat):
+class SummonJSON(SummonCompactFormat):
 
     call('json')
     format = JSONFormat
@@ -168,7 +187,18 @@ class SummonSQL(Summon):
 
 def recognize(syntax):
     assert isinstance(syntax, (Syntax, str))
+    # Commands recognized from the query text are cached by the text, so
+    # that a repeated query is not parsed again; the entry is valid only as
+    # long as the catalog it was recognized against.
+    text = None
     if not isinstance(syntax, Syntax):
+        text = syntax
+        catalog = introspect()
+        cached = get_cached_command(text)
+        if cached is not None:
+            command_catalog, command = cached
+            if command_catalog is catalog:
+                return command
         syntax = parse(syntax)
     command = Recognize.__invoke__(syntax)
     if command is None:
@@ -176,6 +206,8 @@ def recognize(syntax):
         mark = MarkRef.get_mark(syntax)
         if mark is not None:
             point(command, mark.clone(end=mark.start))
+    if text is not None:
+        cache_command(text, (catalog, command))
     return command
 
 
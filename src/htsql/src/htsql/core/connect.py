@@ -353,6 +353,28 @@ class UnscrambleError(Utility):
         return None
 
 
+class StreamCursor(Utility):
+    """
+    Opens a cursor for fetching a large result set incrementally.
+
+    `connection` (:class:`ConnectionProxy`)
+        An open database connection.
+
+    `size` (an integer)
+        The number of rows to fetch from the server in one round trip.
+
+    The default implementation returns a regular cursor; backends that
+    support server-side cursors should override it.
+    """
+
+    def __init__(self, connection, size):
+        self.connection = connection
+        self.size = size
+
+    def __call__(self):
+        return self.connection.cursor()
+
+
 class Transact(Utility):
 
     def __call__(self):
@@ -389,6 +411,7 @@ class TransactionGuard:
 
 
 connect = Connect.__invoke__
+stream_cursor = StreamCursor.__invoke__
 scramble = Scramble.__invoke__
 unscramble = Unscramble.__invoke__
 unscramble_error = UnscrambleError.__invoke__
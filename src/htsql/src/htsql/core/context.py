@@ -17,6 +17,7 @@ This module exports one global variable:
 
 
 import threading
+import copy
 
 
 class ThreadContext(threading.local):
@@ -61,3 +62,48 @@ class ThreadContext(threading.local):
 context = ThreadContext()
 
 
+class ContextGuard:
+    """
+    Reactivates the application after it was deactivated.
+
+    Use it to consume generators that outlive the request in which they
+    were created.
+
+    `app`
+        The application to activate.
+
+    `env`
+        The environment to activate.  The guard keeps a copy of it, so
+        that the environment is not affected by updates the caller
+        reverts when the request ends.  The active connection is not
+        kept: it belongs to the caller's transaction, which is usually
+        committed and released by the time the generator is consumed.
+    """
+
+    def __init__(self, app, env):
+        self.app = app
+        self.env = copy.copy(env)
+        self.env.updates_stack = []
+        if hasattr(self.env, 'connection'):
+            self.env.connection = None
+
+    def __enter__(self):
+        context.push(self.app, self.env)
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        context.pop(self.app)
+
+    def iterate(self, iterator):
+        """
+        Consumes the iterator with the application activated.
+        """
+        iterator = iter(iterator)
+        while True:
+            with self:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+
@@ -76,16 +76,24 @@ class AcceptText(Accept):
 
 def accept(environ):
     content_type = ""
+    parameters = {}
     if 'HTTP_ACCEPT' in environ:
         content_types = environ['HTTP_ACCEPT'].split(',')
         if len(content_types) == 1:
             [content_type] = content_types
             if ';' in content_type:
-                content_type = content_type.split(';', 1)[0]
+                content_type, tail = content_type.split(';', 1)
                 content_type = content_type.strip()
+                for parameter in tail.split(';'):
+                    name, value = (parameter.split('=', 1)+[""])[:2]
+                    parameters[name.strip().lower()] = value.strip().lower()
         else:
             content_type = "*/*"
     format = Accept.__invoke__(content_type)
+    # `x-htsql/json; compact` requests JSON output with no whitespace.
+    if isinstance(format, (RawFormat, JSONFormat)) and \
+            parameters.get('compact') not in (None, '0', 'false', 'no'):
+        format.compact = True
     return ProxyFormat(format)
 
 
@@ -4,6 +4,7 @@
 
 
 from ..adapter import Adapter, adapt
+from ..context import context, ContextGuard
 from .format import Format, DefaultFormat, TextFormat, ProxyFormat
 from .accept import Accept
 import itertools
@@ -90,6 +91,9 @@ def emit(format, product):
     for chunk in tail:
         head.append(chunk)
         break
-    return itertools.chain(head, tail)
+    # The rest of the output is usually consumed after the application
+    # is deactivated, so we need to reactivate it for every chunk.
+    guard = ContextGuard(context.app, context.env)
+    return itertools.chain(head, guard.iterate(tail))
 
 
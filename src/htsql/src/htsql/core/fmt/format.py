@@ -18,14 +18,16 @@ class DefaultFormat(Format):
 
 class RawFormat(Format):
 
-    def __init__(self, with_null=False):
+    def __init__(self, with_null=False, compact=False):
         self.with_null = with_null
+        self.compact = compact
 
 
 class JSONFormat(Format):
 
-    def __init__(self, with_null=False):
+    def __init__(self, with_null=False, compact=False):
         self.with_null = with_null
+        self.compact = compact
 
 
 class CSVFormat(Format):
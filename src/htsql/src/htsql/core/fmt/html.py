@@ -326,23 +326,30 @@ class EmitHTML(Emit):
     adapt(HTMLFormat)
 
     def __call__(self):
+        data = self.data
+        if (isinstance(self.meta.domain, ListDomain) and
+                data is not None and not isinstance(data, list)):
+            # The height of the table is calculated in a separate pass
+            # over the rows, so a streamed output must be fetched in full.
+            data = list(data)
         product_to_html = profile_to_html(self.meta)
         headers_height = product_to_html.headers_height()
-        cells_height = product_to_html.cells_height(self.data)
+        cells_height = product_to_html.cells_height(data)
         if self.meta.header:
             title = html.escape(self.meta.header, True)
         else:
             title = ""
         content = None
         if headers_height or cells_height:
-            content = self.table(product_to_html,
+            content = self.table(product_to_html, data,
                                  headers_height, cells_height, title)
         stream = pkg_resources.resource_stream(__name__,
                                                "static/template.html")
         template = Template(stream)
         return template(title=title, content=content)
 
-    def table(self, product_to_html, headers_height, cells_height, title):
+    def table(self, product_to_html, data,
+              headers_height, cells_height, title):
         yield "<table class=\"htsql-output\" summary=\"%s\">\n" % title
         if headers_height > 0:
             yield "<thead>\n"
@@ -364,7 +371,7 @@ class EmitHTML(Emit):
         if cells_height > 0:
             yield "<tbody>\n"
             index = 0
-            for row in product_to_html.cells(self.data, cells_height):
+            for row in product_to_html.cells(data, cells_height):
                 line = []
                 for content, colspan, rowspan, classes in row:
                     attributes = []
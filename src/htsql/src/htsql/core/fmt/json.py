@@ -39,6 +39,18 @@ JS_END = JSIndicator("$")
 JS_DONE = JSIndicator("!")
 
 
+class JSFragment(Printable):
+    # A serialized JSON value or a sequence of comma-separated values.
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
 def purge_null_keys(iterator):
     states = []
     context = None
@@ -153,6 +165,109 @@ def dump_json(iterator):
             break
 
 
+def dump_json_scalar(token):
+    # Serializes a scalar token.
+    if token is None:
+        return "null"
+    elif token is True:
+        return "true"
+    elif token is False:
+        return "false"
+    elif isinstance(token, str):
+        return "\"%s\"" % escape_json(token)
+    elif isinstance(token, int):
+        return str(token)
+    elif isinstance(token, float):
+        if math.isinf(token) or math.isnan(token):
+            return "null"
+        return str(token)
+    elif isinstance(token, decimal.Decimal):
+        if not token.is_finite():
+            return "null"
+        return str(token)
+    assert False, repr(token)
+
+
+def dump_compact_json(iterator, size=65536):
+    # Serializes a stream of tokens with no whitespace; yields chunks
+    # of at least `size` characters.
+    states = []
+    context = None
+    count = 0
+    is_key = False
+    chunks = []
+    length = 0
+    for token in iterator:
+        if token is JS_END:
+            chunk = "]" if context is JS_SEQ else "}"
+            context, count = states.pop()
+            is_key = (context is JS_MAP)
+        elif is_key:
+            assert isinstance(token, str), repr(token)
+            chunk = "\"%s\":" % escape_json(token)
+            if count:
+                chunk = ","+chunk
+            count += 1
+            is_key = False
+        else:
+            prefix = ""
+            if context is JS_SEQ:
+                if count:
+                    prefix = ","
+                count += 1
+            if token is JS_SEQ or token is JS_MAP:
+                chunk = prefix+("[" if token is JS_SEQ else "{")
+                states.append((context, count))
+                context = token
+                count = 0
+                is_key = (token is JS_MAP)
+            else:
+                if isinstance(token, JSFragment):
+                    chunk = prefix+token.text
+                else:
+                    chunk = prefix+dump_json_scalar(token)
+                is_key = (context is JS_MAP)
+        chunks.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(chunks)
+            chunks = []
+            length = 0
+    assert context is None and not states
+    chunks.append("\n")
+    yield "".join(chunks)
+
+
+def compact(domain, dumper, with_null, size=1000):
+    # Makes a function that produces a value of the given domain as
+    # a stream of serialized fragments; a list is dumped in batches of
+    # `size` items.
+    if isinstance(domain, ListDomain):
+        dump_item = dumper(domain.item_domain, with_null)
+        def scatter(value):
+            if value is None:
+                yield None
+                return
+            yield JS_SEQ
+            batch = []
+            for item in value:
+                batch.append(dump_item(item))
+                if len(batch) >= size:
+                    yield JSFragment(",".join(batch))
+                    batch = []
+            if batch:
+                yield JSFragment(",".join(batch))
+            yield JS_END
+    else:
+        dump = dumper(domain, with_null)
+        def scatter(value):
+            if value is None:
+                yield None
+            else:
+                yield JSFragment(dump(value))
+    return scatter
+
+
 class EmitJSONHeaders(EmitHeaders):
 
     adapt_many(JSONFormat,
@@ -180,11 +295,18 @@ class EmitRaw(Emit):
         tokens = self.emit()
         if not self.format.with_null:
             tokens = purge_null_keys(tokens)
+        if self.format.compact:
+            return dump_compact_json(tokens)
         return dump_json(tokens)
 
+    def to_raw(self, domain):
+        if self.format.compact:
+            return compact(domain, raw_dumper, self.format.with_null)
+        return to_raw(domain)
+
     def emit(self):
         meta = list(profile_to_raw(self.meta))
-        data = to_raw(self.meta.domain)(self.data)
+        data = self.to_raw(self.meta.domain)(self.data)
         yield JS_MAP
         yield "meta"
         for token in meta:
@@ -203,10 +325,17 @@ class EmitJSON(Emit):
         tokens = self.emit()
         if not self.format.with_null:
             tokens = purge_null_keys(tokens)
+        if self.format.compact:
+            return dump_compact_json(tokens)
         return dump_json(tokens)
 
+    def to_json(self, domain):
+        if self.format.compact:
+            return compact(domain, json_dumper, self.format.with_null)
+        return to_json(domain)
+
     def emit(self):
-        product_to_json = to_json(self.meta.domain)
+        product_to_json = self.to_json(self.meta.domain)
         if self.meta.tag:
             key = self.meta.tag
         else:
@@ -235,6 +364,24 @@ class ToRaw(Adapter):
         else:
             yield self.domain.dump(value)
 
+    def dumper(self, with_null):
+        # Returns a function that serializes a value to compact JSON.
+        # Implementations overriding `scatter()` get a generic dumper.
+        scatter = self.scatter
+        def dump(value):
+            tokens = scatter(value)
+            if not with_null:
+                tokens = purge_null_keys(tokens)
+            return "".join(dump_compact_json(tokens))[:-1]
+        if type(self).scatter is not ToRaw.scatter:
+            return dump
+        domain_dump = self.domain.dump
+        def dump(value):
+            if value is None:
+                return "null"
+            return "\"%s\"" % escape_json(domain_dump(value))
+        return dump
+
 
 class RecordToRaw(ToRaw):
 
@@ -255,6 +402,16 @@ class RecordToRaw(ToRaw):
                     yield token
             yield JS_END
 
+    def dumper(self, with_null):
+        dumps = [raw_dumper(field.domain, with_null)
+                 for field in self.domain.fields]
+        def dump(value):
+            if value is None:
+                return "null"
+            return "[%s]" % ",".join([dump(item)
+                                      for item, dump in zip(value, dumps)])
+        return dump
+
 
 class ListToRaw(ToRaw):
 
@@ -275,6 +432,14 @@ class ListToRaw(ToRaw):
                     yield token
             yield JS_END
 
+    def dumper(self, with_null):
+        dump_item = raw_dumper(self.domain.item_domain, with_null)
+        def dump(value):
+            if value is None:
+                return "null"
+            return "[%s]" % ",".join(map(dump_item, value))
+        return dump
+
 
 class NativeToRaw(ToRaw):
 
@@ -288,6 +453,21 @@ class NativeToRaw(ToRaw):
     def scatter(value):
         yield value
 
+    def dumper(self, with_null):
+        if isinstance(self.domain, BooleanDomain):
+            def dump(value):
+                if value is None:
+                    return "null"
+                return "true" if value else "false"
+            return dump
+        if isinstance(self.domain, (TextDomain, EnumDomain)):
+            def dump(value):
+                if value is None:
+                    return "null"
+                return "\"%s\"" % escape_json(value)
+            return dump
+        return dump_json_scalar
+
 
 class NativeStringToRaw(ToRaw):
 
@@ -301,6 +481,13 @@ class NativeStringToRaw(ToRaw):
         else:
             yield str(value)
 
+    def dumper(self, with_null):
+        def dump(value):
+            if value is None:
+                return "null"
+            return "\"%s\"" % escape_json(str(value))
+        return dump
+
 
 class DateTimeToRaw(ToRaw):
 
@@ -315,6 +502,16 @@ class DateTimeToRaw(ToRaw):
         else:
             yield str(value)
 
+    def dumper(self, with_null):
+        def dump(value):
+            if value is None:
+                return "null"
+            elif not value.time():
+                return "\"%s\"" % value.date()
+            else:
+                return "\"%s\"" % value
+        return dump
+
 
 class OpaqueToRaw(ToRaw):
 
@@ -327,6 +524,13 @@ class OpaqueToRaw(ToRaw):
             return
         yield str(value)
 
+    def dumper(self, with_null):
+        def dump(value):
+            if value is None:
+                return "null"
+            return "\"%s\"" % escape_json(str(value))
+        return dump
+
 
 class MetaToRaw(Protocol):
 
@@ -486,6 +690,10 @@ class ToJSON(Adapter):
     def __call__(self):
         return to_raw(self.domain)
 
+    def dumper(self, with_null):
+        # Returns a function that serializes a value to compact JSON.
+        return raw_dumper(self.domain, with_null)
+
 
 class RecordToJSON(ToJSON):
 
@@ -520,6 +728,21 @@ class RecordToJSON(ToJSON):
                     yield token
             yield JS_END
 
+    def dumper(self, with_null):
+        dumps = [(json_dumper(field.domain, with_null),
+                  "\"%s\":" % escape_json(key))
+                 for field, key in zip(self.domain.fields, self.field_keys)]
+        def dump(value):
+            if value is None:
+                return "null"
+            chunks = []
+            for item, (dump, key) in zip(value, dumps):
+                if item is None and not with_null:
+                    continue
+                chunks.append(key+dump(item))
+            return "{%s}" % ",".join(chunks)
+        return dump
+
 
 class ListToJSON(ToJSON):
 
@@ -543,6 +766,14 @@ class ListToJSON(ToJSON):
                     yield token
             yield JS_END
 
+    def dumper(self, with_null):
+        dump_item = json_dumper(self.domain.item_domain, with_null)
+        def dump(value):
+            if value is None:
+                return "null"
+            return "[%s]" % ",".join(map(dump_item, value))
+        return dump
+
 
 def profile_to_raw(profile):
     yield JS_MAP
@@ -565,3 +796,11 @@ def to_json(domain):
     return ToJSON.__invoke__(domain)
 
 
+def raw_dumper(domain, with_null=False):
+    return ToRaw.__prepare__(domain).dumper(with_null)
+
+
+def json_dumper(domain, with_null=False):
+    return ToJSON.__prepare__(domain).dumper(with_null)
+
+
@@ -24,6 +24,7 @@ from ..tr.pipe import SQLPipe
 import re
 import decimal
 import datetime
+import itertools
 
 
 class EmitTextHeaders(EmitHeaders):
@@ -38,13 +39,28 @@ class EmitText(Emit):
 
     adapt(TextFormat)
 
+    # The number of leading rows used to estimate column widths
+    # of a streamed output.
+    window = 1000
+
     def __call__(self):
         addon = context.app.htsql
         product_to_text = profile_to_text(self.meta)
         size = product_to_text.size
         if size == 0:
             return
-        widths = product_to_text.widths(self.data)
+        data = self.data
+        if (isinstance(self.meta.domain, ListDomain) and
+                data is not None and not isinstance(data, list)):
+            # The rows are still being fetched; we cannot scan all of them
+            # in advance, so wider values that come later may overflow
+            # their columns.
+            data = iter(data)
+            head = list(itertools.islice(data, self.window))
+            widths = product_to_text.widths(head)
+            data = itertools.chain(head, data)
+        else:
+            widths = product_to_text.widths(data)
         depth = product_to_text.head_depth()
         head = product_to_text.head(depth)
         if depth > 0:
@@ -134,7 +150,7 @@ class EmitText(Emit):
                 line.append("-+-")
             line.append("\n")
             yield "".join(line)
-        body = product_to_text.body(self.data, widths)
+        body = product_to_text.body(data, widths)
         for row in body:
             line = []
             is_last_solid = False
@@ -245,6 +261,11 @@ class TextToText(ToText):
             yield [("%*s" % (-width, value), True)]
             return
         chunks = self.boundary_regexp.split(value)
+        if max(len(chunk) for chunk in chunks) > width:
+            # Happens only with streamed output, when the column width
+            # is estimated from the leading rows.
+            yield [(value, True)]
+            return
         best_badnesses = []
         best_lengths = []
         best_sizes = []
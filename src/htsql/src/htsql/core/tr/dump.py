@@ -26,8 +26,8 @@ from .signature import (Signature, isformula, IsEqualSig, IsTotallyEqualSig,
                         IsInSig, IsNullSig, IfNullSig, NullIfSig, CompareSig,
                         AndSig, OrSig, NotSig, SortDirectionSig, RowNumberSig,
                         ToPredicateSig, FromPredicateSig, PlaceholderSig)
-from .pipe import (SQLPipe, BatchSQLPipe, RecordPipe, ComposePipe, ProducePipe,
-        MixPipe)
+from .pipe import (SQLPipe, BatchSQLPipe, StreamSQLPipe, RecordPipe,
+        ComposePipe, ProducePipe, MixPipe)
 from ..connect import unscramble
 import io
 import re
@@ -152,8 +152,10 @@ class SerializingState:
         Encapsulates serializing hints and directives.
     """
 
-    def __init__(self, batch=None):
+    def __init__(self, batch=None, stream=None):
         self.batch = batch
+        # The number of rows to fetch at once when streaming the output.
+        self.stream_size = stream
         # The stream that accumulates the generated SQL.
         self.stream = Stream()
         # A mapping: tag -> frame.
@@ -325,7 +327,14 @@ class SerializeSegment(Serialize):
             for index in sorted(placeholders):
                 input_domains.append(placeholders[index])
         output_domains = [phrase.domain for phrase in self.clause.select]
-        if self.state.batch is None:
+        # Only flat queries could be streamed since nested segments
+        # must be merged with their parents.
+        if self.clause.dependents:
+            self.state.stream_size = None
+        if self.state.stream_size is not None:
+            pipe = StreamSQLPipe(sql, input_domains, output_domains,
+                                 self.state.stream_size)
+        elif self.state.batch is None:
             pipe = SQLPipe(sql, input_domains, output_domains)
         else:
             pipe = BatchSQLPipe(sql, input_domains, output_domains,
@@ -2038,8 +2047,8 @@ class DumpPlaceholder(DumpBySignature):
                     index=str(self.signature.index+1))
 
 
-def serialize(clause, batch=None):
-    state = SerializingState(batch=batch)
+def serialize(clause, batch=None, stream=None):
+    state = SerializingState(batch=batch, stream=stream)
     return state.serialize(clause)
 
 
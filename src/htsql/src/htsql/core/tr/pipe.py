@@ -4,19 +4,46 @@
 
 
 from ..util import Clonable, YAMLable
-from ..context import context
+from ..context import context, ContextGuard
 from ..domain import Product
-from ..connect import transaction, scramble, unscramble
+from ..connect import (transaction, scramble, unscramble, stream_cursor,
+        Unscramble)
 from ..error import PermissionError
 import operator
 import tempfile
 import pickle
+import sys
 
 
 class Pipe(Clonable, YAMLable):
     pass
 
 
+def compile_convert(domains):
+    """
+    Generates a function that converts a raw database row to HTSQL values.
+
+    Returns ``None`` when the raw row could be used as is.
+
+    `domains` (a list of :class:`htsql.core.domain.Domain`)
+        The types of the row columns.
+    """
+    namespace = {}
+    items = []
+    for index, domain in enumerate(domains):
+        convert = unscramble(domain)
+        if convert is Unscramble.convert:
+            items.append("row[%s]" % index)
+        else:
+            name = "convert%s" % index
+            namespace[name] = convert
+            items.append("%s(row[%s])" % (name, index))
+    if not namespace:
+        return None
+    source = "lambda row: (%s,)" % ", ".join(items)
+    return eval(source, namespace)
+
+
 class ComposePipe(Pipe):
 
     def __init__(self, left_pipe, right_pipe):
@@ -40,18 +67,18 @@ class SQLPipe(Pipe):
         self.sql = sql
         self.input_domains = input_domains
         self.output_domains = output_domains
+        # Converts raw rows; cached together with the plan.
+        self.convert = compile_convert(output_domains)
 
     def __call__(self):
         def run_sql(input, sql=self.sql,
                            input_domains=self.input_domains,
-                           output_domains=self.output_domains):
+                           convert=self.convert):
             if not context.env.can_read:
                 raise PermissionError("No read permissions")
             scrambles = None
             if input_domains is not None:
                 scrambles = [scramble(domain) for domain in input_domains]
-            unscrambles = list(enumerate(
-                    [unscramble(domain) for domain in output_domains]))
             with transaction() as connection:
                 cursor = connection.cursor()
                 if scrambles is None:
@@ -64,12 +91,9 @@ class SQLPipe(Pipe):
                             for index, (item, scramble)
                                     in enumerate(zip(input, scrambles)))
                     cursor.execute(sql, parameters)
-                output = []
-                for row in cursor:
-                    #assert len(row) == len(unscrambles)
-                    output.append(tuple([
-                        convert(row[idx])
-                        for idx, convert in unscrambles]))
+                output = cursor.fetchall()
+                if convert is not None:
+                    output = list(map(convert, output))
             return output
         return run_sql
 
@@ -90,18 +114,18 @@ class BatchSQLPipe(Pipe):
         self.input_domains = input_domains
         self.output_domains = output_domains
         self.batch = batch
+        self.convert = compile_convert(output_domains)
 
     def __call__(self):
         def run_sql(input, sql=self.sql,
                            input_domains=self.input_domains,
-                           output_domains=self.output_domains,
+                           convert=self.convert,
                            batch=self.batch):
             if not context.env.can_read:
                 raise PermissionError("No read permissions")
             scrambles = None
             if input_domains is not None:
                 scrambles = [scramble(domain) for domain in input_domains]
-            unscrambles = [unscramble(domain) for domain in output_domains]
             with transaction() as connection:
                 cursor = connection.cursor()
                 if scrambles is None:
@@ -115,9 +139,8 @@ class BatchSQLPipe(Pipe):
                                     in enumerate(zip(input, scrambles)))
                     cursor.execute(sql, parameters)
                 chunk = cursor.fetchmany(batch)
-                chunk = [tuple([convert(item)
-                                for item, convert in zip(row, unscrambles)])
-                         for row in chunk]
+                if convert is not None:
+                    chunk = list(map(convert, chunk))
                 if len(chunk) < batch:
                     return chunk
                 stream = tempfile.TemporaryFile()
@@ -126,9 +149,8 @@ class BatchSQLPipe(Pipe):
                     size += 1
                     pickle.dump(chunk, stream, 2)
                     chunk = cursor.fetchmany(batch)
-                    chunk = [tuple([convert(item)
-                                    for item, convert in zip(row, unscrambles)])
-                             for row in chunk]
+                    if convert is not None:
+                        chunk = list(map(convert, chunk))
                 stream.seek(0)
                 def iterate(stream=stream, size=size, load=pickle.load):
                     for k in range(size):
@@ -148,6 +170,79 @@ class BatchSQLPipe(Pipe):
         yield ('batch', self.batch)
 
 
+class StreamSQLPipe(Pipe):
+
+    def __init__(self, sql, input_domains, output_domains, stream):
+        self.sql = sql
+        self.input_domains = input_domains
+        self.output_domains = output_domains
+        self.stream = stream
+        self.convert = compile_convert(output_domains)
+
+    def __call__(self):
+        def run_sql(input, sql=self.sql,
+                           input_domains=self.input_domains,
+                           convert=self.convert,
+                           stream=self.stream):
+            if not context.env.can_read:
+                raise PermissionError("No read permissions")
+            parameters = None
+            if input_domains is not None:
+                scrambles = [scramble(domain) for domain in input_domains]
+                assert isinstance(input, (tuple, list))
+                assert len(input) == len(scrambles)
+                parameters = dict((str(index+1), scramble(item))
+                        for index, (item, scramble)
+                                in enumerate(zip(input, scrambles)))
+            else:
+                assert input is None
+            # The rows are fetched when the output is consumed, possibly
+            # after the application is deactivated, so we must restore
+            # the context every time we talk to the database.
+            guard = ContextGuard(context.app, context.env)
+            def iterate():
+                transaction_guard = None
+                try:
+                    with guard:
+                        open_guard = transaction()
+                        connection = open_guard.__enter__()
+                        transaction_guard = open_guard
+                        cursor = stream_cursor(connection, stream)
+                        if parameters is None:
+                            cursor.execute(sql)
+                        else:
+                            cursor.execute(sql, parameters)
+                        chunk = cursor.fetchmany(stream)
+                    while chunk:
+                        if convert is not None:
+                            chunk = list(map(convert, chunk))
+                        for row in chunk:
+                            yield row
+                        with guard:
+                            chunk = cursor.fetchmany(stream)
+                    with guard:
+                        cursor.close()
+                        transaction_guard = None
+                        open_guard.__exit__(None, None, None)
+                except BaseException:
+                    if transaction_guard is not None:
+                        with guard:
+                            transaction_guard.__exit__(*sys.exc_info())
+                    raise
+            return iterate()
+        return run_sql
+
+    def __yaml__(self):
+        yield ('sql', self.sql+'\n')
+        if self.input_domains:
+            yield ('input', [str(domain)
+                             for domain in self.input_domains])
+        if self.output_domains:
+            yield ('output', [str(domain)
+                              for domain in self.output_domains])
+        yield ('stream', self.stream)
+
+
 class ProducePipe(Pipe):
 
     def __init__(self, meta, data_pipe, **properties):
@@ -4,6 +4,8 @@
 
 
 from ..context import context
+from ..adapter import Utility
+from ..introspect import introspect
 from ..syn.syntax import Syntax
 from ..syn.parse import parse
 from .bind import bind
@@ -11,6 +13,7 @@ from .binding import Binding
 from .decorate import decorate
 from .route import route
 from .encode import encode
+from .flow import CollectFlow
 from .space import OrderedSpace
 from .rewrite import rewrite
 from .compile import compile
@@ -18,7 +21,8 @@ from .assemble import assemble
 from .reduce import reduce
 from .dump import serialize
 from .pack import pack
-from .pipe import SQLPipe, RecordPipe, ComposePipe, ProducePipe
+from .pipe import (SQLPipe, BatchSQLPipe, StreamSQLPipe, RecordPipe,
+        ComposePipe, ProducePipe)
 
 
 class CacheItem:
@@ -34,13 +38,15 @@ class CacheItem:
 
 class LRUCache:
 
-    __slots__ = ('head', 'tail', 'items', 'size')
+    __slots__ = ('head', 'tail', 'items', 'size', 'hits', 'misses')
 
     def __init__(self, size):
         self.head = None
         self.tail = None
         self.items = {}
         self.size = size
+        self.hits = 0
+        self.misses = 0
 
     def __getitem__(self, key):
         item = self.items[key]
@@ -76,42 +82,155 @@ class LRUCache:
         return len(self.items)
 
 
-def cache_plan(key, plan):
+class TranslateScope(Utility):
+    """
+    Describes the part of the request state that affects translation.
+
+    Returns a hashable value, which is added to the key of the query
+    cache, or ``None`` if queries should not be cached in the current
+    state.
+    """
+
+    def __call__(self):
+        return ()
+
+
+translate_scope = TranslateScope.__invoke__
+
+
+def freeze_environment(environment):
+    # Converts query parameters to a hashable form; returns `None`
+    # if some of the values cannot be hashed.
+    def freeze(data):
+        if isinstance(data, list):
+            data = tuple(freeze(item) for item in data)
+        return data
+    items = []
+    if environment is not None:
+        for name in sorted(environment):
+            value = environment[name]
+            items.append((name, value.domain, freeze(value.data)))
+    items = tuple(items)
+    try:
+        hash(items)
+    except TypeError:
+        return None
+    return items
+
+
+def get_cache_mapping(service):
+    # Finds or creates the LRU cache of the service; must be called with
+    # the service lock held.  Returns `None` if caching is disabled.
     cache = context.app.htsql.cache
-    with cache.lock(cache_plan):
-        try:
-            mapping = cache.values[cache_plan]
-        except KeyError:
-            size = context.app.htsql.query_cache_size
-            if not size:
-                return
-            mapping = cache.values[cache_plan] = LRUCache(size=size)
-        mapping[key] = plan
+    try:
+        return cache.values[service]
+    except KeyError:
+        size = context.app.htsql.query_cache_size
+        if not size:
+            return None
+        mapping = cache.values[service] = LRUCache(size=size)
+        return mapping
+
+
+def cache_plan(key, plan, service=None):
+    if service is None:
+        service = cache_plan
+    cache = context.app.htsql.cache
+    with cache.lock(service):
+        mapping = get_cache_mapping(service)
+        if mapping is not None:
+            mapping[key] = plan
 
 
 def get_cached_plan(key, cache_plan=cache_plan):
     cache = context.app.htsql.cache
     with cache.lock(cache_plan):
+        mapping = get_cache_mapping(cache_plan)
+        if mapping is None:
+            return None
         try:
-            return cache.values[cache_plan][key]
+            plan = mapping[key]
         except KeyError:
+            mapping.misses += 1
             return None
+        mapping.hits += 1
+        return plan
+
+
+def cache_query(key, plan):
+    cache_plan(key, plan, service=cache_query)
+
+
+def get_cached_query(key):
+    return get_cached_plan(key, cache_plan=cache_query)
+
+
+def cache_command(key, command):
+    cache_plan(key, command, service=cache_command)
+
+
+def get_cached_command(key):
+    return get_cached_plan(key, cache_plan=cache_command)
+
+
+def get_cache_stats():
+    """
+    Returns usage statistics of the command, the query and the plan caches.
+    """
+    cache = context.app.htsql.cache
+    stats = {}
+    for name, service in [('command', cache_command),
+                          ('query', cache_query), ('plan', cache_plan)]:
+        with cache.lock(service):
+            mapping = cache.values.get(service)
+            if mapping is None:
+                stats[name] = {
+                        'size': 0, 'capacity': 0, 'hits': 0, 'misses': 0 }
+            else:
+                stats[name] = {
+                        'size': len(mapping),
+                        'capacity': mapping.size,
+                        'hits': mapping.hits,
+                        'misses': mapping.misses }
+    return stats
 
 
-def translate(syntax, environment=None, limit=None, offset=None, batch=None):
+def translate(syntax, environment=None, limit=None, offset=None, batch=None,
+              stream=None):
     assert isinstance(syntax, (Syntax, Binding, str))
-    if isinstance(syntax, str):
-        syntax = parse(syntax)
+    # Parsed and bound queries are cached by the query text (or syntax),
+    # the values of query parameters and the request state; the entry is
+    # valid only as long as the catalog it was built against.
+    catalog = None
+    query_key = None
     if not isinstance(syntax, Binding):
+        catalog = introspect()
+        scope = translate_scope()
+        parameters = freeze_environment(environment)
+        if scope is not None and parameters is not None:
+            query_key = (syntax, parameters, scope,
+                         limit, offset, batch, stream)
+            query_plan = get_cached_query(query_key)
+            if query_plan is not None:
+                query_catalog, profile, pipe, sql = query_plan
+                if query_catalog is catalog:
+                    return ProducePipe(profile, pipe, sql=sql)
+        if isinstance(syntax, str):
+            syntax = parse(syntax)
         binding = bind(syntax, environment=environment)
     else:
         binding = syntax
     profile = decorate(binding)
     flow = route(binding)
-    key = (profile.tag, flow, limit, offset, batch)
+    # Only a list of records could be produced incrementally.
+    if not isinstance(flow, CollectFlow):
+        stream = None
+    key = (profile.tag, flow, limit, offset, batch, stream)
     pipe_sql = get_cached_plan(key)
     if pipe_sql is not None:
         pipe, sql = pipe_sql
+        if query_key is not None:
+            cache_query(query_key, (catalog, profile, pipe, sql))
         pipe = ProducePipe(profile, pipe, sql=sql)
         return pipe
     expression = encode(flow)
@@ -121,18 +240,20 @@ def translate(syntax, environment=None, limit=None, offset=None, batch=None):
     term = compile(expression)
     frame = assemble(term)
     frame = reduce(frame)
-    raw_pipe = serialize(frame, batch=batch)
+    raw_pipe = serialize(frame, batch=batch, stream=stream)
     sql = get_sql(raw_pipe)
     value_pipe = pack(flow, frame, profile.tag)
     pipe = ComposePipe(raw_pipe, value_pipe)
     #print pipe
     cache_plan(key, (pipe, sql))
+    if query_key is not None:
+        cache_query(query_key, (catalog, profile, pipe, sql))
     pipe = ProducePipe(profile, pipe, sql=sql)
     return pipe
 
 
 def get_sql(pipe):
-    if isinstance(pipe, SQLPipe):
+    if isinstance(pipe, (SQLPipe, BatchSQLPipe, StreamSQLPipe)):
         return pipe.sql
     if isinstance(pipe, ComposePipe):
         return get_sql(pipe.left_pipe)
@@ -0,0 +1,199 @@
+#
+# Copyright (c) 2006-2013, Prometheus Research, LLC
+#
+
+
+"""
+:mod:`htsql.core.warmup`
+========================
+
+This module builds adapter realizations ahead of time.
+"""
+
+
+from .context import context
+from .adapter import Component, Utility, Adapter, Protocol
+from .domain import Domain
+from .introspect import introspect
+from .util import aresubclasses
+import atexit
+import os
+import pickle
+import tempfile
+import threading
+import weakref
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def guess_realizations():
+    """
+    Generates ``(interface, dispatch_key)`` pairs likely to be realized
+    by the active application.
+    """
+    registry = context.app.component_registry
+    # Domain types defined by the application and used by the catalog.
+    domain_types = []
+    queue = [Domain]
+    while queue:
+        domain_type = queue.pop(0)
+        if domain_type.__module__ in registry.modules:
+            domain_types.append(domain_type)
+        queue.extend(domain_type.__subclasses__())
+    for schema in introspect():
+        for table in schema:
+            for column in table:
+                domain_type = type(column.domain)
+                if domain_type not in domain_types:
+                    domain_types.append(domain_type)
+    # We treat immediate subclasses of `Utility`, `Adapter` and `Protocol`
+    # as interfaces; the other interfaces are caught by the realization index.
+    for interface in Component.__components__():
+        if Utility in interface.__bases__:
+            yield (interface, ())
+        elif Protocol in interface.__bases__:
+            for name in interface.__catalogue__():
+                yield (interface, name)
+        elif Adapter in interface.__bases__:
+            seen = set()
+            for component in interface.__implementations__():
+                for type_vector in component.__types__:
+                    if type_vector not in seen:
+                        seen.add(type_vector)
+                        yield (interface, type_vector)
+            if interface.__arity__ == 1:
+                for domain_type in domain_types:
+                    type_vector = (domain_type,)
+                    if (type_vector not in seen and
+                            any(aresubclasses(type_vector, other_vector)
+                                for other_vector in interface.__types__)):
+                        seen.add(type_vector)
+                        yield (interface, type_vector)
+
+
+def read_index_entries(path):
+    # Returns the set of pickled keys saved in the index file.
+    try:
+        with open(path, 'rb') as stream:
+            entries = pickle.load(stream)
+    except Exception:
+        return set()
+    if not isinstance(entries, list):
+        return set()
+    return set(entries)
+
+
+def load_realization_index(path):
+    """
+    Loads ``(interface, dispatch_key)`` pairs saved by
+    :func:`save_realization_index`.
+
+    Entries that refer to missing code are skipped.
+    """
+    keys = []
+    for entry in sorted(read_index_entries(path)):
+        try:
+            keys.append(pickle.loads(entry))
+        except Exception:
+            pass
+    return keys
+
+
+def save_realization_index(path, *registries):
+    """
+    Adds the ``(interface, dispatch_key)`` pairs realized so far to
+    the index file.
+
+    The file may be shared by several processes, so the entries saved
+    by other processes are preserved.
+    """
+    entries = set()
+    for registry in registries:
+        for key in list(registry.realizations):
+            try:
+                entries.add(pickle.dumps(key, pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                # Dynamically generated types cannot be saved.
+                pass
+    directory = os.path.dirname(os.path.abspath(path))
+    lock = None
+    try:
+        if fcntl is not None:
+            lock = open(path+'.lock', 'wb')
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        saved_entries = read_index_entries(path)
+        if entries <= saved_entries:
+            return
+        entries |= saved_entries
+        fd, temporary_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as stream:
+                pickle.dump(sorted(entries), stream,
+                            pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+    except OSError:
+        pass
+    finally:
+        if lock is not None:
+            lock.close()
+
+
+# Registries of applications that save their realizations on exit,
+# by the index file.
+indexed_registries = {}
+indexed_registries_lock = threading.Lock()
+
+
+def save_realization_indexes():
+    # Called on exit of the process.
+    with indexed_registries_lock:
+        for path in sorted(indexed_registries):
+            registries = list(indexed_registries[path])
+            if registries:
+                save_realization_index(path, *registries)
+
+
+def register_realization_index(path):
+    """
+    Makes the process save the realizations of the active application
+    to the index file on exit.
+    """
+    registry = context.app.component_registry
+    with indexed_registries_lock:
+        if not indexed_registries:
+            atexit.register(save_realization_indexes)
+        path = os.path.abspath(path)
+        if path not in indexed_registries:
+            indexed_registries[path] = weakref.WeakSet()
+        indexed_registries[path].add(registry)
+
+
+def warm_up(keys):
+    """
+    Realizes interfaces for the given ``(interface, dispatch_key)`` pairs.
+
+    Returns the number of built realizations.
+    """
+    registry = context.app.component_registry
+    count = 0
+    for interface, dispatch_key in keys:
+        if (interface, dispatch_key) in registry.realizations:
+            continue
+        if not (isinstance(interface, type) and
+                issubclass(interface, Component) and
+                interface.__enabled__()):
+            continue
+        try:
+            interface.__realize__(dispatch_key)
+        except (RuntimeError, AssertionError, TypeError):
+            # Signatures that never occur in practice may be ambiguous.
+            continue
+        count += 1
+    return count
+
+
@@ -35,6 +35,10 @@ class TweakETLAddon(Addon):
     parameters = [
             Parameter('copy_limit', PIntVal(is_nullable=True), default=10000,
                       hint="""chunk size for copy (default: 10000)"""),
+            Parameter('resolve_limit', PIntVal(is_nullable=True),
+                      default=1000,
+                      hint="""chunk size for resolving links"""
+                           """ (default: 1000)"""),
     ]
 
     @classmethod
@@ -14,7 +14,7 @@ from ....core.cmd.act import Act, ProduceAction, SafeProduceAction, act
 from ....core.tr.binding import VoidBinding
 from ....core.tr.decorate import decorate
 from .command import CopyCmd
-from .insert import BuildExtractNode, BuildExtractTable
+from .insert import BuildExtractNode, BuildExtractTable, extract_batch
 import tempfile
 
 
@@ -79,8 +79,7 @@ class ProduceCopy(Act):
             product = act(self.command.feed, action)
             extract_node = BuildExtractNode.__invoke__(product.meta)
             extract_table = BuildExtractTable.__invoke__(
-                    extract_node.node, extract_node.arcs,
-                    with_cache=True)
+                    extract_node.node, extract_node.arcs)
             collect_copy = BuildCollectCopy.__invoke__(
                     extract_table.table, extract_table.columns)
             if extract_node.is_list:
@@ -89,7 +88,12 @@ class ProduceCopy(Act):
             else:
                 records = [product.data]
                 record_domain = product.meta.domain
+            batch_size = context.app.tweak.etl.resolve_limit
             for idx, record in enumerate(records):
+                if batch_size and idx % batch_size == 0:
+                    extract_table.preload(
+                            extract_batch(
+                                extract_node, records[idx:idx+batch_size]))
                 if record is None:
                     continue
                 try:
@@ -16,7 +16,7 @@ from ....core.tr.decorate import decorate
 from .command import DeleteCmd
 from .insert import BuildExtractNode
 from .merge import BuildResolveKey
-from ..tr.dump import serialize_delete
+from ..tr.dump import serialize_delete, serialize_delete_many
 import itertools
 
 
@@ -67,6 +67,59 @@ class BuildExecuteDelete(Utility):
         return ExecuteDeletePipe(table, key_columns, sql)
 
 
+class ExecuteDeleteManyPipe:
+
+    def __init__(self, table, key_columns, size):
+        assert isinstance(table, TableEntity)
+        assert isinstance(key_columns, listof(ColumnEntity))
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.key_columns = key_columns
+        self.size = size
+        self.sql_by_size = {}
+        self.key_converts = [scramble(column.domain)
+                             for column in key_columns]
+
+    def __call__(self, key_rows):
+        key_rows = [tuple(convert(item)
+                          for item, convert in zip(key_row, self.key_converts))
+                    for key_row in key_rows]
+        if not key_rows:
+            return
+        if not context.env.can_write:
+            raise PermissionError("No write permissions")
+        with transaction() as connection:
+            cursor = connection.cursor()
+            for start in range(0, len(key_rows), self.size):
+                chunk = key_rows[start:start+self.size]
+                parameters = tuple(itertools.chain.from_iterable(chunk))
+                cursor.execute(self.sql_for(len(chunk)), parameters)
+
+    def sql_for(self, size):
+        # SQL for deleting `size` records at once.
+        if size not in self.sql_by_size:
+            self.sql_by_size[size] = serialize_delete_many(
+                    self.table, self.key_columns, size)
+        return self.sql_by_size[size]
+
+
+class BuildExecuteDeleteMany(Utility):
+    """
+    Builds a pipe that deletes a list of records by their primary keys.
+    """
+
+    def __init__(self, table, size=1000):
+        assert isinstance(table, TableEntity)
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.size = size
+
+    def __call__(self):
+        execute_delete = BuildExecuteDelete.__invoke__(self.table)
+        return ExecuteDeleteManyPipe(self.table, execute_delete.key_columns,
+                                     self.size)
+
+
 class ProduceDelete(Act):
 
     adapt(DeleteCmd, ProduceAction)
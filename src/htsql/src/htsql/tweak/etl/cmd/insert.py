@@ -23,16 +23,18 @@ from ....core.syn.syntax import VoidSyntax, IdentifierSyntax
 from ....core.tr.binding import (VoidBinding, RootBinding, FormulaBinding,
         LocateBinding, SelectionBinding, SieveBinding, AliasBinding,
         CollectBinding, FreeTableRecipe, ColumnRecipe)
-from ....core.tr.signature import IsEqualSig, AndSig, PlaceholderSig
+from ....core.tr.signature import IsEqualSig, AndSig, OrSig, PlaceholderSig
 from ....core.tr.decorate import decorate
 from ....core.tr.coerce import coerce
 from ....core.tr.lookup import identify
 from .command import InsertCmd
-from ..tr.dump import serialize_insert
+from ..tr.dump import serialize_insert, serialize_insert_many
 import itertools
+import collections
 import datetime
 import decimal
 import operator
+import threading
 
 
 class Clarify(Adapter):
@@ -335,6 +337,12 @@ class ExtractTablePipe:
                for item, resolve in zip(row, self.resolves)]
         return tuple([extract(row) for extract in self.extracts])
 
+    def preload(self, rows):
+        # Resolves the links of a batch of rows in advance.
+        for idx, resolve in enumerate(self.resolves):
+            if resolve is not None:
+                resolve.preload([row[idx] for row in rows])
+
 
 class BuildExtractTable(Utility):
 
@@ -438,6 +446,140 @@ class BuildExecuteInsert(Utility):
         return ExecuteInsertPipe(table, self.columns, returning_columns, sql)
 
 
+class ExecuteInsertManyPipe:
+
+    def __init__(self, table, input_columns, output_columns, sql, size):
+        assert isinstance(table, TableEntity)
+        assert isinstance(input_columns, listof(ColumnEntity))
+        assert isinstance(output_columns, listof(ColumnEntity))
+        assert isinstance(sql, str)
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.input_columns = input_columns
+        self.output_columns = output_columns
+        self.sql = sql
+        self.size = size
+        self.sql_by_size = {}
+        # The database may return the inserted rows in any order, so we
+        # also fetch the input columns to match the rows to the input.
+        self.returning_columns = output_columns + \
+                [column for column in input_columns
+                 if column not in output_columns]
+        if all(column in input_columns for column in output_columns):
+            # The key is given with the input.
+            match_columns = output_columns
+        else:
+            match_columns = input_columns
+        self.input_indexes = [input_columns.index(column)
+                              for column in match_columns]
+        self.returning_indexes = [self.returning_columns.index(column)
+                                  for column in match_columns]
+        self.input_converts = [scramble(column.domain)
+                               for column in input_columns]
+        self.output_converts = [unscramble(column.domain)
+                                for column in output_columns]
+        self.returning_converts = [unscramble(column.domain)
+                                   for column in self.returning_columns]
+
+    def __call__(self, rows):
+        items = [tuple(row[idx] for idx in self.input_indexes)
+                 for row in rows]
+        rows = [tuple(convert(item)
+                      for item, convert in zip(row, self.input_converts))
+                for row in rows]
+        if not rows:
+            return []
+        if not context.env.can_write:
+            raise PermissionError("No write permissions")
+        output_rows = []
+        with transaction() as connection:
+            cursor = connection.cursor()
+            if not self.input_columns:
+                # Multi-row `DEFAULT VALUES` is not expressible in SQL.
+                for row in rows:
+                    cursor.execute(self.sql, row)
+                    output_rows.extend(cursor.fetchall())
+                if len(output_rows) != len(rows):
+                    raise Error("Failed to insert a record")
+                return [tuple(convert(item)
+                              for item, convert
+                              in zip(row, self.output_converts))
+                        for row in output_rows]
+            for start in range(0, len(rows), self.size):
+                chunk = rows[start:start+self.size]
+                parameters = tuple(itertools.chain.from_iterable(chunk))
+                cursor.execute(self.sql_for(len(chunk)), parameters)
+                output_rows.extend(cursor.fetchall())
+        if len(output_rows) != len(rows):
+            raise Error("Failed to insert a record")
+        width = len(self.output_columns)
+        outputs_by_item = collections.OrderedDict()
+        leftovers = []
+        for row in output_rows:
+            row = tuple(convert(item)
+                        for item, convert in zip(row, self.returning_converts))
+            item = tuple(row[idx] for idx in self.returning_indexes)
+            try:
+                outputs_by_item.setdefault(item, []).append(row[:width])
+            except TypeError:
+                leftovers.append(row[:width])
+        # Rows with identical input are interchangeable.  Rows altered by the
+        # database on insertion (e.g., by a trigger) cannot be matched, so
+        # they are paired with the remaining output.
+        keys = []
+        unmatched = []
+        for idx, item in enumerate(items):
+            try:
+                outputs = outputs_by_item.get(item)
+            except TypeError:
+                outputs = None
+            if outputs:
+                keys.append(outputs.pop(0))
+            else:
+                keys.append(None)
+                unmatched.append(idx)
+        if unmatched:
+            leftovers = [output
+                         for outputs in outputs_by_item.values()
+                         for output in outputs] + leftovers
+            for idx, output in zip(unmatched, leftovers):
+                keys[idx] = output
+        return keys
+
+    def sql_for(self, size):
+        # SQL for inserting `size` records at once.
+        if size not in self.sql_by_size:
+            self.sql_by_size[size] = serialize_insert_many(
+                    self.table, self.input_columns, self.returning_columns,
+                    size)
+        return self.sql_by_size[size]
+
+
+class BuildExecuteInsertMany(Utility):
+    """
+    Builds a pipe that inserts a list of records using multi-row
+    ``INSERT`` statements.
+
+    The pipe returns the primary keys of the inserted records in the order
+    of the input.
+    """
+
+    def __init__(self, table, columns, size=1000):
+        assert isinstance(table, TableEntity)
+        assert isinstance(columns, listof(ColumnEntity))
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.columns = columns
+        self.size = size
+
+    def __call__(self):
+        execute_insert = BuildExecuteInsert.__invoke__(self.table,
+                                                       self.columns)
+        return ExecuteInsertManyPipe(self.table, self.columns,
+                                     execute_insert.output_columns,
+                                     execute_insert.sql, self.size)
+
+
 class ResolveIdentityPipe:
 
     def __init__(self, profile, pipe):
@@ -512,34 +654,200 @@ class BuildResolveIdentity(Utility):
         return ResolveIdentityPipe(profile, pipe)
 
 
+class ResolveIdentityManyPipe:
+
+    def __init__(self, profile, build, size, pipe_by_size=None):
+        self.profile = profile
+        # Makes a query that takes the given number of keys.
+        self.build = build
+        self.size = size
+        self.pipe_by_size = dict(pipe_by_size or {})
+
+    def __call__(self, rows):
+        rows = [tuple(row) for row in rows]
+        keys = list(collections.OrderedDict.fromkeys(rows))
+        identity_by_key = {}
+        for start in range(0, len(keys), self.size):
+            chunk = keys[start:start+self.size]
+            parameters = list(itertools.chain.from_iterable(chunk))
+            product = self.pipe_for(len(chunk))()(parameters)
+            for row in product.data:
+                identity_by_key[tuple(row[1:])] = row[0]
+        identities = []
+        for row in rows:
+            if row not in identity_by_key:
+                raise Error("Unable to locate the inserted record")
+            identities.append(identity_by_key[row])
+        return identities
+
+    def pipe_for(self, size):
+        # The query for `size` keys; built on the first use.
+        if size not in self.pipe_by_size:
+            self.pipe_by_size[size] = self.build(size)
+        return self.pipe_by_size[size]
+
+
+class BuildResolveIdentityMany(Utility):
+    """
+    Builds a pipe that maps a list of primary keys to the identities
+    of the respective records.
+
+    The records are fetched in batches of at most `size` keys with one
+    query per batch; the query takes as many keys as there are in the
+    batch.
+    """
+
+    def __init__(self, table, columns, size=100):
+        assert isinstance(table, TableEntity)
+        assert isinstance(columns, listof(ColumnEntity))
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.columns = columns
+        self.size = size
+
+    def __call__(self):
+        pipe = self.build(1)
+        profile = pipe.meta.domain.item_domain.fields[0]
+        return ResolveIdentityManyPipe(profile, self.build, self.size,
+                                       {1: pipe})
+
+    def build(self, size):
+        # Translates a query that fetches `size` records by the key.
+        syntax = VoidSyntax()
+        scope = RootBinding(syntax)
+        state = BindingState(scope)
+        scope = state.use(FreeTableRecipe(self.table), syntax)
+        state.push_scope(scope)
+        column_bindings = [state.use(ColumnRecipe(column), syntax)
+                           for column in self.columns]
+        count = itertools.count()
+        conditions = []
+        for k in range(size):
+            equalities = []
+            for column_binding in column_bindings:
+                item = FormulaBinding(scope,
+                                      PlaceholderSig(next(count)),
+                                      column_binding.domain,
+                                      syntax)
+                equality = FormulaBinding(scope,
+                                          IsEqualSig(+1),
+                                          coerce(BooleanDomain()),
+                                          syntax,
+                                          lop=column_binding,
+                                          rop=item)
+                equalities.append(equality)
+            if len(equalities) == 1:
+                [condition] = equalities
+            else:
+                condition = FormulaBinding(scope,
+                                           AndSig(),
+                                           coerce(BooleanDomain()),
+                                           syntax,
+                                           ops=equalities)
+            conditions.append(condition)
+        if len(conditions) == 1:
+            [condition] = conditions
+        else:
+            condition = FormulaBinding(scope,
+                                       OrSig(),
+                                       coerce(BooleanDomain()),
+                                       syntax,
+                                       ops=conditions)
+        scope = SieveBinding(scope, condition, syntax)
+        state.push_scope(scope)
+        recipe = identify(scope)
+        if recipe is None:
+            raise Error("Cannot determine table identity")
+        identity = state.use(recipe, syntax)
+        elements = [identity]
+        for column in self.columns:
+            elements.append(state.use(ColumnRecipe(column), syntax))
+        fields = [decorate(element) for element in elements]
+        domain = RecordDomain(fields)
+        binding = SelectionBinding(scope, elements, domain, syntax)
+        state.pop_scope()
+        state.pop_scope()
+        binding = Select.__invoke__(binding, state)
+        domain = ListDomain(binding.domain)
+        binding = CollectBinding(state.scope, binding, domain, syntax)
+        return translate(binding)
+
+
 class ResolveChainPipe:
 
-    def __init__(self, name, columns, domain, pipe):
+    def __init__(self, name, columns, domain, pipe, arc=None,
+                 max_size=1000):
         assert isinstance(columns, listof(ColumnEntity))
         self.name = name
         self.columns = columns
         self.pipe = pipe
         self.domain = domain
+        # Set if the link could be resolved in batches.
+        self.arc = arc
+        self.max_size = max_size
+        self.pipe_by_size = {}
+        # Keeps the preloaded keys; the pipe could be shared between
+        # threads, so each thread sees only the values it preloaded.
+        self.local = threading.local()
 
     def __call__(self, value):
         if value is None:
             return (None,)*len(self.columns)
+        raw_values = self.flatten(value)
+        cache = getattr(self.local, 'cache', None)
+        row = None
+        if cache:
+            row = cache.get(tuple(raw_values))
+        if row is None:
+            product = self.pipe()(raw_values)
+            data = product.data
+            if len(data) != 1:
+                quote = None
+                if self.name:
+                    quote = "%s[%s]" % (self.name, self.domain.dump(value))
+                else:
+                    quote = "[%s]" % self.domain.dump(value)
+                raise Error("Unable to resolve a link", quote)
+            row = data[0]
+        return row
+
+    def flatten(self, value):
+        # Extracts raw values from an identity.
         raw_values = []
         for leaf in self.domain.leaves:
             raw_value = value
             for idx in leaf:
                 raw_value = raw_value[idx]
             raw_values.append(raw_value)
-        product = self.pipe()(raw_values)
-        data = product.data
-        if len(data) != 1:
-            quote = None
-            if self.name:
-                quote = "%s[%s]" % (self.name, self.domain.dump(value))
-            else:
-                quote = "[%s]" % self.domain.dump(value)
-            raise Error("Unable to resolve a link", quote)
-        return data[0]
+        return raw_values
+
+    def preload(self, values):
+        # Resolves the given link values with a single query per
+        # `max_size` distinct values.
+        cache = self.local.cache = {}
+        if self.arc is None:
+            return
+        keys = list(collections.OrderedDict.fromkeys(
+                tuple(self.flatten(value))
+                for value in values if value is not None))
+        width = len(self.domain.leaves)
+        for start in range(0, len(keys), self.max_size):
+            chunk = keys[start:start+self.max_size]
+            # Round up the number of values to limit the number of distinct
+            # queries; the pipe expects exactly `size` values.
+            size = 1
+            while size < len(chunk):
+                size *= 2
+            size = min(size, self.max_size)
+            if size not in self.pipe_by_size:
+                self.pipe_by_size[size] = \
+                        BuildResolveChainMany.__invoke__(self.arc, size)
+            pipe = self.pipe_by_size[size]
+            chunk += chunk[-1:]*(size-len(chunk))
+            parameters = list(itertools.chain.from_iterable(chunk))
+            product = pipe()(parameters)
+            for row in product.data:
+                cache[tuple(row[:width])] = tuple(row[width:])
 
 
 class BuildResolveChain(Utility):
@@ -594,7 +902,96 @@ class BuildResolveChain(Utility):
         pipe =  translate(binding)
         columns = joins[0].origin_columns[:]
         domain = identity.domain
-        return ResolveChainPipe(target_name, columns, domain, pipe)
+        arc = self.arc if len(joins) == 1 else None
+        return ResolveChainPipe(target_name, columns, domain, pipe, arc)
+
+
+class BuildResolveChainMany(Utility):
+    """
+    Builds a query that resolves `size` link values at once.
+
+    The query takes raw identity values of the link targets and
+    produces records containing the raw identity values followed by
+    the values of the referenced columns.
+    """
+
+    def __init__(self, arc, size):
+        assert isinstance(arc, ChainArc) and len(arc.joins) == 1
+        assert isinstance(size, int) and size > 0
+        self.arc = arc
+        self.joins = arc.joins
+        self.size = size
+
+    def __call__(self):
+        target_labels = relabel(TableArc(self.arc.target.table))
+        target_name = target_labels[0].name if target_labels else None
+        [join] = self.joins
+        syntax = VoidSyntax()
+        scope = RootBinding(syntax)
+        state = BindingState(scope)
+        seed = state.use(FreeTableRecipe(join.target), syntax)
+        def make_leaves(scope):
+            recipe = identify(scope)
+            if recipe is None:
+                raise Error("Cannot determine identity of a link",
+                            target_name)
+            identity = state.use(recipe, syntax, scope=scope)
+            leaves = []
+            def flatten(identity):
+                for field in identity.elements:
+                    if isinstance(field.domain, IdentityDomain):
+                        flatten(field)
+                    else:
+                        leaves.append(field)
+            flatten(identity)
+            return leaves
+        leaves = make_leaves(seed)
+        count = itertools.count()
+        conditions = []
+        for k in range(self.size):
+            equalities = []
+            for leaf in leaves:
+                item = FormulaBinding(seed,
+                                      PlaceholderSig(next(count)),
+                                      leaf.domain,
+                                      syntax)
+                equality = FormulaBinding(seed,
+                                          IsEqualSig(+1),
+                                          coerce(BooleanDomain()),
+                                          syntax,
+                                          lop=leaf,
+                                          rop=item)
+                equalities.append(equality)
+            if len(equalities) == 1:
+                [condition] = equalities
+            else:
+                condition = FormulaBinding(seed,
+                                           AndSig(),
+                                           coerce(BooleanDomain()),
+                                           syntax,
+                                           ops=equalities)
+            conditions.append(condition)
+        if len(conditions) == 1:
+            [condition] = conditions
+        else:
+            condition = FormulaBinding(seed,
+                                       OrSig(),
+                                       coerce(BooleanDomain()),
+                                       syntax,
+                                       ops=conditions)
+        scope = SieveBinding(seed, condition, syntax)
+        state.push_scope(scope)
+        elements = make_leaves(scope)
+        for column in join.target_columns:
+            binding = state.use(ColumnRecipe(column), syntax)
+            elements.append(binding)
+        fields = [decorate(element) for element in elements]
+        domain = RecordDomain(fields)
+        scope = SelectionBinding(scope, elements, domain, syntax)
+        binding = Select.__invoke__(scope, state)
+        domain = ListDomain(binding.domain)
+        binding = CollectBinding(state.root, binding, domain, syntax)
+        return translate(binding)
 
 
 class CacheChainPipe:
@@ -625,6 +1022,10 @@ class CacheChainPipe:
                 quote = "[%s]" % self.domain.dump(value)
             raise Error("Unable to resolve a link", quote)
 
+    def preload(self, values):
+        # The whole table is cached on the first use.
+        pass
+
 
 class BuildCacheChain(Utility):
 
@@ -661,6 +1062,20 @@ class BuildCacheChain(Utility):
         return CacheChainPipe(target_name, columns, domain, pipe)
 
 
+def extract_batch(extract_node, records):
+    # Extracts rows from a batch of records skipping the ill-formed ones;
+    # the errors are reported when the records are processed.
+    rows = []
+    for record in records:
+        if record is None:
+            continue
+        try:
+            rows.append(extract_node(record))
+        except Error:
+            pass
+    return rows
+
+
 class ProduceInsert(Act):
 
     adapt(InsertCmd, ProduceAction)
@@ -684,7 +1099,12 @@ class ProduceInsert(Act):
             else:
                 records = [product.data]
                 record_domain = product.meta.domain
+            batch_size = context.app.tweak.etl.resolve_limit
             for idx, record in enumerate(records):
+                if batch_size and idx % batch_size == 0:
+                    extract_table.preload(
+                            extract_batch(
+                                extract_node, records[idx:idx+batch_size]))
                 if record is None:
                     continue
                 try:
@@ -11,7 +11,8 @@ from ....core.entity import TableEntity, ColumnEntity
 from ....core.model import TableArc, ColumnArc, ChainArc
 from ....core.classify import localize, relabel
 from ....core.connect import transaction, scramble, unscramble
-from ....core.domain import IdentityDomain, RecordDomain, ListDomain, Product
+from ....core.domain import (IdentityDomain, RecordDomain, ListDomain,
+        BooleanDomain, Product)
 from ....core.cmd.fetch import translate
 from ....core.cmd.act import Act, ProduceAction, act
 from ....core.tr.bind import BindingState, Select
@@ -19,15 +20,16 @@ from ....core.syn.syntax import VoidSyntax
 from ....core.tr.binding import (VoidBinding, RootBinding, FormulaBinding,
         LocateBinding, SelectionBinding, SieveBinding, AliasBinding,
         CollectBinding, FreeTableRecipe, ColumnRecipe)
-from ....core.tr.signature import IsEqualSig, AndSig, PlaceholderSig
+from ....core.tr.signature import IsEqualSig, AndSig, OrSig, PlaceholderSig
 from ....core.tr.decorate import decorate
 from ....core.tr.coerce import coerce
 from ....core.tr.lookup import prescribe
 from .command import MergeCmd
 from .insert import (BuildExtractNode, BuildExtractTable, BuildExecuteInsert,
-        BuildResolveIdentity, BuildResolveChain)
-from ..tr.dump import serialize_update
+        BuildResolveIdentity, BuildResolveChain, extract_batch)
+from ..tr.dump import serialize_update, serialize_update_many
 import itertools
+import collections
 
 
 class ExtractIdentityPipe:
@@ -196,6 +198,186 @@ class BuildResolveKey(Utility):
                               self.with_error)
 
 
+class ResolveKeyManyPipe:
+
+    def __init__(self, name, columns, domain, build, size, with_error,
+                 pipe_by_size=None):
+        self.name = name
+        self.columns = columns
+        # Makes a query that takes the given number of identities.
+        self.build = build
+        self.domain = domain
+        self.leaves = domain.leaves
+        self.size = size
+        self.with_error = with_error
+        self.pipe_by_size = dict(pipe_by_size or {})
+
+    def __call__(self, values):
+        raw_rows = []
+        for value in values:
+            assert value is not None
+            raw_values = []
+            for leaf in self.leaves:
+                raw_value = value
+                for idx in leaf:
+                    raw_value = raw_value[idx]
+                raw_values.append(raw_value)
+            raw_rows.append(tuple(raw_values))
+        width = len(self.leaves)
+        distinct_rows = list(collections.OrderedDict.fromkeys(raw_rows))
+        key_by_row = {}
+        for start in range(0, len(distinct_rows), self.size):
+            chunk = distinct_rows[start:start+self.size]
+            parameters = list(itertools.chain.from_iterable(chunk))
+            product = self.pipe_for(len(chunk))()(parameters)
+            for row in product.data:
+                key_by_row[tuple(row[:width])] = tuple(row[width:])
+        keys = []
+        for value, raw_row in zip(values, raw_rows):
+            key = key_by_row.get(raw_row)
+            if key is None and self.with_error:
+                quote = None
+                if self.name:
+                    quote = "%s[%s]" % (self.name, self.domain.dump(value))
+                else:
+                    quote = "[%s]" % self.domain.dump(value)
+                raise Error("Unable to find an entity", quote)
+            keys.append(key)
+        return keys
+
+    def pipe_for(self, size):
+        # The query for `size` identities; built on the first use.
+        if size not in self.pipe_by_size:
+            self.pipe_by_size[size] = self.build(size)
+        return self.pipe_by_size[size]
+
+
+class BuildResolveKeyMany(Utility):
+    """
+    Builds a pipe that maps a list of identities to the primary keys
+    of the respective records.
+
+    The records are fetched in batches of at most `size` identities with
+    one query per batch; the query takes as many identities as there are
+    in the batch.
+    """
+
+    def __init__(self, node, arcs, with_error=True, size=100):
+        assert isinstance(size, int) and size > 0
+        self.node = node
+        self.arcs = arcs
+        self.table = node.table
+        self.with_error = with_error
+        self.size = size
+
+    def __call__(self):
+        labels = relabel(TableArc(self.table))
+        name = labels[0].name if labels else None
+        columns = []
+        if self.table.primary_key is not None:
+            columns = self.table.primary_key.origin_columns
+        else:
+            for key in self.table.unique_keys:
+                if key.is_partial:
+                    continue
+                if all(not column.is_nullable
+                       for column in key.origin_columns):
+                    columns = key.origin_columns
+                    break
+        if not columns:
+            raise Error("Table does not have a primary key")
+        pipe, identity_domain = self.build(columns, 1)
+        build = (lambda size: self.build(columns, size)[0])
+        return ResolveKeyManyPipe(name, columns, identity_domain, build,
+                                  self.size, self.with_error, {1: pipe})
+
+    def build(self, columns, size):
+        # Translates a query that fetches the keys of `size` records
+        # by identity; also returns the identity domain.
+        syntax = VoidSyntax()
+        scope = RootBinding(syntax)
+        state = BindingState(scope)
+        seed = state.use(FreeTableRecipe(self.table), syntax)
+        column_by_link = {}
+        if self.arcs is not None:
+            for arc in self.arcs:
+                if isinstance(arc, ColumnArc) and arc.link is not None:
+                    column_by_link[arc.link] = arc
+        identity_arcs = localize(self.node)
+        if identity_arcs is None:
+            raise Error("Expected a table with identity")
+        def chain_arc(arc, scope):
+            recipe = prescribe(arc, scope)
+            binding = state.use(recipe, syntax, scope=scope)
+            identity_arcs = localize(arc.target)
+            if identity_arcs:
+                leaves = []
+                fields = []
+                for identity_arc in identity_arcs:
+                    arc_leaves, arc_field = chain_arc(identity_arc, binding)
+                    leaves.extend(arc_leaves)
+                    fields.append(arc_field)
+                return leaves, IdentityDomain(fields)
+            return [binding], binding.domain
+        def chain_identity(scope):
+            leaves = []
+            fields = []
+            for arc in identity_arcs:
+                if arc in column_by_link:
+                    arc = column_by_link[arc]
+                arc_leaves, arc_field = chain_arc(arc, scope)
+                leaves.extend(arc_leaves)
+                fields.append(arc_field)
+            return leaves, IdentityDomain(fields)
+        leaves, identity_domain = chain_identity(seed)
+        count = itertools.count()
+        conditions = []
+        for k in range(size):
+            equalities = []
+            for leaf in leaves:
+                item = FormulaBinding(seed,
+                                      PlaceholderSig(next(count)),
+                                      leaf.domain,
+                                      syntax)
+                equality = FormulaBinding(seed,
+                                          IsEqualSig(+1),
+                                          coerce(BooleanDomain()),
+                                          syntax,
+                                          lop=leaf,
+                                          rop=item)
+                equalities.append(equality)
+            if len(equalities) == 1:
+                [condition] = equalities
+            else:
+                condition = FormulaBinding(seed,
+                                           AndSig(),
+                                           coerce(BooleanDomain()),
+                                           syntax,
+                                           ops=equalities)
+            conditions.append(condition)
+        if len(conditions) == 1:
+            [condition] = conditions
+        else:
+            condition = FormulaBinding(seed,
+                                       OrSig(),
+                                       coerce(BooleanDomain()),
+                                       syntax,
+                                       ops=conditions)
+        scope = SieveBinding(seed, condition, syntax)
+        state.push_scope(scope)
+        elements, identity_domain = chain_identity(scope)
+        for column in columns:
+            binding = state.use(ColumnRecipe(column), syntax)
+            elements.append(binding)
+        fields = [decorate(element) for element in elements]
+        domain = RecordDomain(fields)
+        scope = SelectionBinding(scope, elements, domain, syntax)
+        binding = Select.__invoke__(scope, state)
+        domain = ListDomain(binding.domain)
+        binding = CollectBinding(state.root, binding, domain, syntax)
+        return translate(binding), identity_domain
+
+
 class ExecuteUpdatePipe:
 
     def __init__(self, table, input_columns, key_columns,
@@ -265,6 +447,100 @@ class BuildExecuteUpdate(Utility):
                                  returning_columns, sql)
 
 
+class ExecuteUpdateManyPipe:
+
+    def __init__(self, table, input_columns, key_columns,
+                 output_columns, size):
+        assert isinstance(table, TableEntity)
+        assert isinstance(input_columns, listof(ColumnEntity))
+        assert isinstance(key_columns, listof(ColumnEntity))
+        assert isinstance(output_columns, listof(ColumnEntity))
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.input_columns = input_columns
+        self.key_columns = key_columns
+        self.output_columns = output_columns
+        self.size = size
+        self.sql_by_size = {}
+        self.input_converts = [scramble(column.domain)
+                               for column in input_columns]
+        self.key_converts = [scramble(column.domain)
+                             for column in key_columns]
+        self.output_converts = [unscramble(column.domain)
+                                for column in output_columns]
+
+    def __call__(self, key_rows, rows):
+        assert len(key_rows) == len(rows)
+        key_rows = [tuple(convert(item)
+                          for item, convert in zip(key_row, self.key_converts))
+                    for key_row in key_rows]
+        rows = [tuple(convert(item)
+                      for item, convert in zip(row, self.input_converts))
+                for row in rows]
+        if not self.input_columns:
+            return key_rows
+        if not key_rows:
+            return []
+        if not context.env.can_write:
+            raise PermissionError("No write permissions")
+        width = len(self.key_columns)
+        output_by_key = {}
+        with transaction() as connection:
+            cursor = connection.cursor()
+            for start in range(0, len(rows), self.size):
+                chunk = [row+key_row
+                         for row, key_row
+                         in zip(rows[start:start+self.size],
+                                key_rows[start:start+self.size])]
+                parameters = tuple(itertools.chain.from_iterable(chunk))
+                cursor.execute(self.sql_for(len(chunk)), parameters)
+                for row in cursor.fetchall():
+                    output_by_key[tuple(row[:width])] = \
+                            tuple(convert(item)
+                                  for item, convert
+                                  in zip(row[width:], self.output_converts))
+        output_rows = []
+        for key_row in key_rows:
+            if key_row not in output_by_key:
+                raise Error("Unable to locate the updated row")
+            output_rows.append(output_by_key[key_row])
+        return output_rows
+
+    def sql_for(self, size):
+        # SQL for updating `size` records at once.
+        if size not in self.sql_by_size:
+            self.sql_by_size[size] = serialize_update_many(
+                    self.table, self.input_columns, self.key_columns,
+                    self.output_columns, size)
+        return self.sql_by_size[size]
+
+
+class BuildExecuteUpdateMany(Utility):
+    """
+    Builds a pipe that updates a list of records with
+    ``UPDATE ... FROM (VALUES ...)`` statements.
+
+    The pipe takes a list of primary keys and a list of rows with new
+    column values and returns the updated primary keys.
+    """
+
+    def __init__(self, table, columns, size=1000):
+        assert isinstance(table, TableEntity)
+        assert isinstance(columns, listof(ColumnEntity))
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.columns = columns
+        self.size = size
+
+    def __call__(self):
+        execute_update = BuildExecuteUpdate.__invoke__(self.table,
+                                                       self.columns)
+        return ExecuteUpdateManyPipe(self.table, self.columns,
+                                     execute_update.key_columns,
+                                     execute_update.output_columns,
+                                     self.size)
+
+
 class ProduceMerge(Act):
 
     adapt(MergeCmd, ProduceAction)
@@ -297,7 +573,14 @@ class ProduceMerge(Act):
             else:
                 records = [product.data]
                 record_domain = product.meta.domain
+            batch_size = context.app.tweak.etl.resolve_limit
             for idx, record in enumerate(records):
+                if batch_size and idx % batch_size == 0:
+                    rows = extract_batch(
+                            extract_node, records[idx:idx+batch_size])
+                    extract_table.preload(rows)
+                    extract_table_for_update.preload(
+                            [extract_identity(row)[1] for row in rows])
                 if record is None:
                     continue
                 try:
@@ -4,12 +4,14 @@
 
 
 from ....core.adapter import adapt
+from ....core.context import context
 from ....core.error import Error
 from ....core.connect import transaction
 from ....core.domain import Product
 from ....core.cmd.act import Act, ProduceAction, act
 from .command import UpdateCmd
-from .insert import BuildExtractNode, BuildExtractTable, BuildResolveIdentity
+from .insert import (BuildExtractNode, BuildExtractTable, BuildResolveIdentity,
+        extract_batch)
 from .merge import BuildResolveKey, BuildExecuteUpdate
 
 
@@ -40,7 +42,14 @@ class ProduceUpdate(Act):
             else:
                 records = [product.data]
                 record_domain = product.meta.domain
+            batch_size = context.app.tweak.etl.resolve_limit
             for idx, record in enumerate(records):
+                if batch_size and idx % batch_size == 0:
+                    extract_table.preload(
+                            [row for key_id, row
+                                 in extract_batch(
+                                    extract_node,
+                                    records[idx:idx+batch_size])])
                 if record is None:
                     continue
                 try:
@@ -195,6 +195,254 @@ class SerializeTruncate(Utility, DumpBase):
         return self.stream.flush()
 
 
+class SerializeInsertMany(Utility, DumpBase):
+
+    def __init__(self, table, columns, returning_columns, size):
+        assert isinstance(table, TableEntity)
+        assert isinstance(columns, listof(ColumnEntity)) and columns
+        assert isinstance(returning_columns, maybe(listof(ColumnEntity)))
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.columns = columns
+        self.returning_columns = returning_columns
+        self.size = size
+        self.state = SerializingState()
+        self.stream = self.state.stream
+
+    def __call__(self):
+        self.dump_insert()
+        self.dump_columns()
+        self.dump_values()
+        if self.returning_columns:
+            self.dump_returning()
+        return self.stream.flush()
+
+    def dump_insert(self):
+        if self.table.schema.name:
+            self.format("INSERT INTO {schema:name}.{table:name}",
+                        schema=self.table.schema.name,
+                        table=self.table.name)
+        else:
+            self.format("INSERT INTO {table:name}",
+                        table=self.table.name)
+
+    def dump_columns(self):
+        self.write(" (")
+        for idx, column in enumerate(self.columns):
+            self.format("{column:name}", column=column.name)
+            if idx < len(self.columns)-1:
+                self.write(", ")
+        self.write(")")
+
+    def dump_values(self):
+        self.newline()
+        self.write("VALUES ")
+        self.indent()
+        for row_idx in range(self.size):
+            if row_idx > 0:
+                self.newline()
+            self.write("(")
+            for idx, column in enumerate(self.columns):
+                self.format("{index:placeholder}", index=None)
+                if idx < len(self.columns)-1:
+                    self.write(", ")
+            self.write(")")
+            if row_idx < self.size-1:
+                self.write(",")
+        self.dedent()
+
+    def dump_returning(self):
+        self.newline()
+        self.write("RETURNING ")
+        for idx, column in enumerate(self.returning_columns):
+            self.format("{column:name}", column=column.name)
+            if idx < len(self.returning_columns)-1:
+                self.write(", ")
+
+
+class SerializeUpdateMany(Utility, DumpBase):
+    # Generates:
+    #   UPDATE <table>
+    #   SET <column> = "v"."_1", ...
+    #   FROM (SELECT <column>, ..., <key>, ... FROM <table> WHERE FALSE
+    #         UNION ALL
+    #         VALUES (?, ..., ?, ...), ...) AS "v" ("_1", ...)
+    #   WHERE <table>.<key> = "v"."_N" AND ...
+    #   RETURNING "v"."_N", ..., <table>.<returning>, ...
+    # The empty subquery gives the values the types of the table columns.
+
+    def __init__(self, table, columns, key_columns, returning_columns, size):
+        assert isinstance(table, TableEntity)
+        assert isinstance(columns, listof(ColumnEntity)) and columns
+        assert isinstance(key_columns, listof(ColumnEntity)) and key_columns
+        assert isinstance(returning_columns, maybe(listof(ColumnEntity)))
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.columns = columns
+        self.key_columns = key_columns
+        self.returning_columns = returning_columns
+        self.size = size
+        self.aliases = ["_%s" % (idx+1)
+                        for idx in range(len(columns)+len(key_columns))]
+        self.state = SerializingState()
+        self.stream = self.state.stream
+
+    def __call__(self):
+        self.dump_update()
+        self.dump_columns()
+        self.dump_values()
+        self.dump_keys()
+        if self.returning_columns:
+            self.dump_returning()
+        return self.stream.flush()
+
+    def dump_table(self):
+        if self.table.schema.name:
+            self.format("{schema:name}.{table:name}",
+                        schema=self.table.schema.name,
+                        table=self.table.name)
+        else:
+            self.format("{table:name}",
+                        table=self.table.name)
+
+    def dump_update(self):
+        self.write("UPDATE ")
+        self.dump_table()
+
+    def dump_columns(self):
+        self.newline()
+        self.write("SET ")
+        self.indent()
+        for idx, column in enumerate(self.columns):
+            if idx > 0:
+                self.newline()
+            self.format("{column:name} = {value:name}.{alias:name}",
+                        column=column.name, value="v",
+                        alias=self.aliases[idx])
+            if idx < len(self.columns)-1:
+                self.write(",")
+        self.dedent()
+
+    def dump_values(self):
+        columns = self.columns+self.key_columns
+        self.newline()
+        self.write("FROM (")
+        self.indent()
+        self.write("SELECT ")
+        for idx, column in enumerate(columns):
+            self.format("{column:name}", column=column.name)
+            if idx < len(columns)-1:
+                self.write(", ")
+        self.newline()
+        self.write("FROM ")
+        self.dump_table()
+        self.newline()
+        self.write("WHERE FALSE")
+        self.newline()
+        self.write("UNION ALL")
+        self.newline()
+        self.write("VALUES ")
+        self.indent()
+        for row_idx in range(self.size):
+            if row_idx > 0:
+                self.newline()
+            self.write("(")
+            for idx, column in enumerate(columns):
+                self.format("{index:placeholder}", index=None)
+                if idx < len(columns)-1:
+                    self.write(", ")
+            self.write(")")
+            if row_idx < self.size-1:
+                self.write(",")
+        self.dedent()
+        self.write(")")
+        self.dedent()
+        self.format(" AS {value:name} (", value="v")
+        for idx, alias in enumerate(self.aliases):
+            self.format("{alias:name}", alias=alias)
+            if idx < len(self.aliases)-1:
+                self.write(", ")
+        self.write(")")
+
+    def dump_keys(self):
+        self.newline()
+        self.write("WHERE ")
+        offset = len(self.columns)
+        for idx, column in enumerate(self.key_columns):
+            if idx > 0:
+                self.write(" AND ")
+            self.format("{table:name}.{column:name}"
+                        " = {value:name}.{alias:name}",
+                        table=self.table.name, column=column.name,
+                        value="v", alias=self.aliases[offset+idx])
+
+    def dump_returning(self):
+        self.newline()
+        self.write("RETURNING ")
+        offset = len(self.columns)
+        for idx, column in enumerate(self.key_columns):
+            self.format("{value:name}.{alias:name}, ",
+                        value="v", alias=self.aliases[offset+idx])
+        for idx, column in enumerate(self.returning_columns):
+            self.format("{table:name}.{column:name}",
+                        table=self.table.name, column=column.name)
+            if idx < len(self.returning_columns)-1:
+                self.write(", ")
+
+
+class SerializeDeleteMany(Utility, DumpBase):
+
+    def __init__(self, table, key_columns, size):
+        assert isinstance(table, TableEntity)
+        assert isinstance(key_columns, listof(ColumnEntity)) and key_columns
+        assert isinstance(size, int) and size > 0
+        self.table = table
+        self.key_columns = key_columns
+        self.size = size
+        self.state = SerializingState()
+        self.stream = self.state.stream
+
+    def __call__(self):
+        self.dump_delete()
+        self.dump_keys()
+        return self.stream.flush()
+
+    def dump_delete(self):
+        if self.table.schema.name:
+            self.format("DELETE FROM {schema:name}.{table:name}",
+                        schema=self.table.schema.name,
+                        table=self.table.name)
+        else:
+            self.format("DELETE FROM {table:name}",
+                        table=self.table.name)
+
+    def dump_keys(self):
+        is_row = (len(self.key_columns) > 1)
+        self.newline()
+        self.write("WHERE ")
+        if is_row:
+            self.write("(")
+        for idx, column in enumerate(self.key_columns):
+            self.format("{column:name}", column=column.name)
+            if idx < len(self.key_columns)-1:
+                self.write(", ")
+        if is_row:
+            self.write(")")
+        self.write(" IN (")
+        for row_idx in range(self.size):
+            if is_row:
+                self.write("(")
+            for idx, column in enumerate(self.key_columns):
+                self.format("{index:placeholder}", index=None)
+                if idx < len(self.key_columns)-1:
+                    self.write(", ")
+            if is_row:
+                self.write(")")
+            if row_idx < self.size-1:
+                self.write(", ")
+        self.write(")")
+
+
 def serialize_insert(table, columns, returning_columns):
     return SerializeInsert.__invoke__(table, columns, returning_columns)
 
@@ -212,3 +460,18 @@ def serialize_truncate(table):
     return SerializeTruncate.__invoke__(table)
 
 
+def serialize_insert_many(table, columns, returning_columns, size):
+    return SerializeInsertMany.__invoke__(table, columns, returning_columns,
+                                          size)
+
+
+def serialize_update_many(table, columns, key_columns, returning_columns,
+                          size):
+    return SerializeUpdateMany.__invoke__(table, columns, key_columns,
+                                          returning_columns, size)
+
+
+def serialize_delete_many(table, key_columns, size):
+    return SerializeDeleteMany.__invoke__(table, key_columns, size)
+
+
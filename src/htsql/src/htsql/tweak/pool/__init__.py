@@ -4,8 +4,12 @@
 
 
 from . import connect
-from ...core.addon import Addon
-import threading
+from .connect import ConnectionPool
+from ...core.addon import Addon, Parameter
+from ...core.validator import UIntVal, PIntVal, BoolVal
+from ...core.connect import Connect
+from ...core.error import Error
+from ...core.context import context
 
 
 class TweakPoolAddon(Addon):
@@ -15,11 +19,90 @@ class TweakPoolAddon(Addon):
     help = """
     This addon caches database connections so that a single
     connection could be used to execute more than one query.
+
+    Parameter `min_size` sets the number of connections opened on
+    startup and kept open when idle; connections that are closed
+    are replaced with new ones.
+
+    Parameter `max_size` limits the number of open connections; when
+    all of them are busy, a request waits for a free connection up to
+    `timeout` seconds.
+
+    Parameters `max_lifetime` and `max_idle` make the pool recycle
+    connections older than, or idle for longer than, the given number
+    of seconds.
+
+    Parameter `pre_ping`, if set, makes the pool verify that an idle
+    connection is alive before reusing it.
+
+    Autocommit connections are kept in a separate pool with the same
+    configuration.
     """
 
+    parameters = [
+            Parameter('min_size', UIntVal(), default=0,
+                      value_name="N",
+                      hint="""min. number of open connections"""),
+            Parameter('max_size', PIntVal(is_nullable=True), default=None,
+                      value_name="N",
+                      hint="""max. number of open connections"""),
+            Parameter('timeout', PIntVal(), default=30,
+                      value_name="SEC",
+                      hint="""max. time to wait for a connection"""),
+            Parameter('max_lifetime', PIntVal(is_nullable=True),
+                      default=None,
+                      value_name="SEC",
+                      hint="""recycle connections older than this"""),
+            Parameter('max_idle', PIntVal(is_nullable=True), default=None,
+                      value_name="SEC",
+                      hint="""close connections idle longer than this"""),
+            Parameter('pre_ping', BoolVal(), default=False,
+                      hint="""check connections before reusing them"""),
+    ]
+
+    # Statements that verify a connection, for the engines that do not
+    # accept the default `SELECT 1`.
+    ping_sql_by_engine = {
+            'oracle': "SELECT 1 FROM DUAL",
+    }
+
     def __init__(self, app, attributes):
         super(TweakPoolAddon, self).__init__(app, attributes)
-        self.lock = threading.Lock()
-        self.items = []
+        ping_sql = "SELECT 1"
+        if app.htsql.db is not None:
+            ping_sql = self.ping_sql_by_engine.get(app.htsql.db.engine,
+                                                   ping_sql)
+        self.pools = {}
+        for with_autocommit in [False, True]:
+            self.pools[with_autocommit] = ConnectionPool(
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    timeout=self.timeout,
+                    max_lifetime=self.max_lifetime,
+                    max_idle=self.max_idle,
+                    pre_ping=self.pre_ping,
+                    ping_sql=ping_sql)
+
+    def validate(self):
+        if (self.max_size is not None and self.min_size > self.max_size):
+            raise ValueError("min_size must not exceed max_size")
+        if self.min_size and context.app.htsql.db is not None:
+            for with_autocommit in sorted(self.pools):
+                pool = self.pools[with_autocommit]
+                try:
+                    make = Connect.__prepare__(with_autocommit).make
+                    pool.replenish(make)
+                except Error as exc:
+                    raise ValueError("failed to open a database"
+                                     " connection: %s" % exc)
+
+    def stats(self):
+        """
+        Returns counters of the transactional and the autocommit pools.
+        """
+        return {
+                'transaction': self.pools[False].stats(),
+                'autocommit': self.pools[True].stats(),
+        }
 
 
@@ -5,7 +5,233 @@
 
 from ...core.adapter import rank
 from ...core.context import context
-from ...core.connect import Connect
+from ...core.connect import Connect, ConnectionProxy, DBErrorGuard
+from ...core.error import Error
+import threading
+import time
+
+
+class PoolConnectionProxy(ConnectionProxy):
+    """
+    A connection that returns itself to the pool when released.
+    """
+
+    def __init__(self, connection, guard, pool, open):
+        super(PoolConnectionProxy, self).__init__(connection, guard)
+        self.pool = pool
+        self.open = open
+        self.created_at = self.released_at = time.monotonic()
+
+    def release(self):
+        super(PoolConnectionProxy, self).release()
+        self.pool.checkin(self)
+
+
+class ConnectionPool:
+    """
+    A bounded pool of database connections.
+
+    `min_size`
+        The number of connections to keep open even when they are idle.
+
+    `max_size`
+        The maximum number of open connections; ``None`` means no limit.
+
+    `timeout`
+        How long to wait for a free connection, in seconds.
+
+    `max_lifetime`
+        If set, connections older than this (in seconds) are recycled.
+
+    `max_idle`
+        If set, connections idle longer than this (in seconds) are closed.
+
+    `pre_ping`
+        If set, verify that an idle connection is alive before reusing it.
+
+    `ping_sql`
+        The statement that verifies a connection.
+    """
+
+    def __init__(self, min_size=0, max_size=None, timeout=30,
+                 max_lifetime=None, max_idle=None, pre_ping=False,
+                 ping_sql="SELECT 1"):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.pre_ping = pre_ping
+        self.ping_sql = ping_sql
+        self.condition = threading.Condition()
+        # Released connections, the most recently used one is the last.
+        self.idle = []
+        # The number of open connections (idle, busy or being opened).
+        self.size = 0
+        self.waits = 0
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+
+    def checkout(self, open):
+        """
+        Returns a free connection; uses `open` to make a new one.
+        """
+        self.refill(open)
+        deadline = None
+        has_waited = False
+        while True:
+            connection = None
+            with self.condition:
+                self.expire()
+                while not self.idle and self.is_full():
+                    now = time.monotonic()
+                    if deadline is None:
+                        deadline = now + self.timeout
+                    if now >= deadline:
+                        raise Error("Timed out waiting for"
+                                    " a database connection")
+                    if not has_waited:
+                        self.waits += 1
+                        has_waited = True
+                    self.condition.wait(deadline - now)
+                    self.expire()
+                if self.idle:
+                    connection = self.idle.pop()
+                else:
+                    self.size += 1
+            if connection is None:
+                try:
+                    connection = open(self)
+                except:
+                    with self.condition:
+                        self.size -= 1
+                        self.condition.notify()
+                    raise
+                with self.condition:
+                    self.created += 1
+                    self.checkouts += 1
+                return connection
+            if self.pre_ping and not self.ping(connection):
+                self.discard(connection)
+                continue
+            connection.acquire()
+            with self.condition:
+                self.checkouts += 1
+            return connection
+
+    def checkin(self, connection):
+        """
+        Returns a released connection to the pool.
+        """
+        now = time.monotonic()
+        if (not connection.is_valid or
+                (self.max_lifetime is not None and
+                    now - connection.created_at >= self.max_lifetime)):
+            self.discard(connection)
+            return
+        with self.condition:
+            connection.released_at = now
+            self.idle.append(connection)
+            self.condition.notify()
+
+    def discard(self, connection):
+        # Closes the connection and frees its slot.
+        self.close(connection)
+        with self.condition:
+            self.size -= 1
+            self.discarded += 1
+            self.condition.notify()
+        self.refill(connection.open)
+
+    def replenish(self, open):
+        """
+        Opens new connections till the pool has `min_size` of them.
+        """
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            try:
+                connection = open(self)
+            except:
+                with self.condition:
+                    self.size -= 1
+                    self.condition.notify()
+                raise
+            with self.condition:
+                self.created += 1
+            connection.release()
+
+    def refill(self, open):
+        # Restores `min_size` connections after some were closed; errors
+        # are ignored since the connections are not needed right away.
+        if self.size < self.min_size:
+            try:
+                self.replenish(open)
+            except Error:
+                pass
+
+    def expire(self):
+        # Closes idle connections that outlived their lifetime or idle
+        # timeout.  Must be called with the lock held.
+        if self.max_lifetime is None and self.max_idle is None:
+            return
+        now = time.monotonic()
+        for connection in self.idle[:]:
+            if (self.max_lifetime is not None and
+                    now - connection.created_at >= self.max_lifetime):
+                pass
+            elif (self.max_idle is not None and
+                    now - connection.released_at >= self.max_idle and
+                    self.size > self.min_size):
+                pass
+            else:
+                continue
+            self.idle.remove(connection)
+            self.size -= 1
+            self.discarded += 1
+            self.close(connection)
+
+    def close(self, connection):
+        # Closes the connection ignoring any errors.
+        connection.is_valid = False
+        try:
+            with connection.guard:
+                connection.connection.close()
+        except Error:
+            pass
+
+    def is_full(self):
+        return (self.max_size is not None and self.size >= self.max_size)
+
+    def ping(self, connection):
+        # Checks if the connection is still alive.
+        try:
+            cursor = connection.cursor()
+            cursor.execute(self.ping_sql)
+            cursor.fetchall()
+            cursor.close()
+            connection.rollback()
+        except Error:
+            connection.invalidate()
+            return False
+        return True
+
+    def stats(self):
+        """
+        Returns the pool counters.
+        """
+        with self.condition:
+            return {
+                    'size': self.size,
+                    'idle': len(self.idle),
+                    'waits': self.waits,
+                    'checkouts': self.checkouts,
+                    'created': self.created,
+                    'discarded': self.discarded,
+            }
 
 
 class PoolConnect(Connect):
@@ -13,19 +239,15 @@ class PoolConnect(Connect):
     rank(1.0)
 
     def __call__(self):
-        if self.with_autocommit:
-            return super(PoolConnect, self).__call__()
         addon = context.app.tweak.pool
-        with addon.lock:
-            for connection in addon.items[:]:
-                if not connection.is_valid:
-                    addon.items.remove(connection)
-            for connection in addon.items:
-                if not connection.is_busy:
-                    connection.acquire()
-                    return connection
-            connection = super(PoolConnect, self).__call__()
-            addon.items.append(connection)
-            return connection
+        pool = addon.pools[self.with_autocommit]
+        return pool.checkout(self.make)
+
+    def make(self, pool):
+        # Opens a new connection owned by the pool.
+        guard = DBErrorGuard()
+        with guard:
+            connection = self.open()
+        return PoolConnectionProxy(connection, guard, pool, self.make)
 
 
@@ -4,7 +4,8 @@
 
 
 from . import connect, introspect, split_sql, tr
-from htsql.core.addon import Addon
+from htsql.core.addon import Addon, Parameter
+from htsql.core.validator import StrVal
 
 
 class EnginePGSQLAddon(Addon):
@@ -17,9 +18,18 @@ class EnginePGSQLAddon(Addon):
 
     This extension is loaded automatically when the engine of the
     database URI is set to `pgsql`.
+
+    Optional parameter `catalog-cache` specifies a file where the
+    introspected database catalog is saved.  On startup, the catalog
+    is loaded from this file unless the database schema has changed.
     """
     packages = ['.', '.tr']
 
+    parameters = [
+            Parameter('catalog_cache', StrVal(),
+                hint="""persistent catalog snapshot"""),
+    ]
+
     def __init__(self, app, attributes):
         if app.htsql.db.engine != 'pgsql':
             raise ImportError("pgsql engine is expected")
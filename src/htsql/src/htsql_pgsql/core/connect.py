@@ -6,8 +6,9 @@
 from htsql.core.adapter import adapt
 from htsql.core.domain import TextDomain, EnumDomain
 from htsql.core.connect import (Connect, UnscrambleError, Unscramble,
-        Scramble)
+        Scramble, StreamCursor, CursorProxy)
 from htsql.core.context import context
+import itertools
 import psycopg2, psycopg2.extensions
 
 
@@ -51,6 +52,23 @@ class ConnectPGSQL(Connect):
         return connection
 
 
+class StreamCursorPGSQL(StreamCursor):
+    """
+    Opens a server-side (named) cursor for fetching large results.
+    """
+
+    # Generates unique cursor names.
+    names = itertools.count(1)
+
+    def __call__(self):
+        guard = self.connection.guard
+        with guard:
+            name = "htsql_stream_%s" % next(self.names)
+            cursor = self.connection.connection.cursor(name)
+            cursor.itersize = self.size
+        return CursorProxy(cursor, guard)
+
+
 class UnscramblePGSQLError(UnscrambleError):
 
     def __call__(self):
@@ -3,7 +3,8 @@
 #
 
 
-from htsql.core.adapter import Protocol, call
+from htsql.core.adapter import Protocol, call, rank
+from htsql.core.context import context
 from htsql.core.introspect import Introspect
 from htsql.core.entity import make_catalog
 from htsql.core.domain import (BooleanDomain, IntegerDomain, FloatDomain,
@@ -13,6 +14,9 @@ from htsql.core.domain import (BooleanDomain, IntegerDomain, FloatDomain,
 from htsql.core.connect import connect
 import itertools
 import fnmatch
+import os
+import pickle
+import tempfile
 
 
 class IntrospectPGSQL(Introspect):
@@ -172,6 +176,146 @@ class IntrospectPGSQL(Introspect):
         return catalog
 
 
+class IntrospectPGSQLSnapshot(Introspect):
+    # Saves the introspected catalog to a file; on startup, loads it back
+    # if the database schema is not changed.
+
+    rank(1.0)
+
+    # Bump when the format of the snapshot changes.
+    version = 1
+
+    def __call__(self):
+        path = context.app.engine.pgsql.catalog_cache
+        if path is None:
+            return super(IntrospectPGSQLSnapshot, self).__call__()
+        fingerprint = self.fingerprint()
+        catalog = self.load(path, fingerprint)
+        if catalog is None:
+            catalog = super(IntrospectPGSQLSnapshot, self).__call__()
+            self.save(path, fingerprint, catalog)
+        return catalog
+
+    def fingerprint(self):
+        # Generates a value that changes whenever the database schema
+        # changes.  Any DDL statement, including `GRANT`, updates `xmin`
+        # of the affected rows in the system tables.
+        connection = connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT MD5(ARRAY_TO_STRING(ARRAY(
+                    SELECT s.x
+                    FROM (
+                        SELECT 'n' || n.oid || ':' || n.xmin AS x
+                        FROM pg_catalog.pg_namespace n
+                        UNION ALL
+                        SELECT 'c' || c.oid || ':' || c.xmin
+                        FROM pg_catalog.pg_class c
+                        WHERE c.relkind IN ('r', 'v')
+                        UNION ALL
+                        SELECT 'a' || a.attrelid || '.' || a.attnum ||
+                               ':' || a.xmin
+                        FROM pg_catalog.pg_attribute a
+                        JOIN pg_catalog.pg_class c ON (a.attrelid = c.oid)
+                        WHERE c.relkind IN ('r', 'v')
+                        UNION ALL
+                        SELECT 't' || t.oid || ':' || t.xmin
+                        FROM pg_catalog.pg_type t
+                        UNION ALL
+                        SELECT 'e' || e.oid || ':' || e.xmin
+                        FROM pg_catalog.pg_enum e
+                        UNION ALL
+                        SELECT 'k' || k.oid || ':' || k.xmin
+                        FROM pg_catalog.pg_constraint k
+                    ) AS s
+                    ORDER BY s.x), ' ')),
+                    CURRENT_USER, CURRENT_SCHEMAS(TRUE)
+            """)
+            digest, user, search_path = cursor.fetchone()
+        finally:
+            connection.release()
+        addons = [addon.name for addon in context.app.addons]
+        return (self.version, digest, user, tuple(search_path),
+                tuple(addons))
+
+    def load(self, path, fingerprint):
+        # Loads the catalog from the snapshot; returns `None` if the snapshot
+        # is missing or obsolete.
+        try:
+            with open(path, 'rb') as stream:
+                snapshot_fingerprint, schema_images, foreign_key_images = \
+                        pickle.load(stream)
+        except Exception:
+            return None
+        if snapshot_fingerprint != fingerprint:
+            return None
+        catalog = make_catalog()
+        for schema_name, priority, table_images in schema_images:
+            schema = catalog.add_schema(schema_name, priority)
+            for table_name, column_images, unique_key_images in table_images:
+                table = schema.add_table(table_name)
+                for name, domain, is_nullable, has_default in column_images:
+                    table.add_column(name, domain, is_nullable, has_default)
+                for names, is_primary, is_partial in unique_key_images:
+                    columns = [table[name] for name in names]
+                    table.add_unique_key(columns, is_primary, is_partial)
+        for (schema_name, table_name, names,
+             target_schema_name, target_table_name, target_names,
+             is_partial) in foreign_key_images:
+            table = catalog[schema_name][table_name]
+            target_table = catalog[target_schema_name][target_table_name]
+            columns = [table[name] for name in names]
+            target_columns = [target_table[name] for name in target_names]
+            table.add_foreign_key(columns, target_table, target_columns,
+                                  is_partial)
+        return catalog
+
+    def save(self, path, fingerprint, catalog):
+        # Saves the catalog to the snapshot file.
+        schema_images = []
+        foreign_key_images = []
+        for schema in catalog:
+            table_images = []
+            for table in schema:
+                column_images = [(column.name, column.domain,
+                                  column.is_nullable, column.has_default)
+                                 for column in table]
+                unique_key_images = [([column.name
+                                       for column in key.origin_columns],
+                                      key.is_primary, key.is_partial)
+                                     for key in table.unique_keys]
+                table_images.append((table.name, column_images,
+                                     unique_key_images))
+                for key in table.foreign_keys:
+                    foreign_key_images.append(
+                            (schema.name, table.name,
+                             [column.name for column in key.origin_columns],
+                             key.target.schema.name, key.target.name,
+                             [column.name for column in key.target_columns],
+                             key.is_partial))
+            schema_images.append((schema.name, schema.priority, table_images))
+        # Write to a temporary file first so that concurrently starting
+        # processes never see an incomplete snapshot.
+        # A failure to save the snapshot must not prevent the application
+        # from starting.
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            fd, temporary_path = tempfile.mkstemp(dir=directory)
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as stream:
+                pickle.dump((fingerprint, schema_images, foreign_key_images),
+                            stream, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, path)
+        except Exception:
+            pass
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+
 class IntrospectPGSQLDomain(Protocol):
 
     @classmethod
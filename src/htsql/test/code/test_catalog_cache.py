@@ -0,0 +1,56 @@
+
+from htsql import HTSQL
+from htsql.core.connect import connect
+from htsql.core.introspect import introspect
+import os
+import shutil
+import tempfile
+
+db = __pbbt__['sandbox'].db
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, 'catalog.pickle')
+
+def make_app():
+    return HTSQL(db, {'engine.pgsql': {'catalog_cache': path}})
+
+def execute(app, sql):
+    with app:
+        connection = connect()
+        cursor = connection.cursor()
+        cursor.execute(sql)
+        connection.commit()
+        connection.release()
+
+def has_table(app, name):
+    with app:
+        return any(table.name == name
+                   for schema in introspect()
+                   for table in schema)
+
+app = make_app()
+print("Snapshot is saved:", os.path.exists(path))
+print("No temporary files are left:", os.listdir(directory))
+inode = os.stat(path).st_ino
+
+app = make_app()
+print("Snapshot is reused:", os.stat(path).st_ino == inode)
+
+execute(app, "CREATE TABLE catalog_cache_test (id INTEGER PRIMARY KEY)")
+app = make_app()
+print("Snapshot is replaced after a schema change:",
+      os.stat(path).st_ino != inode)
+print("New table is found:", has_table(app, 'catalog_cache_test'))
+inode = os.stat(path).st_ino
+
+with open(path, 'wb') as stream:
+    stream.write(b"corrupted")
+app = make_app()
+print("Corrupted snapshot is replaced:", os.stat(path).st_ino != inode)
+print("New table is found:", has_table(app, 'catalog_cache_test'))
+
+execute(app, "DROP TABLE catalog_cache_test")
+app = make_app()
+print("Dropped table is not found:", not has_table(app, 'catalog_cache_test'))
+
+shutil.rmtree(directory)
@@ -0,0 +1,63 @@
+from htsql import HTSQL
+from htsql.core.connect import connect
+from htsql.core.error import Error
+from htsql.tweak.etl.cmd import insert
+
+db = __pbbt__['sandbox'].db
+
+def execute(sql):
+    with HTSQL(db):
+        connection = connect()
+        cursor = connection.cursor()
+        cursor.execute(sql)
+        connection.commit()
+        connection.release()
+
+execute("""
+    CREATE TABLE etl_line (
+        code VARCHAR(8) NOT NULL PRIMARY KEY);
+    CREATE TABLE etl_item (
+        code VARCHAR(8) NOT NULL PRIMARY KEY,
+        etl_line_code VARCHAR(8) NOT NULL REFERENCES etl_line(code));
+    INSERT INTO etl_line (code) VALUES ('a'), ('b'), ('c');
+""")
+
+# Count the link values that were not preloaded and had to be resolved
+# with a query of their own.
+lookups = []
+init = insert.ResolveChainPipe.__init__
+def counting_init(self, name, columns, domain, pipe, *args, **kwds):
+    def counting_pipe():
+        lookups.append(name)
+        return pipe()
+    init(self, name, columns, domain, counting_pipe, *args, **kwds)
+insert.ResolveChainPipe.__init__ = counting_init
+
+def insert_items(resolve_limit, uri):
+    app = HTSQL(db, {'tweak.etl': {'resolve_limit': resolve_limit}})
+    del lookups[:]
+    print("Resolve limit:", resolve_limit)
+    try:
+        product = app.produce(uri)
+    except Error as exc:
+        print("Error:", exc.paragraphs[0])
+    else:
+        print("Inserted:", ", ".join(str(item) for item in product.data))
+    print("Links resolved one by one:", len(lookups))
+
+try:
+    # The links are preloaded in batches of `resolve_limit` records.
+    insert_items(2, "/etl_line{'x'+code :as code, id() :as etl_line}"
+                    " :as etl_item/:insert")
+    # Without the limit, every link is resolved separately.
+    insert_items(None, "/etl_line{'y'+code :as code, id() :as etl_line}"
+                       " :as etl_item/:insert")
+    # A missing link is not preloaded and is reported as before.
+    insert_items(2, "/{'z1' :as code, 'zzz' :as etl_line}"
+                    " :as etl_item/:insert")
+finally:
+    insert.ResolveChainPipe.__init__ = init
+    execute("""
+        DROP TABLE etl_item;
+        DROP TABLE etl_line;
+    """)
@@ -0,0 +1,86 @@
+
+from htsql import HTSQL
+from htsql.core.connect import DBErrorGuard
+from htsql.core.error import Error
+from htsql.tweak.pool.connect import ConnectionPool, PoolConnectionProxy
+import threading
+import time
+
+
+class DummyConnection:
+    # Imitates a DBAPI connection.
+
+    def close(self):
+        pass
+
+
+def make(pool):
+    return PoolConnectionProxy(DummyConnection(), DBErrorGuard(), pool, make)
+
+
+def show(title, pool):
+    stats = pool.stats()
+    print("%s: size=%s, idle=%s, created=%s, discarded=%s"
+          % (title, stats['size'], stats['idle'], stats['created'],
+             stats['discarded']))
+
+
+pool = ConnectionPool(min_size=2, max_size=3, timeout=1)
+
+pool.replenish(make)
+show("Prewarmed", pool)
+
+connections = [pool.checkout(make) for k in range(3)]
+show("All connections are busy", pool)
+
+start = time.monotonic()
+try:
+    pool.checkout(make)
+except Error as exc:
+    print(exc)
+print("Waited for the timeout:", time.monotonic()-start >= 1)
+print("Waits:", pool.stats()['waits'])
+
+waiting = []
+thread = threading.Thread(target=lambda: waiting.append(pool.checkout(make)))
+thread.start()
+time.sleep(0.1)
+released = connections.pop()
+released.release()
+thread.join()
+print("Got the released connection:", waiting == [released])
+connections.extend(waiting)
+
+for connection in connections:
+    connection.release()
+show("All connections are idle", pool)
+
+connections = [pool.checkout(make) for k in range(2)]
+for connection in connections:
+    connection.invalidate()
+    connection.release()
+show("Discarded two connections", pool)
+
+
+class DummyCursor:
+    # Records the statements executed to verify a connection.
+
+    def execute(self, statement):
+        pings.append(statement)
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+DummyConnection.cursor = lambda self: DummyCursor()
+DummyConnection.rollback = lambda self: None
+
+pings = []
+pool = ConnectionPool(pre_ping=True, ping_sql="SELECT 1 FROM DUAL")
+with HTSQL(__pbbt__["demo"].db):
+    pool.checkout(make).release()
+    pool.checkout(make).release()
+print("Verified with:", pings)
@@ -0,0 +1,51 @@
+
+from htsql import HTSQL
+from htsql.core.introspect import introspect
+from htsql.core.cmd.summon import recognize
+from htsql.core.tr.translate import translate, get_cache_stats
+
+db = __pbbt__['demo'].db
+
+htsql = HTSQL(db, {'htsql': {'query_cache_size': 2}})
+
+def show(title):
+    with htsql:
+        stats = get_cache_stats()
+    print(title)
+    for name in ['command', 'query', 'plan']:
+        print("  %s: size=%s, hits=%s, misses=%s"
+              % (name, stats[name]['size'], stats[name]['hits'],
+                 stats[name]['misses']))
+
+show("Initial state:")
+
+htsql.produce("/school")
+show("After the first request:")
+
+htsql.produce("/school")
+show("After a repeated request:")
+
+htsql.produce("/school?code=$code", code='art')
+htsql.produce("/school?code=$code", code='bus')
+show("After requests with different parameters:")
+
+htsql.produce("/school")
+show("After an evicted request:")
+
+with htsql:
+    translate("/school")
+    translate("/school")
+show("After translating the query text:")
+
+
+with htsql:
+    catalog = introspect()
+    command = recognize("/school")
+    cache = htsql.htsql.cache
+    for key in list(cache.values):
+        if isinstance(key, tuple) and key[-1] == 'introspect':
+            del cache.values[key]
+with htsql:
+    print("Catalog is replaced:", introspect() is not catalog)
+    print("Command is recognized again:", recognize("/school") is not command)
+show("After the catalog is replaced:")
@@ -0,0 +1,43 @@
+
+from htsql import HTSQL
+from wsgiref.util import setup_testing_defaults
+
+db = __pbbt__['demo'].db
+
+htsql = HTSQL(db, {'htsql': {'stream_size': 3}})
+
+def request(uri):
+    path_info, _, query_string = uri.partition('?')
+    environ = {}
+    setup_testing_defaults(environ)
+    environ['PATH_INFO'] = path_info
+    environ['QUERY_STRING'] = query_string
+    statuses = []
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+    # The rows are fetched while the body is being consumed, in chunks
+    # of `stream_size` rows.
+    body = b"".join(htsql(environ, start_response)).decode('utf-8')
+    print("URI:", uri)
+    print("Status:", statuses[0])
+    return body
+
+body = request("/school{code, campus}?campus='old'/:json")
+print(body.strip())
+print()
+
+body = request("/school{code, campus}?campus='old'/:html")
+for line in body.splitlines():
+    if line.startswith("<tr class="):
+        print(line)
+
+
+# A stream created inside a transaction must not hold on to its
+# connection, which is released before the rows are fetched.
+from htsql.core.connect import transaction
+from htsql.core.cmd.act import stream_produce
+with htsql:
+    with transaction() as connection:
+        product = stream_produce("/school{code}?campus='old'", 3)
+    connection.close()
+    print("Codes:", [row.code for row in product.data])
@@ -0,0 +1,49 @@
+
+from htsql import HTSQL
+from htsql.core import warmup
+import os
+import pickle
+import shutil
+import tempfile
+
+db = __pbbt__['demo'].db
+
+directory = tempfile.mkdtemp()
+path = os.path.join(directory, 'realizations.pickle')
+
+app = HTSQL(db, {'htsql': {'realization_index': path}})
+app.produce("/school{code, count(program)}")
+print("Index is missing before exit:", not os.path.exists(path))
+
+# Called on exit of the process.
+warmup.save_realization_indexes()
+keys = warmup.load_realization_index(path)
+print("Index is saved:", len(keys) > 0)
+
+other_app = HTSQL(db, {'htsql': {'realization_index': path}})
+realizations = other_app.component_registry.realizations
+print("Realizations are built on startup:",
+      all(key in realizations for key in keys))
+print("Applications share the exit handler:",
+      len(warmup.indexed_registries[path]) == 2)
+
+inode = os.stat(path).st_ino
+warmup.save_realization_indexes()
+print("Index is not rewritten when nothing is added:",
+      os.stat(path).st_ino == inode)
+
+# Pretend another process saved a realization we have not built.
+with open(path, 'rb') as stream:
+    entries = pickle.load(stream)
+foreign_entry = pickle.dumps(('foreign', 'key'))
+with open(path, 'wb') as stream:
+    pickle.dump(entries+[foreign_entry], stream)
+app.produce("/course{title, upper(title), credits*2}?credits>3&title~'hist'")
+warmup.save_realization_indexes()
+with open(path, 'rb') as stream:
+    entries = pickle.load(stream)
+print("Entries of other processes are preserved:", foreign_entry in entries)
+print("New entries are added:", len(entries) > len(keys)+1)
+
+del warmup.indexed_registries[path]
+shutil.rmtree(directory)
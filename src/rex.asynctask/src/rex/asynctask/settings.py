@@ -39,6 +39,9 @@ class WorkerConfigVal(OneOfVal):
             ('worker', ChoiceVal(worker_names)),
             ('rate_max_calls', IntVal(1), None),
             ('rate_period', FloatVal(), None),
+            ('concurrency', IntVal(1), None),
+            ('prefetch', IntVal(1), None),
+            ('visibility_timeout', FloatVal(), None),
         )
         super(WorkerConfigVal, self).__init__(
             ChoiceVal(worker_names),
@@ -73,6 +76,27 @@ class AsyncTaskWorkersSetting(Setting):
             A float indicating the number of seconds the rate limiter logic
             should measure over. Optional.
 
+        concurrency
+            An integer indicating how many tasks the worker may process at the
+            same time, each in its own thread. Useful for workers that spend
+            most of their time waiting on the network. Optional; defaults to
+            ``1``.
+
+        prefetch
+            An integer indicating how many tasks the worker should retrieve
+            from the queue at once. Tasks that were retrieved but not started
+            are returned to the queue when the worker is shut down. Ignored
+            when a rate limit is configured. Optional; defaults to the value
+            of ``concurrency``.
+
+        visibility_timeout
+            A float indicating the number of seconds a task stays hidden from
+            other workers after it is retrieved. The task is removed from the
+            queue once it is processed; if the worker dies before that, the
+            task is delivered again when the timeout expires. Requires a
+            transport that supports leases. Optional; if not specified, tasks
+            are removed from the queue as soon as they are retrieved.
+
     If not specified, defaults to ``{}``.
 
     This is a merged setting, meaning that the mappings defined for this
@@ -102,7 +126,8 @@ class AsyncTaskWorkersSetting(Setting):
 class AsyncWorkersPollIntervalSetting(Setting):
     """
     Indicates how many milliseconds an ``AsyncTaskWorker`` process must sleep
-    beween attempts to retrive tasks from its queue.
+    beween attempts to retrive tasks from its queue. Transports that announce
+    new tasks (such as ``pgsql``) wake the worker up earlier.
 
     If not specified, defaults to ``500``.
     """
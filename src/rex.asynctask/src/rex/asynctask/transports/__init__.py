@@ -3,7 +3,7 @@
 #
 
 
-from .base import AsyncTransport
+from .base import AsyncTransport, LeasedTask
 from .amqp import AmqpAsyncTransport
 from .filesys import FileSysAsyncTransport
 from .localmem import LocalMemoryAsyncTransport
@@ -13,6 +13,7 @@ from .redis import RedisAsyncTransport
 
 __all__ = (
     'AsyncTransport',
+    'LeasedTask',
     'AmqpAsyncTransport',
     'FileSysAsyncTransport',
     'LocalMemoryAsyncTransport',
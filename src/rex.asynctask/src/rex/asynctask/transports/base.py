@@ -5,7 +5,9 @@
 
 import json
 import re
+import time
 
+from collections import namedtuple
 from urllib.parse import parse_qs
 
 from rex.core import Extension, MaybeVal, MapVal
@@ -13,12 +15,18 @@ from rex.core import Extension, MaybeVal, MapVal
 
 __all__ = (
     'AsyncTransport',
+    'LeasedTask',
 )
 
 
 RE_QUEUE_NAME = re.compile(r'^[a-z](?:[a-z0-9]|[_](?![_]))*[a-z0-9]$')
 
 
+#: A task retrieved with ``AsyncTransport.lease_tasks()``. The ``receipt`` is
+#: an opaque string to pass to ``ack()`` or ``nack()``.
+LeasedTask = namedtuple('LeasedTask', ('receipt', 'payload'))
+
+
 class AsyncTransport(Extension):
     """
     This is an extension to allow custom transport implementations for the
@@ -45,6 +53,17 @@ class AsyncTransport(Extension):
     def signature(cls):
         return cls.name
 
+    @classmethod
+    def supports_leases(cls):
+        """
+        Indicates whether or not the transport implements the reliable
+        delivery methods: ``lease_tasks()``, ``ack()`` and ``nack()``.
+
+        :rtype: bool
+        """
+
+        return cls.lease_tasks != AsyncTransport.lease_tasks
+
     def __init__(self, uri_parts):
         """
         Stores the relevant pieces of the asynctask_transport URI as properties
@@ -151,6 +170,22 @@ class AsyncTransport(Extension):
 
         raise NotImplementedError()
 
+    def submit_tasks(self, queue_name, payloads):
+        """
+        Places several tasks into the specified queue, in the order given.
+
+        Concrete classes may override this method to submit the tasks more
+        efficiently than calling ``submit_task()`` repeatedly.
+
+        :param queue_name: the name of the queue to place the tasks in
+        :type queue_name: str
+        :param payloads: the data to send in the tasks
+        :type payloads: list of dicts
+        """
+
+        for payload in payloads:
+            self.submit_task(queue_name, payload)
+
     def get_task(self, queue_name):
         """
         Retrieves a task from the specified queue.
@@ -166,6 +201,111 @@ class AsyncTransport(Extension):
 
         raise NotImplementedError()
 
+    def get_tasks(self, queue_name, limit):
+        """
+        Retrieves up to the specified number of tasks from the specified
+        queue.
+
+        Concrete classes may override this method to retrieve the tasks more
+        efficiently than calling ``get_task()`` repeatedly.
+
+        :param queue_name: the name of the queue to retrieve tasks from
+        :type queue_name: str
+        :param limit: the maximum number of tasks to retrieve
+        :type limit: int
+        :returns:
+            a list of the payload dictionaries of the tasks, in the order they
+            were submitted; an empty list if there are no tasks in the queue
+        """
+
+        payloads = []
+        while len(payloads) < limit:
+            payload = self.get_task(queue_name)
+            if payload is None:
+                break
+            payloads.append(payload)
+        return payloads
+
+    def lease_tasks(self, queue_name, limit, visibility_timeout):
+        """
+        Retrieves up to the specified number of tasks from the specified
+        queue without removing them.
+
+        The leased tasks are hidden from other consumers until they are
+        acknowledged with ``ack()``, released with ``nack()``, or the
+        visibility timeout expires. Once the lease expires, the task is
+        delivered again, either by a later call of this method or by
+        ``get_task()`` and ``get_tasks()``; until then, these methods never
+        return it.
+
+        Transports that support reliable delivery must implement this method
+        together with ``ack()`` and ``nack()``.
+
+        :param queue_name: the name of the queue to retrieve tasks from
+        :type queue_name: str
+        :param limit: the maximum number of tasks to retrieve
+        :type limit: int
+        :param visibility_timeout:
+            the number of seconds the tasks stay hidden from other consumers
+        :type visibility_timeout: float
+        :returns:
+            a list of ``LeasedTask`` tuples; an empty list if there are no
+            tasks available in the queue
+        """
+
+        raise NotImplementedError()
+
+    def ack(self, queue_name, receipt):
+        """
+        Removes a leased task from the queue once it has been processed.
+
+        Acknowledging a task whose lease has expired has no effect.
+
+        :param queue_name: the name of the queue the task was leased from
+        :type queue_name: str
+        :param receipt: the receipt of the leased task
+        :type receipt: str
+        """
+
+        raise NotImplementedError()
+
+    def nack(self, queue_name, receipt):
+        """
+        Returns a leased task to the queue so that it is delivered again
+        without waiting for its visibility timeout to expire.
+
+        Releasing a task whose lease has expired has no effect.
+
+        :param queue_name: the name of the queue the task was leased from
+        :type queue_name: str
+        :param receipt: the receipt of the leased task
+        :type receipt: str
+        """
+
+        raise NotImplementedError()
+
+    def wait_for_task(self, queue_name, timeout):
+        """
+        Waits until a task may have been placed into the specified queue.
+
+        Concrete classes may override this method to wake up as soon as a
+        task is submitted. This implementation simply sleeps for the entire
+        timeout.
+
+        :param queue_name: the name of the queue to wait for
+        :type queue_name: str
+        :param timeout: the maximum number of seconds to wait
+        :type timeout: float
+        :returns:
+            ``True`` if a task may be available, ``False`` if the timeout
+            expired
+        """
+
+        # pylint: disable=no-self-use,unused-argument
+
+        time.sleep(timeout)
+        return False
+
     def poll_queue(self, queue_name):
         """
         Counts the number of tasks in the specified queue.
@@ -175,7 +315,8 @@ class AsyncTransport(Extension):
         :param queue_name: the name of the queue to poll
         :type queue_name: str
         :returns:
-            the number of tasks in the queue; 0 if queue does not exist
+            the number of tasks in the queue, including the leased tasks that
+            were not acknowledged yet; 0 if queue does not exist
         """
 
         raise NotImplementedError()
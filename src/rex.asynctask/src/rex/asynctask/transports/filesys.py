@@ -4,8 +4,10 @@
 
 import os
 import stat
+import time
+import uuid
 
-from .base import AsyncTransport
+from .base import AsyncTransport, LeasedTask
 
 
 __all__ = (
@@ -15,12 +17,14 @@ __all__ = (
 
 FILE_LOCK = '.lock'
 FILE_INDEX = '.index'
+DIR_LEASES = '.leases'
 
 
 class FileSysAsyncTransport(AsyncTransport):
     """
     An implementation of AsyncTransport that uses the filesystem to store tasks
-    while they're in a queue.
+    while they're in a queue. Leased tasks are moved to the ``.leases``
+    directory of the queue until they are acknowledged.
 
     Transport URI Examples:
 
@@ -54,19 +58,32 @@ class FileSysAsyncTransport(AsyncTransport):
             os.makedirs(self.path, self.options['file_mode'] | stat.S_IXUSR)
 
     def submit_task(self, queue_name, payload):
+        self.submit_tasks(queue_name, [payload])
+
+    def submit_tasks(self, queue_name, payloads):
         self._ensure_queue(queue_name)
 
-        full_payload = self.encode_payload({
-            'payload': payload,
-        })
+        full_payloads = [
+            self.encode_payload({
+                'payload': payload,
+            })
+            for payload in payloads
+        ]
+        if not full_payloads:
+            return
 
         with self._lock(queue_name):
             index = self._get_index(queue_name)
             next_start = index[0] or 1
-            next_end = index[1] + 1
+            next_end = index[1]
 
-            path = os.path.join(self._queue_path(queue_name), str(next_end))
-            self._write_file(path, full_payload)
+            for full_payload in full_payloads:
+                next_end += 1
+                path = os.path.join(
+                    self._queue_path(queue_name),
+                    str(next_end),
+                )
+                self._write_file(path, full_payload)
 
             self._write_index(queue_name, next_start, next_end)
 
@@ -74,43 +91,108 @@ class FileSysAsyncTransport(AsyncTransport):
         self._ensure_queue(queue_name)
 
         with self._lock(queue_name):
-            index = self._get_index(queue_name)
-            if index[1] == 0:
+            # Tasks with expired leases are delivered first.
+            now = time.time()
+            for receipt, lease in self._get_leases(queue_name):
+                if lease['expires'] <= now:
+                    os.remove(self._lease_path(queue_name, receipt))
+                    return lease['payload']
+
+            task = self._pop_task(queue_name)
+            if task is None:
                 return None
 
-            path = os.path.join(self._queue_path(queue_name), str(index[0]))
-            with open(path, 'r') as task_file:
-                contents = task_file.read()
-            os.remove(path)
+        contents = self.decode_payload(task[1])
+        return contents['payload']
 
-            next_start = index[0] + 1
-            next_end = index[1]
-            if next_start > next_end:
-                next_start = next_end = 0
-            self._write_index(queue_name, next_start, next_end)
+    def lease_tasks(self, queue_name, limit, visibility_timeout):
+        self._ensure_queue(queue_name)
+        now = time.time()
+        tasks = []
 
-        contents = self.decode_payload(contents)
-        return contents['payload']
+        with self._lock(queue_name):
+            # Tasks with expired leases are delivered first.
+            for receipt, lease in self._get_leases(queue_name):
+                if len(tasks) >= limit:
+                    break
+                if lease['expires'] > now:
+                    continue
+                os.remove(self._lease_path(queue_name, receipt))
+                tasks.append(self._write_lease(
+                    queue_name,
+                    receipt.split('.', 1)[0],
+                    lease['payload'],
+                    now + visibility_timeout,
+                ))
+
+            while len(tasks) < limit:
+                task = self._pop_task(queue_name)
+                if task is None:
+                    break
+                tasks.append(self._write_lease(
+                    queue_name,
+                    task[0],
+                    self.decode_payload(task[1])['payload'],
+                    now + visibility_timeout,
+                ))
+
+        return tasks
+
+    def ack(self, queue_name, receipt):
+        self._ensure_queue(queue_name)
+
+        with self._lock(queue_name):
+            try:
+                os.remove(self._lease_path(queue_name, receipt))
+            except FileNotFoundError:
+                pass
+
+    def nack(self, queue_name, receipt):
+        self._ensure_queue(queue_name)
+
+        with self._lock(queue_name):
+            path = self._lease_path(queue_name, receipt)
+            if os.path.exists(path):
+                with open(path, 'r') as lease_file:
+                    lease = self.decode_payload(lease_file.read())
+                lease['expires'] = 0
+                os.remove(path)
+                self._write_file(path, self.encode_payload(lease))
 
     def poll_queue(self, queue_name):
         self._ensure_queue(queue_name)
 
         with self._lock(queue_name):
             index = self._get_index(queue_name)
+            num_leased = len(os.listdir(self._leases_path(queue_name)))
 
         if index[1] == 0:
-            return 0
+            return num_leased
 
-        return (index[1] - index[0]) + 1
+        return (index[1] - index[0]) + 1 + num_leased
 
     def _queue_path(self, queue_name):
         return os.path.join(self.path, queue_name)
 
+    def _leases_path(self, queue_name):
+        return os.path.join(self._queue_path(queue_name), DIR_LEASES)
+
+    def _lease_path(self, queue_name, receipt):
+        if os.sep in receipt or receipt.startswith('.'):
+            raise ValueError('"%s" is not a valid receipt' % (receipt,))
+        return os.path.join(self._leases_path(queue_name), receipt)
+
     def _ensure_queue(self, queue_name):
         self.ensure_valid_name(queue_name)
         path = self._queue_path(queue_name)
         if not os.path.exists(path):
             os.makedirs(path, self.options['file_mode'] | stat.S_IXUSR)
+        leases_path = self._leases_path(queue_name)
+        if not os.path.exists(leases_path):
+            os.makedirs(
+                leases_path,
+                self.options['file_mode'] | stat.S_IXUSR,
+            )
         if not os.path.exists(os.path.join(path, FILE_INDEX)):
             with self._lock(queue_name):
                 self._write_index(queue_name, 0, 0)
@@ -124,6 +206,48 @@ class FileSysAsyncTransport(AsyncTransport):
             )
         return self._locks[queue_name]
 
+    def _pop_task(self, queue_name):
+        # Removes the first task from the queue; returns its number and the
+        # contents of its file. Must be called with the queue lock held.
+        index = self._get_index(queue_name)
+        if index[1] == 0:
+            return None
+
+        path = os.path.join(self._queue_path(queue_name), str(index[0]))
+        with open(path, 'r') as task_file:
+            contents = task_file.read()
+        os.remove(path)
+
+        next_start = index[0] + 1
+        next_end = index[1]
+        if next_start > next_end:
+            next_start = next_end = 0
+        self._write_index(queue_name, next_start, next_end)
+
+        return index[0], contents
+
+    def _get_leases(self, queue_name):
+        # Returns the (receipt, lease) pairs of the queue in the order the
+        # tasks were submitted.
+        leases = []
+        for receipt in os.listdir(self._leases_path(queue_name)):
+            with open(self._lease_path(queue_name, receipt), 'r') as lease:
+                leases.append((receipt, self.decode_payload(lease.read())))
+        leases.sort(key=lambda lease: (lease[1]['number'], lease[0]))
+        return leases
+
+    def _write_lease(self, queue_name, number, payload, expires):
+        receipt = '%s.%s' % (number, uuid.uuid4().hex)
+        self._write_file(
+            self._lease_path(queue_name, receipt),
+            self.encode_payload({
+                'number': int(number),
+                'expires': expires,
+                'payload': payload,
+            }),
+        )
+        return LeasedTask(receipt, payload)
+
     def _get_index(self, queue_name):
         path = os.path.join(self.path, queue_name, FILE_INDEX)
         contents = open(path, 'r').read()
@@ -3,11 +3,14 @@
 #
 
 
-from collections import defaultdict
+import time
+import uuid
+
+from collections import defaultdict, OrderedDict
 from contextlib import contextmanager
 from threading import Lock
 
-from .base import AsyncTransport
+from .base import AsyncTransport, LeasedTask
 
 
 __all__ = (
@@ -33,6 +36,7 @@ class LocalMemoryAsyncTransport(AsyncTransport):
 
     def initialize(self):
         self._queues = defaultdict(list)
+        self._leases = defaultdict(OrderedDict)
         self._locks = defaultdict(Lock)
 
     def submit_task(self, queue_name, payload):
@@ -42,11 +46,19 @@ class LocalMemoryAsyncTransport(AsyncTransport):
         with self._lock(queue_name):
             self._queues[queue_name].append(payload)
 
+    def submit_tasks(self, queue_name, payloads):
+        self.ensure_valid_name(queue_name)
+        payloads = [self.encode_payload(payload) for payload in payloads]
+
+        with self._lock(queue_name):
+            self._queues[queue_name].extend(payloads)
+
     def get_task(self, queue_name):
         self.ensure_valid_name(queue_name)
         payload = None
 
         with self._lock(queue_name):
+            self._reclaim_expired(queue_name, time.time())
             try:
                 payload = self.decode_payload(self._queues[queue_name].pop(0))
             except IndexError:
@@ -54,11 +66,54 @@ class LocalMemoryAsyncTransport(AsyncTransport):
 
         return payload
 
+    def lease_tasks(self, queue_name, limit, visibility_timeout):
+        self.ensure_valid_name(queue_name)
+        now = time.time()
+        tasks = []
+
+        with self._lock(queue_name):
+            self._reclaim_expired(queue_name, now)
+            leases = self._leases[queue_name]
+
+            while len(tasks) < limit and self._queues[queue_name]:
+                payload = self._queues[queue_name].pop(0)
+                receipt = uuid.uuid4().hex
+                leases[receipt] = (now + visibility_timeout, payload)
+                tasks.append(LeasedTask(receipt, self.decode_payload(payload)))
+
+        return tasks
+
+    def ack(self, queue_name, receipt):
+        self.ensure_valid_name(queue_name)
+
+        with self._lock(queue_name):
+            self._leases[queue_name].pop(receipt, None)
+
+    def nack(self, queue_name, receipt):
+        self.ensure_valid_name(queue_name)
+
+        with self._lock(queue_name):
+            lease = self._leases[queue_name].pop(receipt, None)
+            if lease is not None:
+                self._queues[queue_name].insert(0, lease[1])
+
     def poll_queue(self, queue_name):
         self.ensure_valid_name(queue_name)
-        count = len(self._queues[queue_name])
+        count = len(self._queues[queue_name]) \
+            + len(self._leases[queue_name])
         return count
 
+    def _reclaim_expired(self, queue_name, now):
+        # Returns the tasks with expired leases to the head of the queue.
+        leases = self._leases[queue_name]
+        expired = [
+            receipt
+            for receipt, (expires, _) in leases.items()
+            if expires <= now
+        ]
+        payloads = [leases.pop(receipt)[1] for receipt in expired]
+        self._queues[queue_name][:0] = payloads
+
     @contextmanager
     def _lock(self, name):
         self._locks[name].acquire()
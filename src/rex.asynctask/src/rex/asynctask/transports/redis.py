@@ -3,12 +3,14 @@
 #
 
 
+import time
+import uuid
 
 from redis import Redis, RedisError
 
 from rex.core import Error
 
-from .base import AsyncTransport
+from .base import AsyncTransport, LeasedTask
 
 
 __all__ = (
@@ -16,10 +18,62 @@ __all__ = (
 )
 
 
+# Returns the tasks with expired leases to the head of the queue.
+# KEYS: queue list, lease expiration sorted set, leased payload hash
+# ARGV: current time, followed by the arguments of the including script
+LUA_RECLAIM = '''
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for i = #expired, 1, -1 do
+    local payload = redis.call('HGET', KEYS[3], expired[i])
+    redis.call('ZREM', KEYS[2], expired[i])
+    redis.call('HDEL', KEYS[3], expired[i])
+    if payload then
+        redis.call('LPUSH', KEYS[1], payload)
+    end
+end
+'''
+
+# KEYS: queue list, lease expiration sorted set, leased payload hash
+# ARGV: current time
+LUA_GET = LUA_RECLAIM + '''
+return redis.call('LPOP', KEYS[1])
+'''
+
+# KEYS: queue list, lease expiration sorted set, leased payload hash
+# ARGV: current time, new expiration time, limit, receipt prefix
+LUA_LEASE = LUA_RECLAIM + '''
+local leased = {}
+for i = 1, tonumber(ARGV[3]) do
+    local payload = redis.call('LPOP', KEYS[1])
+    if not payload then
+        break
+    end
+    local receipt = ARGV[4] .. ':' .. i
+    redis.call('ZADD', KEYS[2], ARGV[2], receipt)
+    redis.call('HSET', KEYS[3], receipt, payload)
+    table.insert(leased, receipt)
+    table.insert(leased, payload)
+end
+return leased
+'''
+
+# KEYS: queue list, lease expiration sorted set, leased payload hash
+# ARGV: receipt
+LUA_NACK = '''
+local payload = redis.call('HGET', KEYS[3], ARGV[1])
+if payload then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    redis.call('LPUSH', KEYS[1], payload)
+end
+'''
+
+
 class RedisAsyncTransport(AsyncTransport):
     """
     An implementation of AsyncTransport that uses list keys in a Redis database
-    to store tasks while they're in a queue.
+    to store tasks while they're in a queue. Leased tasks are kept in a hash
+    key alongside a sorted set of their expiration times.
 
     Transport URI Examples:
 
@@ -71,23 +125,69 @@ class RedisAsyncTransport(AsyncTransport):
         )
         self.ensure_valid_name(self.key_prefix)
 
+        self._get_script = self._redis.register_script(LUA_GET)
+        self._lease_script = self._redis.register_script(LUA_LEASE)
+        self._nack_script = self._redis.register_script(LUA_NACK)
+
     def submit_task(self, queue_name, payload):
         self.ensure_valid_name(queue_name)
         queue_name = '_'.join([self.key_prefix, queue_name])
         payload = self.encode_payload(payload)
         self._redis.rpush(queue_name, payload)
 
-    def get_task(self, queue_name):
+    def submit_tasks(self, queue_name, payloads):
         self.ensure_valid_name(queue_name)
         queue_name = '_'.join([self.key_prefix, queue_name])
-        payload = self.decode_payload(self._redis.lpop(queue_name))
-        return payload
+        payloads = [self.encode_payload(payload) for payload in payloads]
+        if payloads:
+            self._redis.rpush(queue_name, *payloads)
+
+    def get_task(self, queue_name):
+        keys = self._get_keys(queue_name)
+        payload = self._get_script(keys=keys, args=[time.time()])
+        return self.decode_payload(payload)
+
+    def lease_tasks(self, queue_name, limit, visibility_timeout):
+        keys = self._get_keys(queue_name)
+        now = time.time()
+        leased = self._lease_script(
+            keys=keys,
+            args=[now, now + visibility_timeout, limit, uuid.uuid4().hex],
+        )
+        return [
+            LeasedTask(
+                receipt.decode('utf-8'),
+                self.decode_payload(payload),
+            )
+            for receipt, payload in zip(leased[::2], leased[1::2])
+        ]
+
+    def ack(self, queue_name, receipt):
+        keys = self._get_keys(queue_name)
+        pipeline = self._redis.pipeline()
+        pipeline.zrem(keys[1], receipt)
+        pipeline.hdel(keys[2], receipt)
+        pipeline.execute()
+
+    def nack(self, queue_name, receipt):
+        keys = self._get_keys(queue_name)
+        self._nack_script(keys=keys, args=[receipt])
 
     def poll_queue(self, queue_name):
+        keys = self._get_keys(queue_name)
+        count = self._redis.llen(keys[0]) + self._redis.zcard(keys[1])
+        return count
+
+    def _get_keys(self, queue_name):
         self.ensure_valid_name(queue_name)
         queue_name = '_'.join([self.key_prefix, queue_name])
-        count = self._redis.llen(queue_name)
-        return count
+        # Queue names cannot contain double underscores, so these keys never
+        # collide with the key of another queue.
+        return [
+            queue_name,
+            '%s__leases' % (queue_name,),
+            '%s__leased' % (queue_name,),
+        ]
 
     def __repr__(self):
         return '%s(%s)' % (
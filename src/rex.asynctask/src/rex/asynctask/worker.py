@@ -3,14 +3,18 @@
 #
 
 
+import threading
 import time
 
+from concurrent import futures
+
 from ratelimiter import RateLimiter
 
-from rex.core import Extension, get_settings
+from rex.core import Extension, get_settings, get_rex
 from rex.logging import get_logger
 
 from .core import get_transport
+from .transports import LeasedTask
 
 
 __all__ = (
@@ -61,37 +65,157 @@ class AsyncTaskWorker(Extension):
 
         sleep_duration = self.get_poll_interval() / 1000.0
         limiter = self.get_limiter()
+        concurrency = self.get_concurrency()
+        prefetch = self.get_prefetch()
+        visibility_timeout = self.get_visibility_timeout()
+        if not isinstance(limiter, NoOpLimiter):
+            # The rate limiter counts retrievals, so take tasks one by one.
+            prefetch = 1
+        stats = WorkerStatistics(self.logger, queue_name)
+
+        pool = None
+        pending = {}
+        if concurrency > 1:
+            pool = futures.ThreadPoolExecutor(max_workers=concurrency)
+            rex = get_rex()
+
+        terminated = False
+        while not terminated and not check_for_termination(conn):
+            pending = dict(
+                (future, task)
+                for future, task in pending.items()
+                if not future.done()
+            )
+            capacity = concurrency + prefetch - len(pending)
+            if capacity < 1:
+                # Every thread is busy and the prefetched tasks are waiting.
+                futures.wait(
+                    pending,
+                    timeout=sleep_duration,
+                    return_when=futures.FIRST_COMPLETED,
+                )
+                continue
 
-        while not check_for_termination(conn):
             with limiter:
-                payload = self._transport.get_task(queue_name)
-            if payload is not None:
-                self.logger.debug('Got payload: %r', payload)
-                try:
-                    self.process(payload)
-                except Exception:  # pylint: disable=broad-except
-                    self.logger.exception(
-                        'An unhandled exception occurred while processing the'
-                        ' payload'
-                    )
-                else:
-                    self.logger.debug('Processing complete')
+                tasks = self._retrieve_tasks(
+                    min(prefetch, capacity),
+                    visibility_timeout,
+                )
+            if tasks:
+                started = time.time()
+                for index, task in enumerate(tasks):
+                    if pool is not None:
+                        future = pool.submit(
+                            self._process_in_thread,
+                            rex,
+                            task,
+                            started,
+                            stats,
+                        )
+                        pending[future] = task
+                    elif index > 0 and check_for_termination(conn):
+                        # Don't hold the prefetched tasks hostage until the
+                        # ones ahead of them are done.
+                        self._return_tasks(tasks[index:])
+                        terminated = True
+                        break
+                    else:
+                        self._process_task(task, started, stats)
+
+            elif pending:
+                # A task in progress may still put more tasks in the queue.
+                futures.wait(
+                    pending,
+                    timeout=sleep_duration,
+                    return_when=futures.FIRST_COMPLETED,
+                )
 
             elif halt_when_empty:
                 self.logger.info('No tasks found in queue')
                 break
 
             else:
-                # No task to process, let's sleep a bit.
+                # No task to process, let's wait for one a bit.
                 try:
-                    time.sleep(sleep_duration)
+                    self._transport.wait_for_task(queue_name, sleep_duration)
                 except KeyboardInterrupt:  # pragma: no cover
                     pass
 
+            stats.report()
+
+        if pool is not None:
+            self._shutdown(pool, pending)
+        stats.report(force=True)
+
         self._queue_name = None
         self._transport = None
         self.logger.info('Terminating')
 
+    def _retrieve_tasks(self, limit, visibility_timeout):
+        if visibility_timeout is None:
+            return [
+                LeasedTask(None, payload)
+                for payload in self._transport.get_tasks(
+                    self._queue_name,
+                    limit,
+                )
+            ]
+        return self._transport.lease_tasks(
+            self._queue_name,
+            limit,
+            visibility_timeout,
+        )
+
+    def _process_task(self, task, started, stats):
+        self.logger.debug('Got payload: %r', task.payload)
+        try:
+            try:
+                self.process(task.payload)
+            finally:
+                # The task is done with, whether it succeeded or not; only a
+                # worker that dies leaves its leased task to be delivered
+                # again.
+                if task.receipt is not None:
+                    self._transport.ack(self._queue_name, task.receipt)
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception(
+                'An unhandled exception occurred while processing the'
+                ' payload'
+            )
+            stats.add(time.time() - started, failed=True)
+        else:
+            self.logger.debug('Processing complete')
+            stats.add(time.time() - started)
+
+    def _process_in_thread(self, rex, task, started, stats):
+        with rex:
+            self._process_task(task, started, stats)
+
+    def _shutdown(self, pool, pending):
+        # Tasks that have not started yet go back to the queue; the ones in
+        # progress are allowed to finish.
+        self._return_tasks([
+            task
+            for future, task in pending.items()
+            if future.cancel()
+        ])
+        pool.shutdown(wait=True)
+
+    def _return_tasks(self, tasks):
+        # Leased tasks are released; the ones already removed from the queue
+        # are submitted again.
+        for task in tasks:
+            if task.receipt is not None:
+                self._transport.nack(self._queue_name, task.receipt)
+            else:
+                self._transport.submit_task(self._queue_name, task.payload)
+        if tasks:
+            self.logger.info(
+                'Returned %s prefetched tasks to queue %s',
+                len(tasks),
+                self._queue_name,
+            )
+
     def _throttled(self, until):
         self.logger.debug(
             'Rate limited on queue %s, sleeping for %f seconds',
@@ -119,6 +243,52 @@ class AsyncTaskWorker(Extension):
             callback=self._throttled,
         )
 
+    def get_concurrency(self):
+        """
+        Returns the number of tasks that may be processed at the same time.
+
+        :rtype: int
+        """
+
+        cfg = get_settings().asynctask_workers.get(self._queue_name)
+        if not cfg or cfg.concurrency is None:
+            return 1
+        return cfg.concurrency
+
+    def get_prefetch(self):
+        """
+        Returns the number of tasks to retrieve from the queue at once.
+
+        :rtype: int
+        """
+
+        cfg = get_settings().asynctask_workers.get(self._queue_name)
+        if not cfg or cfg.prefetch is None:
+            return self.get_concurrency()
+        return cfg.prefetch
+
+    def get_visibility_timeout(self):
+        """
+        Returns the number of seconds a retrieved task stays hidden from other
+        workers before it is delivered again, or ``None`` if tasks are removed
+        from the queue as soon as they are retrieved.
+
+        :rtype: float
+        """
+
+        cfg = get_settings().asynctask_workers.get(self._queue_name)
+        if not cfg or cfg.visibility_timeout is None:
+            return None
+        if not self._transport.supports_leases():
+            self.logger.warning(
+                'Transport %r does not support leases; tasks on queue %s'
+                ' will not be redelivered',
+                self._transport,
+                self._queue_name,
+            )
+            return None
+        return cfg.visibility_timeout
+
     def get_poll_interval(self):
         """
         Returns the number of milliseconds to wait between attempts to retrieve
@@ -156,6 +326,58 @@ class AsyncTaskWorker(Extension):
         self.logger.debug('Requeued payload: %r', payload)
 
 
+class WorkerStatistics(object):
+    """
+    Collects the number of processed tasks and their latency (the time from
+    retrieving a task until its processing is complete) and periodically
+    writes them to the worker log.
+    """
+
+    #: The number of seconds between reports.
+    interval = 60
+
+    def __init__(self, logger, queue_name):
+        self.logger = logger
+        self.queue_name = queue_name
+        self._lock = threading.Lock()
+        self._reset(time.time())
+
+    def _reset(self, now):
+        self.started = now
+        self.processed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def add(self, latency, failed=False):
+        with self._lock:
+            self.processed += 1
+            if failed:
+                self.failed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def report(self, force=False):
+        now = time.time()
+        with self._lock:
+            if not force and now - self.started < self.interval:
+                return
+            if self.processed or force:
+                elapsed = max(now - self.started, 1e-6)
+                self.logger.info(
+                    'Statistics; queue=%s, processed=%s, failed=%s,'
+                    ' throughput=%.2f/s, latency_avg=%.3fs, latency_max=%.3fs',
+                    self.queue_name,
+                    self.processed,
+                    self.failed,
+                    self.processed / elapsed,
+                    self.total_latency / self.processed
+                    if self.processed else 0.0,
+                    self.max_latency,
+                )
+            self._reset(now)
+
+
 def check_for_termination(comm):
     if comm.poll():
         msg = comm.recv()
@@ -5,20 +5,48 @@
 
 from .context import get_rex
 import threading
+import collections
 import functools
 import inspect
 import textwrap
 import os
+import sys
 import time
+import struct
+import ctypes
+import ctypes.util
+
+
+class CacheStats:
+    # Cache counters of a single cached function.
+
+    __slots__ = ('name', 'maxsize', 'hits', 'misses', 'evictions', 'size',
+                 'keys')
+
+    def __init__(self, name, maxsize=None):
+        self.name = name
+        # The maximum number of cached values; `None` means no limit.
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # The number of cached values.
+        self.size = 0
+        # For a bounded function, the cached keys in the order of use, the
+        # least recently used key is the first.
+        self.keys = (collections.OrderedDict()
+                     if maxsize is not None else None)
 
 
 class Cache(dict):
     # Application cache.
 
-    __slots__ = ('_lock',)
+    __slots__ = ('_lock', '_stats')
 
     def __init__(self):
         self._lock = threading.RLock()
+        # Maps a cached function to its counters.
+        self._stats = {}
 
     def set_default_cb(self, key, callback, *args):
         # Get the cached value associated with the key; call `callback()` to
@@ -28,6 +56,259 @@ class Cache(dict):
                 self[key] = callback(*args)
         return self[key]
 
+    def set_cached_cb(self, fn, maxsize, key, callback, *args):
+        # Same as `set_default_cb()`, but also records the key in the counters
+        # of `fn` and evicts the least recently used keys of `fn` when there
+        # are more than `maxsize` of them.
+        with self._lock:
+            stats = self._stats.get(fn)
+            if stats is None:
+                name = "%s.%s" % (fn.__module__, fn.__qualname__)
+                stats = self._stats[fn] = CacheStats(name, maxsize)
+            if key in self:         # might have been set in another thread
+                stats.hits += 1
+                if stats.keys is not None and key in stats.keys:
+                    stats.keys.move_to_end(key)
+                return self[key]
+            stats.misses += 1
+            value = self[key] = callback(*args)
+            stats.size += 1
+            if stats.keys is not None:
+                stats.keys[key] = None
+                while len(stats.keys) > stats.maxsize:
+                    old_key = stats.keys.popitem(last=False)[0]
+                    self.pop(old_key, None)
+                    stats.size -= 1
+                    stats.evictions += 1
+            return value
+
+    def touch(self, fn, key):
+        # Records a cache hit; for a bounded function, marks the key as the
+        # most recently used.
+        stats = self._stats.get(fn)
+        if stats is None:
+            return
+        stats.hits += 1         # an approximate counter, updated without lock
+        if stats.keys is not None:
+            with self._lock:
+                if key in stats.keys:
+                    stats.keys.move_to_end(key)
+
+    def clear(self):
+        with self._lock:
+            super(Cache, self).clear()
+            self._stats.clear()
+
+    def statistics(self):
+        # Returns a list of counters of cached functions.
+        with self._lock:
+            return [{'name': stats.name,
+                     'hits': stats.hits,
+                     'misses': stats.misses,
+                     'evictions': stats.evictions,
+                     'size': stats.size,
+                     'maxsize': stats.maxsize}
+                    for stats in sorted(self._stats.values(),
+                                        key=(lambda stats: stats.name))]
+
+
+class Inotify:
+    # A thin wrapper over Linux inotify API.
+
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = 0o2000000
+
+    # Events that may indicate that a file in the directory has changed.
+    mask = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+            IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+    # Header of `struct inotify_event`.
+    header = struct.Struct('iIII')
+
+    @classmethod
+    def open(cls):
+        # Returns a new inotify instance or `None` if inotify is not available.
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            init = libc.inotify_init1
+            add_watch = libc.inotify_add_watch
+        except (OSError, AttributeError):
+            return None
+        add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = init(cls.IN_NONBLOCK | cls.IN_CLOEXEC)
+        if fd < 0:
+            return None
+        return cls(fd, add_watch)
+
+    def __init__(self, fd, add_watch):
+        self.fd = fd
+        self._add_watch = add_watch
+        # Maps a watch descriptor to the directory.
+        self.directories = {}
+
+    def close(self):
+        os.close(self.fd)
+
+    def watch(self, directory):
+        # Starts watching the directory; returns `False` on failure.
+        wd = self._add_watch(self.fd, os.fsencode(directory), self.mask)
+        if wd < 0:
+            return False
+        self.directories[wd] = directory
+        return True
+
+    def read(self):
+        # Returns the set of files that might have changed since the last call;
+        # returns `None` if some of the events were lost.
+        paths = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return paths
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = \
+                        self.header.unpack_from(data, offset)
+                offset += self.header.size
+                name = data[offset:offset+length].rstrip(b'\0')
+                offset += length
+                if mask & self.IN_Q_OVERFLOW:
+                    paths = None
+                if paths is not None and wd in self.directories:
+                    paths.add(os.path.join(self.directories[wd],
+                                           os.fsdecode(name)))
+
+
+class FileWatcher:
+    # Keeps track of changes in the files opened by auto-reloading functions.
+    # Uses inotify when available; otherwise, re-stats all the files at most
+    # once per `interval` seconds.  Files in directories that inotify fails
+    # to watch (e.g., when the watch limit is reached) are re-stated at the
+    # same rate.
+
+    interval = 1.0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Maps file names to their last known stats.
+        self.stats = {}
+        # Incremented whenever any of the files changes.
+        self.version = 1
+        # The process that opened the inotify instance.
+        self.pid = os.getpid()
+        self.inotify = Inotify.open()
+        # Directories watched with inotify.
+        self.directories = set()
+        # Files in directories that could not be watched with inotify.
+        self.unwatched = set()
+        self.timestamp = time.monotonic()
+        # Set when all the files must be re-stated on the next refresh.
+        self.is_stale = False
+
+    def reset(self):
+        # Called in a forked process.  The inotify instance is shared with
+        # the parent process, which may consume the events we need, and the
+        # lock could be held by a thread that does not exist in this process.
+        self.lock = threading.Lock()
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            if self.inotify is not None:
+                self.inotify.close()
+            self.inotify = Inotify.open()
+            self.directories = set()
+            self.unwatched = set()
+            if self.inotify is not None:
+                for path in self.stats:
+                    self.watch_directory(path)
+            # The files may have changed since the last refresh.
+            self.is_stale = True
+
+    @staticmethod
+    def stat(path):
+        # Returns the file stats or `None` if the file does not exist.
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime, stat.st_size)
+
+    def watch_directory(self, path):
+        # Watches the directory of the file with inotify; if it fails, the
+        # file is to be polled.
+        directory = os.path.dirname(path)
+        if directory in self.directories:
+            return
+        if self.inotify.watch(directory):
+            self.directories.add(directory)
+            self.unwatched.discard(path)
+        else:
+            self.unwatched.add(path)
+
+    def watch(self, path, stream):
+        # Starts watching the file; returns its stats.
+        if self.pid != os.getpid():
+            self.reset()
+        with self.lock:
+            if self.inotify is not None:
+                self.watch_directory(path)
+            stat = os.fstat(stream.fileno())
+            stat = (stat.st_mtime, stat.st_size)
+            if path not in self.stats:
+                self.stats[path] = stat
+            return stat
+
+    def refresh(self):
+        # Re-stats the files that might have changed; returns the version.
+        if self.pid != os.getpid():
+            self.reset()
+        if not self.lock.acquire(blocking=False):
+            # Some other thread is doing it for us.
+            return self.version
+        try:
+            paths = None
+            if self.inotify is not None:
+                paths = self.inotify.read()
+                if paths is not None and self.unwatched:
+                    timestamp = time.monotonic()
+                    if timestamp >= self.timestamp+self.interval:
+                        self.timestamp = timestamp
+                        paths.update(self.unwatched)
+            elif not self.is_stale:
+                timestamp = time.monotonic()
+                if timestamp < self.timestamp+self.interval:
+                    return self.version
+                self.timestamp = timestamp
+            if self.is_stale:
+                paths = None
+                self.is_stale = False
+            if paths is None:
+                paths = list(self.stats)
+            is_changed = False
+            for path in paths:
+                if path in self.stats:
+                    stat = self.stat(path)
+                    if stat != self.stats[path]:
+                        self.stats[path] = stat
+                        is_changed = True
+            if is_changed:
+                self.version += 1
+            return self.version
+        finally:
+            self.lock.release()
+
 
 class OpenGate:
     # An utility for loading data from a file and caching the result.  Rebuilds
@@ -35,12 +316,12 @@ class OpenGate:
     # NOTE: not resistant to race conditions -- use only to enable development
     # without restarting the server.
 
-    __slots__ = ('callback', 'args', 'result', 'version')
+    __slots__ = ('callback', 'args', 'result', 'version', 'dependencies',
+                 'lock')
 
-    # Global dictionary that maps file names to their stats.
-    stats = {}
-    stats_version = 1
-    stats_lock = threading.RLock()
+    # Process-wide file watcher; created on first use.
+    watcher = None
+    watcher_lock = threading.Lock()
 
     def __init__(self, callback, *args):
         # Function that generates the result.  Must have a parameter called
@@ -50,38 +331,47 @@ class OpenGate:
         self.args = args
         # Cached data.
         self.result = None
-        # The version of the data.
+        # The watcher version when the data was last validated.
         self.version = 0
+        # Maps files opened by the function to their stats.
+        self.dependencies = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def get_watcher(cls):
+        if cls.watcher is None:
+            with cls.watcher_lock:
+                if cls.watcher is None:
+                    cls.watcher = FileWatcher()
+        return cls.watcher
 
     def open(self, path):
         # Opens the file; saves its stats.
         stream = open(path)
         path = os.path.abspath(path)
-        if path not in OpenGate.stats:
-            stat = os.fstat(stream.fileno())
-            OpenGate.stats[path] = (stat.st_mtime, stat.st_size)
+        if path not in self.dependencies:
+            self.dependencies[path] = \
+                    self.get_watcher().watch(path, stream)
         return stream
 
     def __call__(self):
-        with OpenGate.stats_lock:
-            # Check if we can use the cached result.
+        watcher = self.get_watcher()
+        version = watcher.refresh()
+        # Nothing changed since the last check.
+        if self.version == version:
+            return self.result
+        with self.lock:
+            # Check if any of the dependencies changed.
             if self.version > 0:
-                stats = {}
-                for path in list(OpenGate.stats.keys()):
-                    try:
-                        stat = os.stat(path)
-                        stats[path] = (stat.st_mtime, stat.st_size)
-                    except OSError:
-                        pass
-                if stats == OpenGate.stats:
-                    if self.version == OpenGate.stats_version:
-                        return self.result
-                else:
-                    OpenGate.stats = stats
-                    OpenGate.stats_version += 1
-            # If not, generate and cache the result.
+                if all(watcher.stats.get(path) == stat
+                       for path, stat in self.dependencies.items()):
+                    self.version = version
+                    return self.result
+            # If so, generate and cache the result.
+            self.version = 0
+            self.dependencies = {}
             self.result = self.callback(*self.args, open=self.open)
-            self.version = OpenGate.stats_version
+            self.version = version
             return self.result
 
 
@@ -107,9 +397,10 @@ class ExpireGate:
             return self.result
 
 
-def _decorate(fn, Gate=None, prefix='cached_', spec=None):
+def _decorate(fn, Gate=None, prefix='cached_', spec=None, maxsize=None):
     # Returns a decorated function which value is stored in the application
-    # cache.  If `Gate` is provided, use it as the value container.
+    # cache.  If `Gate` is provided, use it as the value container.  If
+    # `maxsize` is set, keep at most `maxsize` most recently used values.
     if spec is None:
         spec = inspect.getfullargspec(fn)
     assert (spec.varkw is None and
@@ -135,18 +426,21 @@ def _decorate(fn, Gate=None, prefix='cached_', spec=None):
         signature.append('*'+spec.varargs)
         key.append(spec.varargs)
     if Gate is None:
-        lineno = _decorate.__code__.co_firstlineno + 29 # from `def` to `source`
+        lineno = _decorate.__code__.co_firstlineno + 30 # from `def` to `source`
         source = """\
             def {name}({signature}):
                 _cache = _get_rex().cache
                 _key = (_fn, {key})
                 try:
-                    return _cache[_key]
+                    _value = _cache[_key]
                 except KeyError:
-                    return _cache.set_default_cb(_key, _fn, {params})
+                    return _cache.set_cached_cb(
+                            _fn, _maxsize, _key, _fn, {params})
+                _cache.touch(_fn, _key)
+                return _value
         """
     else:
-        lineno = _decorate.__code__.co_firstlineno + 40 # from `def` to `source`
+        lineno = _decorate.__code__.co_firstlineno + 44 # from `def` to `source`
         source = """\
             def {name}({signature}):
                 _cache = _get_rex().cache
@@ -154,7 +448,10 @@ def _decorate(fn, Gate=None, prefix='cached_', spec=None):
                 try:
                     _gate = _cache[_key]
                 except KeyError:
-                    _gate = _cache.set_default_cb(_key, _Gate, _fn, {params})
+                    _gate = _cache.set_cached_cb(
+                            _fn, _maxsize, _key, _Gate, _fn, {params})
+                else:
+                    _cache.touch(_fn, _key)
                 return _gate()
         """
     source = "\n"*lineno + textwrap.dedent(source)
@@ -166,6 +463,7 @@ def _decorate(fn, Gate=None, prefix='cached_', spec=None):
             '_fn': fn,
             '_get_rex': get_rex,
             '_Gate': Gate,
+            '_maxsize': maxsize,
     }
     exec(code, context)
     wrapper = context.pop(name)
@@ -173,7 +471,7 @@ def _decorate(fn, Gate=None, prefix='cached_', spec=None):
     return wrapper
 
 
-def cached(fn=None, expires=None):
+def cached(fn=None, expires=None, maxsize=None):
     """
     Decorates the function to cache its return values.
 
@@ -183,22 +481,36 @@ def cached(fn=None, expires=None):
 
     If `expires` is set, the cached value is invalidated after the specified
     period (in seconds).
+
+    If `maxsize` is set, the cache keeps at most `maxsize` values of the
+    function; the least recently used values are discarded first.
+
+    The number of cache hits, misses and evictions of each cached function
+    is counted by every application process separately and could be
+    obtained with ``get_rex().cache.statistics()``.  To see the statistics
+    of a running server, use ``rex cache-stats`` (provided by ``rex.web``);
+    with a multi-process server, it reports the worker that served the
+    request.  Note that ``rex pyshell`` only shows its own process.
     """
-    assert fn is not None or expires is not None
+    assert fn is not None or expires is not None or maxsize is not None
+    assert maxsize is None or maxsize > 0
     if fn is not None:
         if expires is None:
-            return _decorate(fn)
+            return _decorate(fn, maxsize=maxsize)
         else:
             fn.expires = expires
-            return _decorate(fn, ExpireGate)
+            return _decorate(fn, ExpireGate, maxsize=maxsize)
     else:
-        return (lambda fn, expires=expires: cached(fn, expires))
+        return (lambda fn, expires=expires, maxsize=maxsize:
+                    cached(fn, expires, maxsize))
 
 
 def autoreload(fn):
     """
     Decorates the function to cache its return value.  The cached value is
-    re-evaluated if any of the files opened by the function change.
+    re-evaluated if any of the files opened by the function change.  File
+    changes are detected with inotify when it is available; otherwise the
+    files are checked at most once per second.
 
     The function must have only positional arguments with the last argument
     being ``open=open``.
@@ -22,6 +22,9 @@ import dateutil.parser
 
 class IncludeLoader:
 
+    # The maximum number of loaders kept in the application cache.
+    maxsize = 1024
+
     def __init__(self, LoaderClass):
         self.LoaderClass = LoaderClass
         self.stats = {}
@@ -310,8 +313,9 @@ class ValidatingLoader(getattr(yaml, 'CSafeLoader', yaml.SafeLoader)):
         if get_rex:
             cache = get_rex().cache
             cache_key = (filename, validate, self.master)
-            loader = cache.set_default_cb(
-                    cache_key, lambda: IncludeLoader(self.__class__))
+            loader = cache.set_cached_cb(
+                    IncludeLoader, IncludeLoader.maxsize, cache_key,
+                    IncludeLoader, self.__class__)
         else:
             loader = IncludeLoader(self.__class__)
         with guard("While processing !include directive:", location):
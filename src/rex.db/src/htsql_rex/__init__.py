@@ -35,11 +35,12 @@ from htsql.core.tr.binding import (Recipe, LiteralRecipe, ChainRecipe, Binding,
 from htsql.core.tr.bind import (BindByFreeTable, BindByAttachedTable,
         BindByRecipe)
 from htsql.core.tr.decorate import decorate_void
+from htsql.core.tr.translate import TranslateScope
 from htsql.core.tr.signature import Signature, Slot, IsInSig
 from htsql.core.tr.fn.bind import BindFunction, BindAmong
 from htsql.core.fmt.accept import AcceptJSON
 from htsql.core.fmt.format import JSONFormat
-from htsql.core.fmt.json import (EmitJSON, to_json, DomainToRaw, JS_MAP,
+from htsql.core.fmt.json import (EmitJSON, DomainToRaw, JS_MAP,
         JS_SEQ, JS_END)
 from htsql.tweak.gateway.command import SummonGateway, ActGateway
 import re
@@ -254,8 +255,9 @@ def isolate(app):
 
 class JSONWithNullFormat(JSONFormat):
 
-    def __init__(self):
-        super(JSONWithNullFormat, self).__init__(with_null=True)
+    def __init__(self, compact=False):
+        super(JSONWithNullFormat, self).__init__(with_null=True,
+                                                 compact=compact)
 
 
 class RexSummonJSON(SummonJSON):
@@ -275,7 +277,7 @@ class RexEmitJSON(EmitJSON):
             for token in super(RexEmitJSON, self).emit():
                 yield token
         else:
-            product_to_json = to_json(self.meta.domain)
+            product_to_json = self.to_json(self.meta.domain)
             for token in product_to_json(self.data):
                 yield token
 
@@ -432,6 +434,29 @@ class CloakChain(Lookup):
         return recipes
 
 
+class RexTranslateScope(TranslateScope):
+
+    rank(2.0)
+
+    def __call__(self):
+        # Session properties may be computed by arbitrary queries,
+        # so we cannot tell when a cached translation becomes stale.
+        if context.app.rex.properties:
+            return None
+        scope = super(RexTranslateScope, self).__call__()
+        if scope is None:
+            return None
+        session = (context.env.session()
+                   if context.env.session is not None else None)
+        if session is not None:
+            session = str(session)
+        masks = ()
+        if context.env.masks is not None:
+            masks = tuple((tuple(mask.path), mask.node, mask.syntax)
+                          for mask in context.env.masks())
+        return scope + (session, masks)
+
+
 def cloak(binding):
     if context.env.masks is None:
         return []
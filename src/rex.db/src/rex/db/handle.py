@@ -15,7 +15,7 @@ from .database import get_db
 from webob import Response
 from webob.exc import HTTPUnauthorized, HTTPNotFound, HTTPMovedPermanently
 from htsql.core.error import HTTPError
-from htsql.core.cmd.act import produce
+from htsql.core.cmd.act import produce, render_produce
 from htsql.core.fmt.accept import accept
 from htsql.core.fmt.emit import emit, emit_headers
 import re
@@ -88,7 +88,8 @@ class HandleHTSQLLocation(HandleLocation):
             req.method = 'GET'
             req.path_info = path_info
             req.query_string = query_string
-        # Gateway to HTSQL.
+        # Gateway to HTSQL.  The response body is rendered while it is
+        # being sent; HTSQL reactivates the application for each chunk.
         with confine(req, self):
             return req.get_response(db)
 
@@ -179,12 +180,12 @@ class Query:
         # Execute the query and render the output.
         with self.get_db():
             try:
-                product = produce(self.query, parameters)
+                product = render_produce(self.query, parameters)
                 format = accept(req.environ)
                 headerlist = emit_headers(format, product)
-                # Pull whole output to avoid random "HTSQL application is not
-                # activated" errors.  FIXME: how?
-                app_iter = list(emit(format, product))
+                # The output is generated while the response is being sent;
+                # `emit()` reactivates the application for each chunk.
+                app_iter = emit(format, product)
             except HTTPError as error:
                 return req.get_response(error)
             resp = Response(headerlist=headerlist, app_iter=app_iter)
@@ -5,6 +5,8 @@
 
 from rex.core import get_packages, get_settings, Error, cached
 from .fact import Driver
+from .fingerprint import (fact_fingerprint, get_schema_fingerprint,
+        get_fingerprints, set_fingerprints)
 from .sql import (sql_select_database, sql_create_database, sql_drop_database,
         sql_rename_database)
 import htsql.core.util
@@ -135,7 +137,7 @@ def get_cluster():
     return Cluster(db)
 
 
-def deploy(logging=False, dry_run=False, analyze=False):
+def deploy(logging=False, dry_run=False, analyze=False, force=False):
     """
     Deploys and validates the application schema from ``deploy.yaml``
     files.
@@ -146,6 +148,13 @@ def deploy(logging=False, dry_run=False, analyze=False):
         If set, the changes are rolled back at the end of the deployment.
     `analyze`
         If set, update database statistics at the end of the deployment.
+    `force`
+        If set, deploy all packages even if they have not changed since
+        the last deployment.
+
+    A fingerprint of each package's facts and the database schema is
+    saved with the deployment.  Packages whose facts did not change are
+    skipped as long as the database schema is unchanged too.
     """
     time_start = datetime.datetime.now()
     # Prepare the driver.
@@ -158,32 +167,54 @@ def deploy(logging=False, dry_run=False, analyze=False):
             driver.log_progress("Nothing to deploy.")
             return
         facts_by_package = {}
+        fingerprints = {}
         # Load and parse `deploy.yaml` files.
         for package in packages:
             driver.chdir(package.abspath('/'))
+            with package.open('deploy.yaml') as stream:
+                source = stream.read()
             package_facts = driver.parse(package.open('deploy.yaml'))
             if not isinstance(package_facts, list):
                 package_facts = [package_facts]
             facts_by_package[package] = package_facts
+            fingerprints[package.name] = \
+                    fact_fingerprint(driver, source, package_facts)
         driver.chdir(None)
-        # Deploying database schema.
-        for package in packages:
-            driver.log_progress("Deploying {}.", package.name)
-            facts = facts_by_package[package]
-            driver(facts)
-        # Validating directives.
-        driver.reset()
-        driver.lock()
-        for package in packages:
-            driver.log_progress("Validating {}.", package.name)
-            facts = facts_by_package[package]
-            driver(facts)
-        driver.unlock()
-        # Commit changes and report.
-        if not dry_run:
-            driver.commit()
+        # Skip leading packages that did not change since the last
+        # deployment; the following packages may depend on the changed
+        # ones so they are deployed again.
+        skipped = []
+        if not force:
+            schema_fingerprint = get_schema_fingerprint(driver.connection)
+            last_fingerprints = get_fingerprints(driver.connection)
+            for package in packages:
+                if (last_fingerprints.get(package.name) !=
+                        (fingerprints[package.name], schema_fingerprint)):
+                    break
+                driver.log_progress("Skipping {} (unchanged).", package.name)
+                skipped.append(package)
+        if len(skipped) < len(packages):
+            # Deploying database schema.
+            for package in packages[len(skipped):]:
+                driver.log_progress("Deploying {}.", package.name)
+                facts = facts_by_package[package]
+                driver(facts)
+            # Validating directives.
+            driver.reset()
+            driver.lock()
+            for package in packages:
+                driver.log_progress("Validating {}.", package.name)
+                facts = facts_by_package[package]
+                driver(facts)
+            driver.unlock()
+            set_fingerprints(driver.connection, fingerprints)
+            # Commit changes and report.
+            if not dry_run:
+                driver.commit()
+            else:
+                driver.log_progress("Rolling back changes (dry run).")
+                driver.rollback()
         else:
-            driver.log_progress("Rolling back changes (dry run).")
             driver.rollback()
         # post-commit statistics analysis
         if analyze:
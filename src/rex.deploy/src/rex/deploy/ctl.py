@@ -147,6 +147,10 @@ class DeployTask(RexTaskWithProject):
 
     Use option ``--analyze`` to update database statistics.
 
+    Packages whose ``deploy.yaml`` and data files did not change since
+    the last deployment are skipped unless the database schema was
+    modified.  Use option ``--force`` to deploy all packages.
+
     Toggle ``--debug`` to dump SQL statements submitted to
     the database server.
     """
@@ -157,6 +161,7 @@ class DeployTask(RexTaskWithProject):
         dry_run = option(hint="immediately rollback the changes")
         quiet = option('q', hint="suppress logging")
         analyze = option(hint="update database statistics")
+        force = option(hint="deploy unchanged packages too")
 
     def __call__(self):
         with self.make(initialize=False):
@@ -174,7 +179,7 @@ class DeployTask(RexTaskWithProject):
                 else:
                     debug(msg, *args, **kwds)
             deploy(logging=logging, dry_run=self.dry_run,
-                   analyze=self.analyze)
+                   analyze=self.analyze, force=self.force)
             if not self.quiet:
                 log("Done.")
 
@@ -7,6 +7,8 @@ from rex.core import (Error, guard, StrVal, BoolVal, OneOrSeqVal, MapVal,
         UnionVal, OnScalar)
 from .fact import Fact, LabelVal
 from .model import model
+from .sql import (sql_savepoint, sql_release_savepoint,
+        sql_rollback_to_savepoint)
 import os.path
 import csv
 import re
@@ -125,6 +127,17 @@ class DataFact(Fact):
             mapping['present'] = False
         return mapping
 
+    # Inputs with this many rows or more are deployed with set-based
+    # statements.
+    bulk_threshold = 100
+    # Savepoint for undoing a failed batch.
+    savepoint_name = 'rex_deploy_data'
+
+    def sources(self, driver):
+        if self.data_path is not None:
+            return [self.data_path]
+        return []
+
     def __call__(self, driver):
         # Ensures that the table contains the given data.
 
@@ -156,6 +169,16 @@ class DataFact(Fact):
         key_mask = [column_image.position
                     for column_image in image.primary_key]
 
+        # Use set-based statements for large inputs unless the rows could
+        # refer to each other.
+        is_bulk = (len(records) >= self.bulk_threshold and
+                   not driver.is_locked and
+                   not any(field.is_link and field.target_table is table
+                           for field in fields))
+        # Changes waiting to be applied in bulk.
+        pending = []
+        handles = set()
+
         for record_idx, record in enumerate(records):
             try:
                 # Convert field values to raw column values.
@@ -183,58 +206,22 @@ class DataFact(Fact):
                 row = tuple(row)
                 # The primary key value.
                 handle = tuple([row[idx] for idx in key_mask])
-                # Find an existing row by the PK.
-                old_row = image.data.get(image.primary_key, handle)
-                if self.is_present:
-                    if old_row is not None:
-                        # Find columns and values that changed.
-                        columns = []
-                        values = []
-                        for column, data, old_data in zip(image, row, old_row):
-                            # Normalize JSON values before comparing them.
-                            if column.type.qname in [('pg_catalog', 'json'),
-                                                     ('pg_catalog', 'jsonb')] and \
-                                    isinstance(old_data, str):
-                                old_data = json.dumps(json.loads(old_data), sort_keys=True)
-                            if data is SKIP or data == old_data:
-                                continue
-                            columns.append(column)
-                            values.append(data)
-                        if not columns:
-                            continue
-                        # Update an existing row.
-                        image.data.update(old_row, columns, values)
-                    else:
-                        # Add a new row.
-                        columns = []
-                        values = []
-                        for column, data in zip(image, row):
-                            if data is SKIP:
-                                continue
-                            columns.append(column)
-                            values.append(data)
-                        image.data.insert(columns, values)
-                else:
-                    if old_row is not None:
-                        # Remove the row.
-                        image.data.delete(old_row)
-                        # Data might be invalid.
-                        is_invalid = True
+                if not is_bulk:
+                    is_invalid |= self._change(image, handle, row)
             except Error as error:
-                # Add the row being processed to the error trace.
-                items = []
-                for field, data in zip(fields, record):
-                    if data is SKIP:
-                        continue
-                    if data is None:
-                        item = 'null'
-                    else:
-                        dumper = self._domain(field).dump
-                        item = htsql.core.util.to_literal(dumper(data))
-                    items.append(item)
-                error.wrap("While processing row #%s:" % (record_idx+1),
-                           "{%s}" % ", ".join(items))
+                self._wrap(error, fields, record, record_idx)
                 raise
+            if is_bulk:
+                # Apply pending changes before touching the same row again.
+                if handle in handles:
+                    is_invalid |= self._apply(table, fields, records, pending)
+                    pending = []
+                    handles = set()
+                handles.add(handle)
+                pending.append((record_idx, handle, row))
+
+        if pending:
+            is_invalid |= self._apply(table, fields, records, pending)
 
         # Invalidate cached data.
         if is_invalid:
@@ -242,6 +229,122 @@ class DataFact(Fact):
                 if dependent.is_link and dependent.target_table is table:
                     self._invalidate(dependent.table)
 
+    def _diff(self, image, handle, row):
+        # Finds how the table must change to contain the given row.
+        # Returns the operation, the existing row, and changed columns
+        # and values.
+
+        # Find an existing row by the PK.
+        old_row = image.data.get(image.primary_key, handle)
+        columns = []
+        values = []
+        if self.is_present:
+            if old_row is not None:
+                # Find columns and values that changed.
+                for column, data, old_data in zip(image, row, old_row):
+                    # Normalize JSON values before comparing them.
+                    if column.type.qname in [('pg_catalog', 'json'),
+                                             ('pg_catalog', 'jsonb')] and \
+                            isinstance(old_data, str):
+                        old_data = json.dumps(json.loads(old_data), sort_keys=True)
+                    if data is SKIP or data == old_data:
+                        continue
+                    columns.append(column)
+                    values.append(data)
+                if not columns:
+                    return (None, old_row, columns, values)
+                # Update an existing row.
+                return ('update', old_row, columns, values)
+            else:
+                # Add a new row.
+                for column, data in zip(image, row):
+                    if data is SKIP:
+                        continue
+                    columns.append(column)
+                    values.append(data)
+                return ('insert', old_row, columns, values)
+        else:
+            if old_row is not None:
+                # Remove the row.
+                return ('delete', old_row, columns, values)
+        return (None, old_row, columns, values)
+
+    def _change(self, image, handle, row):
+        # Applies changes for a single row; returns `True` if a row
+        # was removed.
+        action, old_row, columns, values = self._diff(image, handle, row)
+        if action == 'update':
+            image.data.update(old_row, columns, values)
+        elif action == 'insert':
+            image.data.insert(columns, values)
+        elif action == 'delete':
+            image.data.delete(old_row)
+            # Data might be invalid.
+            return True
+        return False
+
+    def _apply(self, table, fields, records, pending):
+        # Applies changes for a batch of rows with set-based statements;
+        # returns `True` if any rows were removed.
+        image = table.image
+        cursor = image.cursor
+        # Group changes by the operation and the set of columns.
+        inserts = collections.OrderedDict()
+        updates = collections.OrderedDict()
+        deletes = []
+        for record_idx, handle, row in pending:
+            action, old_row, columns, values = self._diff(image, handle, row)
+            if action == 'insert':
+                inserts.setdefault(tuple(columns), []).append(values)
+            elif action == 'update':
+                updates.setdefault(tuple(columns), []).append(
+                        (old_row, values))
+            elif action == 'delete':
+                deletes.append(old_row)
+        if not (inserts or updates or deletes):
+            return False
+        cursor.execute(sql_savepoint(self.savepoint_name))
+        try:
+            for columns in inserts:
+                image.data.insert_many(list(columns), inserts[columns])
+            for columns in updates:
+                old_rows, values_list = list(zip(*updates[columns]))
+                image.data.update_many(
+                        list(old_rows), list(columns), list(values_list))
+            if deletes:
+                image.data.delete_many(deletes)
+        except Error:
+            # Undo the batch and repeat it row by row to find and report
+            # the offending row.
+            cursor.execute(sql_rollback_to_savepoint(self.savepoint_name))
+            self._invalidate(table)
+            self._fetch(table)
+            image = table.image
+            for record_idx, handle, row in pending:
+                try:
+                    self._change(image, handle, row)
+                except Error as error:
+                    self._wrap(error, fields, records[record_idx], record_idx)
+                    raise
+            return bool(deletes)
+        cursor.execute(sql_release_savepoint(self.savepoint_name))
+        return bool(deletes)
+
+    def _wrap(self, error, fields, record, record_idx):
+        # Adds the row being processed to the error trace.
+        items = []
+        for field, data in zip(fields, record):
+            if data is SKIP:
+                continue
+            if data is None:
+                item = 'null'
+            else:
+                dumper = self._domain(field).dump
+                item = htsql.core.util.to_literal(dumper(data))
+            items.append(item)
+        error.wrap("While processing row #%s:" % (record_idx+1),
+                   "{%s}" % ", ".join(items))
+
     def _load(self, table):
         # Loads input data and produces a list of tuples.
 
@@ -425,6 +425,24 @@ class Driver:
         finally:
             cursor.close()
 
+    def copy(self, sql, stream):
+        """
+        Executes ``COPY ... FROM STDIN`` reading the input from `stream`.
+        """
+        if self.is_locked:
+            raise Error("Detected inconsistent data model:", sql)
+        self._htsql = None
+        cursor = self.connection.cursor()
+        try:
+            self.log_sql("{}", sql)
+            cursor.copy_expert(sql, stream)
+        except psycopg2.Error as exc:
+            error = Error("Got an error from the database driver:", exc)
+            error.wrap("While executing SQL:", sql)
+            raise error
+        finally:
+            cursor.close()
+
     def execute(self, sql):
         """
         Executes a SQL query.
@@ -553,6 +571,14 @@ class Fact(Extension):
         """
         raise NotImplementedError("%s.__call__()" % self.__class__.__name__)
 
+    def sources(self, driver):
+        """
+        Returns the list of files the fact reads when deployed.
+
+        Used to determine if the fact changed since the last deployment.
+        """
+        return []
+
     def clone(self, **kwds):
         """
         Makes a copy of the :class:`Fact` instance with some fields overridden.
@@ -0,0 +1,234 @@
+#
+# Copyright (c) 2013, Prometheus Research, LLC
+#
+
+
+from .sql import sql_template
+import hashlib
+import os.path
+
+
+# Schema for deployment bookkeeping; hidden from the application model.
+FINGERPRINT_SCHEMA = 'rex_deploy'
+FINGERPRINT_TABLE = 'fingerprint'
+
+
+def fact_fingerprint(driver, source, facts):
+    """
+    Computes a fingerprint of a list of facts.
+
+    `driver`
+        The deployment driver.
+    `source`
+        The text from which the facts are parsed.
+    `facts`
+        List of :class:`rex.deploy.Fact` instances.
+
+    The fingerprint covers the facts and the content of all files
+    they refer to.
+    """
+    digest = hashlib.sha1()
+    digest.update(source.encode('utf-8'))
+    for fact in facts:
+        digest.update(("\0%s.%s\0%r" % (fact.__class__.__module__,
+                                       fact.__class__.__name__,
+                                       fact)).encode('utf-8'))
+        for path in fact.sources(driver):
+            digest.update(("\0%s\0" % path).encode('utf-8'))
+            if os.path.isfile(path):
+                with open(path, 'rb') as stream:
+                    digest.update(stream.read())
+    return digest.hexdigest()
+
+
+@sql_template
+def sql_schema_fingerprint(excluded_names):
+    """
+    # set filter
+        n.nspname NOT LIKE 'pg\\_%' AND
+            n.nspname NOT IN ('information_schema', {{ excluded_names|v }})
+    # endset
+    SELECT MD5(ARRAY_TO_STRING(ARRAY(
+        SELECT 'n:' || n.nspname
+        FROM pg_catalog.pg_namespace n
+        WHERE {{ filter }}
+        UNION ALL
+        SELECT 'c:' || n.nspname || '.' || c.relname || ':' || c.relkind ||
+               ':' || COALESCE(d.description, '')
+        FROM pg_catalog.pg_class c
+        JOIN pg_catalog.pg_namespace n ON (c.relnamespace = n.oid)
+        LEFT JOIN pg_catalog.pg_description d
+            ON (d.classoid = 'pg_catalog.pg_class'::regclass AND
+                d.objoid = c.oid AND d.objsubid = 0)
+        WHERE {{ filter }}
+        UNION ALL
+        SELECT 'a:' || n.nspname || '.' || c.relname || '.' || a.attname ||
+               ':' || pg_catalog.format_type(a.atttypid, a.atttypmod) ||
+               ':' || a.attnotnull ||
+               ':' || COALESCE(pg_catalog.pg_get_expr(e.adbin, e.adrelid), '') ||
+               ':' || COALESCE(d.description, '')
+        FROM pg_catalog.pg_attribute a
+        JOIN pg_catalog.pg_class c ON (a.attrelid = c.oid)
+        JOIN pg_catalog.pg_namespace n ON (c.relnamespace = n.oid)
+        LEFT JOIN pg_catalog.pg_attrdef e
+            ON (e.adrelid = a.attrelid AND e.adnum = a.attnum)
+        LEFT JOIN pg_catalog.pg_description d
+            ON (d.classoid = 'pg_catalog.pg_class'::regclass AND
+                d.objoid = c.oid AND d.objsubid = a.attnum)
+        WHERE a.attnum > 0 AND NOT a.attisdropped AND {{ filter }}
+        UNION ALL
+        SELECT 'k:' || n.nspname || '.' || c.relname || '.' || r.conname ||
+               ':' || pg_catalog.pg_get_constraintdef(r.oid) ||
+               ':' || COALESCE(d.description, '')
+        FROM pg_catalog.pg_constraint r
+        JOIN pg_catalog.pg_class c ON (r.conrelid = c.oid)
+        JOIN pg_catalog.pg_namespace n ON (c.relnamespace = n.oid)
+        LEFT JOIN pg_catalog.pg_description d
+            ON (d.classoid = 'pg_catalog.pg_constraint'::regclass AND
+                d.objoid = r.oid)
+        WHERE {{ filter }}
+        UNION ALL
+        SELECT 'i:' || pg_catalog.pg_get_indexdef(i.indexrelid)
+        FROM pg_catalog.pg_index i
+        JOIN pg_catalog.pg_class c ON (i.indexrelid = c.oid)
+        JOIN pg_catalog.pg_namespace n ON (c.relnamespace = n.oid)
+        WHERE {{ filter }}
+        UNION ALL
+        SELECT 't:' || n.nspname || '.' || t.typname || ':' || t.typtype ||
+               ':' || pg_catalog.format_type(t.typbasetype, t.typtypmod) ||
+               ':' || ARRAY_TO_STRING(ARRAY(
+                        SELECT l.enumlabel
+                        FROM pg_catalog.pg_enum l
+                        WHERE l.enumtypid = t.oid
+                        ORDER BY l.enumsortorder), ',') ||
+               ':' || COALESCE(d.description, '')
+        FROM pg_catalog.pg_type t
+        JOIN pg_catalog.pg_namespace n ON (t.typnamespace = n.oid)
+        LEFT JOIN pg_catalog.pg_description d
+            ON (d.classoid = 'pg_catalog.pg_type'::regclass AND
+                d.objoid = t.oid)
+        WHERE t.typtype IN ('d', 'e') AND {{ filter }}
+        UNION ALL
+        SELECT 'p:' || p.oid::regprocedure || ':' || MD5(p.prosrc)
+        FROM pg_catalog.pg_proc p
+        JOIN pg_catalog.pg_namespace n ON (p.pronamespace = n.oid)
+        WHERE {{ filter }}
+        UNION ALL
+        SELECT 'g:' || pg_catalog.pg_get_triggerdef(g.oid)
+        FROM pg_catalog.pg_trigger g
+        JOIN pg_catalog.pg_class c ON (g.tgrelid = c.oid)
+        JOIN pg_catalog.pg_namespace n ON (c.relnamespace = n.oid)
+        WHERE NOT g.tgisinternal AND {{ filter }}
+        UNION ALL
+        SELECT 'x:' || x.extname || ':' || x.extversion
+        FROM pg_catalog.pg_extension x
+        ORDER BY 1), E'\\n'));
+    """
+
+
+@sql_template
+def sql_fingerprint_table_exists(schema_name, table_name):
+    """
+    SELECT TRUE
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON (c.relnamespace = n.oid)
+    WHERE n.nspname = {{ schema_name|v }} AND c.relname = {{ table_name|v }};
+    """
+
+
+@sql_template
+def sql_create_fingerprint_table(schema_name, table_name):
+    """
+    CREATE SCHEMA IF NOT EXISTS {{ schema_name|n }};
+    CREATE TABLE IF NOT EXISTS {{ schema_name|n }}.{{ table_name|n }} (
+        "package" TEXT NOT NULL PRIMARY KEY,
+        "fingerprint" TEXT NOT NULL,
+        "schema_fingerprint" TEXT NOT NULL,
+        "deployed" TIMESTAMP NOT NULL DEFAULT NOW());
+    """
+
+
+@sql_template
+def sql_select_fingerprints(schema_name, table_name):
+    """
+    SELECT "package", "fingerprint", "schema_fingerprint"
+    FROM {{ schema_name|n }}.{{ table_name|n }};
+    """
+
+
+@sql_template
+def sql_replace_fingerprints(schema_name, table_name, fingerprints,
+                             schema_fingerprint):
+    """
+    DELETE FROM {{ schema_name|n }}.{{ table_name|n }};
+    # if fingerprints
+    INSERT INTO {{ schema_name|n }}.{{ table_name|n }}
+        ("package", "fingerprint", "schema_fingerprint")
+        VALUES
+    # for package, fingerprint in fingerprints
+        ({{ package|v }}, {{ fingerprint|v }}, {{ schema_fingerprint|v }})
+        {%- if not loop.last %},{% else %};{% endif %}
+    # endfor
+    # endif
+    """
+
+
+def get_schema_fingerprint(connection):
+    """
+    Computes a fingerprint of the database schema.
+
+    The fingerprint reflects the structure of the database: schemas,
+    tables, columns, constraints, indexes, types, functions and triggers
+    together with their comments, but not the data.
+    """
+    sql = sql_schema_fingerprint([FINGERPRINT_SCHEMA])
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql)
+        [(fingerprint,)] = cursor.fetchall()
+    finally:
+        cursor.close()
+    return fingerprint
+
+
+def get_fingerprints(connection):
+    """
+    Returns fingerprints saved by the last deployment.
+
+    Returns a dictionary that maps a package name to a pair of the package
+    fingerprint and the schema fingerprint.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql_fingerprint_table_exists(
+            FINGERPRINT_SCHEMA, FINGERPRINT_TABLE))
+        if not cursor.fetchall():
+            return {}
+        cursor.execute(sql_select_fingerprints(
+            FINGERPRINT_SCHEMA, FINGERPRINT_TABLE))
+        return dict((package, (fingerprint, schema_fingerprint))
+                    for package, fingerprint, schema_fingerprint
+                    in cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def set_fingerprints(connection, fingerprints):
+    """
+    Saves package fingerprints together with the current schema
+    fingerprint.
+
+    `fingerprints`
+        Dictionary that maps a package name to its fingerprint.
+    """
+    schema_fingerprint = get_schema_fingerprint(connection)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql_create_fingerprint_table(
+            FINGERPRINT_SCHEMA, FINGERPRINT_TABLE))
+        cursor.execute(sql_replace_fingerprints(
+            FINGERPRINT_SCHEMA, FINGERPRINT_TABLE,
+            sorted(fingerprints.items()), schema_fingerprint))
+    finally:
+        cursor.close()
+    return schema_fingerprint
@@ -17,10 +17,13 @@ from .sql import (sql_create_schema, sql_drop_schema, sql_rename_schema,
         sql_rename_sequence, sql_nextval, sql_create_function,
         sql_drop_function, sql_rename_function, sql_create_trigger,
         sql_drop_trigger, sql_rename_trigger, sql_comment_on_trigger,
-        sql_select, sql_insert, sql_update, sql_delete)
+        sql_select, sql_insert, sql_update, sql_delete, sql_copy_value,
+        sql_create_staging_table, sql_copy_from_stdin, sql_insert_from,
+        sql_update_from, sql_delete_from)
 import htsql.core.util
 import collections
 import weakref
+import io
 
 
 class Image:
@@ -1384,6 +1387,9 @@ class DataImage(Image):
 
     __slots__ = ('masks', 'indexes')
 
+    # Temporary table for batch operations.
+    staging_name = 'rex_deploy_staging'
+
     def __init__(self, table, rows):
         super(DataImage, self).__init__(table)
         table.data = self
@@ -1487,6 +1493,83 @@ class DataImage(Image):
         self.cursor.execute(sql)
         self.remove_row(old_row)
 
+    def stage(self, names, rows):
+        """
+        Loads rows to a temporary table; returns the table name.
+        """
+        qname = ('pg_temp', self.staging_name)
+        sql = sql_create_staging_table(qname, self.table.qname, names)
+        self.cursor.execute(sql)
+        stream = io.StringIO()
+        for row in rows:
+            stream.write("\t".join(sql_copy_value(data) for data in row))
+            stream.write("\n")
+        stream.seek(0)
+        sql = sql_copy_from_stdin(qname, names)
+        self.cursor.copy(sql, stream)
+        return qname
+
+    def unstage(self, qname):
+        """
+        Drops a temporary table made by :meth:`stage`.
+        """
+        sql = sql_drop_table(qname)
+        self.cursor.execute(sql)
+
+    def insert_many(self, columns, values_list):
+        """Inserts a batch of records into the table."""
+        names = [column.name for column in columns]
+        returning_names = [column.name for column in self.table]
+        source_qname = self.stage(names, values_list)
+        sql = sql_insert_from(
+                self.table.qname, names, source_qname, returning_names)
+        self.cursor.execute(sql)
+        output = self.cursor.fetchall()
+        assert len(output) == len(values_list)
+        self.unstage(source_qname)
+        for row in output:
+            self.append_row(row)
+
+    def update_many(self, old_rows, columns, values_list):
+        """Updates a batch of table records."""
+        key_column = self.table.columns.first()
+        assert len(key_column.unique_keys) > 0
+        names = [column.name for column in columns]
+        returning_names = [column.name for column in self.table]
+        rows = []
+        for old_row, values in zip(old_rows, values_list):
+            assert old_row[0] is not None
+            rows.append((old_row[0],)+tuple(values))
+        source_qname = self.stage([key_column.name]+names, rows)
+        sql = sql_update_from(
+                self.table.qname, key_column.name, names, source_qname,
+                returning_names)
+        self.cursor.execute(sql)
+        output = self.cursor.fetchall()
+        assert len(output) == len(old_rows)
+        self.unstage(source_qname)
+        # Remove all old rows before adding the new ones in case
+        # the records exchanged their unique keys.
+        for old_row in old_rows:
+            self.remove_row(old_row)
+        for row in output:
+            self.append_row(row)
+
+    def delete_many(self, old_rows):
+        """Deletes a batch of records from the table."""
+        key_column = self.table.columns.first()
+        assert len(key_column.unique_keys) > 0
+        rows = []
+        for old_row in old_rows:
+            assert old_row[0] is not None
+            rows.append((old_row[0],))
+        source_qname = self.stage([key_column.name], rows)
+        sql = sql_delete_from(self.table.qname, key_column.name, source_qname)
+        self.cursor.execute(sql)
+        self.unstage(source_qname)
+        for old_row in old_rows:
+            self.remove_row(old_row)
+
 
 def make_catalog(cursor):
     """Creates an empty catalog image."""
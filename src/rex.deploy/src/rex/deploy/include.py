@@ -41,6 +41,22 @@ class IncludeFact(Fact):
     def to_yaml(self, full=True):
         return {'include': self.path}
 
+    def sources(self, driver):
+        # The included file and the files used by the included facts.
+        paths = [self.path]
+        cwd = driver.cwd
+        driver.chdir(os.path.dirname(self.path))
+        try:
+            with open(self.path) as stream:
+                facts = driver.parse(stream)
+            if not isinstance(facts, list):
+                facts = [facts]
+            for fact in facts:
+                paths.extend(fact.sources(driver))
+        finally:
+            driver.chdir(cwd)
+        return paths
+
     def __call__(self, driver):
         cwd = driver.cwd
         driver.chdir(os.path.dirname(self.path))
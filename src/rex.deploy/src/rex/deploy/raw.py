@@ -83,6 +83,10 @@ class RawFact(Fact):
                 else self.check_sql_path
         return mapping
 
+    def sources(self, driver):
+        return [path for path in [self.action_sql_path, self.check_sql_path]
+                     if path is not None]
+
     def __call__(self, driver):
         # Prepare SQL.
         action_sql = self._load(self.action_sql, self.action_sql_path)
@@ -132,6 +132,29 @@ def sql_value(value):
                               % (value, type(value).__name__))
 
 
+def sql_copy_value(value):
+    """
+    Converts a value to the text format of ``COPY``.
+
+    `value`
+        SQL value.  Accepted types are the same as for :func:`sql_value`,
+        except lists and tuples.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float, decimal.Decimal,
+                          datetime.date, datetime.time, datetime.datetime)):
+        return str(value)
+    if isinstance(value, str):
+        return (value.replace("\\", "\\\\").replace("\t", "\\t")
+                     .replace("\n", "\\n").replace("\r", "\\r"))
+    raise NotImplementedError("sql_copy_value() is not implemented"
+                              " for value %s of type %s"
+                              % (value, type(value).__name__))
+
+
 # Customized Jinja environment for rendering SQL.
 sql_jinja = jinja2.Environment(
         line_statement_prefix='#')
@@ -633,6 +656,87 @@ def sql_delete(table_qname, key_name, key_value):
     """
 
 
+@sql_template
+def sql_create_staging_table(qname, table_qname, names):
+    """
+    CREATE TEMPORARY TABLE {{ qname|qn }} AS
+        SELECT {{ names|n }}
+        FROM {{ table_qname|qn }}
+        WITH NO DATA;
+    """
+
+
+@sql_template
+def sql_copy_from_stdin(qname, names):
+    """
+    COPY {{ qname|qn }} ({{ names|n }}) FROM STDIN;
+    """
+
+
+@sql_template
+def sql_insert_from(table_qname, names, source_qname, returning_names=None):
+    """
+    INSERT INTO {{ table_qname|qn }} ({{ names|n }})
+        SELECT {{ names|n }}
+        FROM {{ source_qname|qn }}
+        {%- if not returning_names %};{% endif %}
+    # if returning_names
+        RETURNING {{ returning_names|n }};
+    # endif
+    """
+
+
+@sql_template
+def sql_update_from(table_qname, key_name, names, source_qname,
+                    returning_names=None):
+    """
+    UPDATE {{ table_qname|qn }}
+        SET {% for name in names -%}
+                {{ name|n }} = {{ source_qname|qn }}.{{ name|n }}
+                {%- if not loop.last %}, {% endif %}
+            {%- endfor %}
+        FROM {{ source_qname|qn }}
+        WHERE {{ table_qname|qn }}.{{ key_name|n }} = {{ source_qname|qn }}.{{ key_name|n }}
+        {%- if not returning_names %};{% endif %}
+    # if returning_names
+        RETURNING {% for name in returning_names -%}
+                {{ table_qname|qn }}.{{ name|n }}
+                {%- if not loop.last %}, {% endif %}
+            {%- endfor %};
+    # endif
+    """
+
+
+@sql_template
+def sql_delete_from(table_qname, key_name, source_qname):
+    """
+    DELETE FROM {{ table_qname|qn }}
+        USING {{ source_qname|qn }}
+        WHERE {{ table_qname|qn }}.{{ key_name|n }} = {{ source_qname|qn }}.{{ key_name|n }};
+    """
+
+
+@sql_template
+def sql_savepoint(name):
+    """
+    SAVEPOINT {{ name|n }};
+    """
+
+
+@sql_template
+def sql_release_savepoint(name):
+    """
+    RELEASE SAVEPOINT {{ name|n }};
+    """
+
+
+@sql_template
+def sql_rollback_to_savepoint(name):
+    """
+    ROLLBACK TO SAVEPOINT {{ name|n }};
+    """
+
+
 def plpgsql_primary_key_procedure(*parts):
     return "\n%s\n" % sql_render("""
     BEGIN
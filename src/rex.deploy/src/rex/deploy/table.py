@@ -146,6 +146,12 @@ class TableFact(Fact):
                     for item in self.related]
         return mapping
 
+    def sources(self, driver):
+        paths = []
+        for fact in self.related or []:
+            paths.extend(fact.sources(driver))
+        return paths
+
     def __call__(self, driver):
         schema = model(driver)
         table = schema.table(self.label)
@@ -233,9 +233,15 @@ class Compute(Field):
         name=None,
         description=None,
         deprecation_reason=None,
+        batch=False,
         loc=autoloc,
     ):
-        if f is None:
+        if f is None and batch:
+            f = lambda parents, info, params: {
+                parent: getattr(parent, info.field_name, None)
+                for parent in parents
+            }
+        elif f is None:
             f = lambda parent, info, params: getattr(
                 parent, info.field_name, None
             )
@@ -250,6 +256,7 @@ class Compute(Field):
         self.name = name
         self.description = description
         self.deprecation_reason = deprecation_reason
+        self.batch = batch
 
 
 class Query(Field):
@@ -1242,6 +1249,7 @@ def compute(
     description: t.Optional[str] = None,
     name: t.Optional[str] = None,
     deprecation_reason: t.Optional[str] = None,
+    batch: bool = False,
     loc=autoloc,
 ) -> Field:
     """
@@ -1277,12 +1285,41 @@ def compute(
     By default :func:`compute` computes the value as ``getattr(parent, name)``
     but ``f`` argument can be supplied instead.
 
+    With ``batch=True`` the field is computed for many parents at once: ``f``
+    receives a list of parents instead of a single parent and returns a
+    mapping from parents to values (parents missing from the mapping get
+    ``null``). When the field is queried on a list of entities, ``f`` is called
+    once for the whole list, and the values are cached until the end of the
+    request. Params of a batched field are computed without a parent.
+
+    Example::
+
+        >>> def batch_size(parents, info, params):
+        ...     return {parent: len(parents) for parent in parents}
+
+        >>> region = Entity(
+        ...     'region',
+        ...     fields=lambda: {
+        ...         'batch_size': compute(
+        ...             scalar.Int,
+        ...             f=batch_size,
+        ...             batch=True,
+        ...         )
+        ...     }
+        ... )
+
+        >>> sch = schema(fields=lambda: {'region': query(q.region, region)})
+        >>> data = execute(sch, '{ region { batch_size } }')
+        >>> [item['batch_size'] for item in data.data['region']]
+        [5, 5, 5, 5, 5]
+
     :param type: GraphQL type
     :param f: Function used to compute the value of the field
     :param params: Field params
     :param name: Name
     :param description: Description
     :param deprecation_reason: Reason for deprecation
+    :param batch: Compute the field for many parents at once
     """
     loc = code_location.here() if loc is autoloc else loc
     return Compute(
@@ -1292,6 +1329,7 @@ def compute(
         name=name,
         description=description,
         deprecation_reason=deprecation_reason,
+        batch=batch,
         loc=loc,
     )
 
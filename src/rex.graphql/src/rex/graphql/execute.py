@@ -202,6 +202,7 @@ class ExecutionContext:
         self.context_value = context_value
         self._arguments_cache = {}
         self._subfields_cache = {}
+        self._batch_cache = {}
 
     def get_field_params(
         self, parent, parent_type, field: model.Field, field_node: language.ast.Field
@@ -246,6 +247,14 @@ class ExecutionContext:
         # self.errors.append(error.GraphQLError(msg))
         raise error.GraphQLError(msg)
 
+    def get_batch_values(self, field: model.ComputedField, field_nodes):
+        """ Values of a batched computed field found so far, keyed by parent.
+        """
+        k = field, tuple(field_nodes)
+        if k not in self._batch_cache:
+            self._batch_cache[k] = {}
+        return self._batch_cache[k]
+
     def get_sub_fields(self, return_type, field_nodes):
         k = return_type, tuple(field_nodes)
         if k not in self._subfields_cache:
@@ -639,6 +648,18 @@ def complete_data(
         return None
 
     if isinstance(return_type, model.ListType):
+        item_type = return_type.type
+        if isinstance(item_type, model.NonNullType):
+            item_type = item_type.type
+        if isinstance(item_type, model.RecordType):
+            prefetch_batched_fields(
+                ctx=ctx,
+                record_type=item_type,
+                field_nodes=field_nodes,
+                info=info,
+                path=path,
+                data=data,
+            )
         result = []
         for item in data:
             result.append(
@@ -706,6 +727,84 @@ def complete_data(
     )
 
 
+def prefetch_batched_fields(
+    ctx: ExecutionContext,
+    record_type: model.RecordType,
+    field_nodes,
+    info,
+    path,
+    data,
+):
+    """ Resolve batched computed fields for all records of a list at once.
+
+    The values are cached in the execution context where
+    :func:`resolve_field` finds them when completing each record.
+    """
+    parents = None
+    subfield_nodes = ctx.get_sub_fields(record_type, field_nodes)
+    for name, subfield_node_list in subfield_nodes.items():
+        field_name = subfield_node_list[0].name.value
+        field_def = record_type.fields.get(field_name)
+        if not isinstance(field_def, model.ComputedField) or not field_def.batch:
+            continue
+        if parents is None:
+            parents = [item.__id__ for item in data if item is not None]
+        field_info = make_info(
+            ctx,
+            field_name=field_name,
+            field_nodes=subfield_node_list,
+            return_type=field_def.type,
+            parent_type=record_type,
+            path=path + [name, field_name],
+        )
+        resolve_batched_field(
+            ctx=ctx,
+            parent_type=record_type,
+            field_def=field_def,
+            field_nodes=subfield_node_list,
+            parents=parents,
+            info=field_info,
+        )
+
+
+def resolve_batched_field(
+    ctx: ExecutionContext,
+    parent_type: model.RecordType,
+    field_def: model.ComputedField,
+    field_nodes: typing.List[language.ast.Field],
+    parents: typing.List[typing.Any],
+    info: ExecutionInfo,
+) -> typing.Dict[typing.Any, typing.Any]:
+    """ Call the resolver of a batched computed field with the parents
+    which have no cached value yet.
+    """
+    values = ctx.get_batch_values(field_def, field_nodes)
+    missing = list(
+        OrderedDict.fromkeys(
+            parent for parent in parents if parent not in values
+        )
+    )
+    if not missing:
+        return values
+
+    params = ctx.get_field_params(None, parent_type, field_def, field_nodes[0])
+    try:
+        result = field_def.resolver(missing, info, params)
+    except error.GraphQLError as err:
+        ctx.raise_error(
+            msg=f"Error while executing {parent_type.name}.{info.field_name}: {err}",
+        )
+    except Exception:
+        get_sentry().captureException()
+        ctx.raise_error(
+            msg=f"Error while executing {parent_type.name}.{info.field_name}",
+            exc_info=sys.exc_info(),
+        )
+    for parent in missing:
+        values[parent] = result.get(parent)
+    return values
+
+
 def complete_value(
     ctx: ExecutionContext,
     return_type: model.Type,
@@ -852,28 +951,28 @@ def resolve_field(
 
     return_type = field_def.type
 
-    # The resolve function's optional third argument is a context value that is
-    # provided to every resolve function within an execution. It is commonly
-    # used to represent an authenticated user, or request-specific caches.
-    context = ctx.context_value
-
     # The resolve function's optional third argument is a collection of
     # information about the current execution state.
-    info = ExecutionInfo(
+    info = make_info(
+        ctx,
         field_name=field_name,
         field_nodes=field_nodes,
         return_type=return_type,
         parent_type=parent_type,
-        schema=ctx.schema,
-        fragments=ctx.fragments,
-        root_value=ctx.root_value,
-        operation=ctx.operation,
-        variable_values=ctx.variable_values,
-        context=context,
         path=path + [field_name],
     )
 
-    if isinstance(field_def, model.ComputedField):
+    if isinstance(field_def, model.ComputedField) and field_def.batch:
+        values = resolve_batched_field(
+            ctx=ctx,
+            parent_type=parent_type,
+            field_def=field_def,
+            field_nodes=field_nodes,
+            parents=[parent],
+            info=info,
+        )
+        result = values[parent]
+    elif isinstance(field_def, model.ComputedField):
         # Build a dict of arguments from the field.arguments AST, using the
         # variables scope to fulfill any variable references.
         params = ctx.get_field_params(parent, parent_type, field_def, field_node)
@@ -900,6 +999,29 @@ def resolve_field(
     return result, info, return_type
 
 
+def make_info(
+    ctx: ExecutionContext,
+    field_name: str,
+    field_nodes: typing.List[language.ast.Field],
+    return_type: model.Type,
+    parent_type: model.Type,
+    path: typing.List[typing.Union[int, str]],
+) -> ExecutionInfo:
+    return ExecutionInfo(
+        field_name=field_name,
+        field_nodes=field_nodes,
+        return_type=return_type,
+        parent_type=parent_type,
+        schema=ctx.schema,
+        fragments=ctx.fragments,
+        root_value=ctx.root_value,
+        operation=ctx.operation,
+        variable_values=ctx.variable_values,
+        context=ctx.context_value,
+        path=path,
+    )
+
+
 def execute_query_field(ctx, parent, parent_type, field: model.QueryField, field_nodes):
     state = RexBindingState()
     binding = bind_query_field(state, ctx, parent, parent_type, field, field_nodes)
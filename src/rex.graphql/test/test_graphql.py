@@ -474,6 +474,110 @@ def test_data_computed_field():
     }
 
 
+def test_batch_computed_field():
+    calls = []
+
+    def get_message(parents, info, params):
+        calls.append(len(parents))
+        return {parent: f"Hello from '{parent}'" for parent in parents}
+
+    region = Entity(
+        "region",
+        fields=lambda: {
+            "name": query(q.name),
+            "message": compute(scalar.String, f=get_message, batch=True),
+        },
+    )
+    sch = schema(
+        fields=lambda: {
+            "region": query(q.region, region),
+            "africa": query(q.region.filter(q.name == "AFRICA"), region),
+        }
+    )
+    data = execute(
+        sch,
+        """
+        query {
+            region {
+                message
+            }
+            africa {
+                message
+            }
+        }
+        """,
+    ).data
+    assert data == {
+        "region": [
+            {"message": "Hello from 'AFRICA'"},
+            {"message": "Hello from 'AMERICA'"},
+            {"message": "Hello from 'ASIA'"},
+            {"message": "Hello from 'EUROPE'"},
+            {"message": "Hello from ''MIDDLE EAST''"},
+        ],
+        "africa": [{"message": "Hello from 'AFRICA'"}],
+    }
+    # All regions are resolved at once and AFRICA is found in the cache.
+    assert calls == [5]
+
+
+def test_batch_computed_field_nested():
+    calls = []
+
+    def get_nation_count(parents, info, params):
+        calls.append(len(parents))
+        return {parent: len(parents) for parent in parents}
+
+    region = Entity(
+        "region",
+        fields=lambda: {
+            "nation": query(q.nation, nation),
+        },
+    )
+    nation = Entity(
+        "nation",
+        fields=lambda: {
+            "batch_size": compute(
+                scalar.Int, f=get_nation_count, batch=True
+            ),
+        },
+    )
+    sch = schema(fields=lambda: {"region": query(q.region, region)})
+    data = execute(
+        sch,
+        """
+        query {
+            region {
+                nation {
+                    batch_size
+                }
+            }
+        }
+        """,
+    ).data
+    assert [
+        [item["batch_size"] for item in region["nation"]]
+        for region in data["region"]
+    ] == [[5, 5, 5, 5, 5]] * 5
+    assert calls == [5] * 5
+
+
+def test_batch_computed_field_missing_value():
+    region = Entity(
+        "region",
+        fields=lambda: {
+            "message": compute(
+                scalar.String,
+                f=lambda parents, info, params: {},
+                batch=True,
+            ),
+        },
+    )
+    sch = schema(fields=lambda: {"region": query(q.region, region)})
+    data = execute(sch, "query { region { message } }").data
+    assert data == {"region": [{"message": None}] * 5}
+
+
 def test_computed_arg_simple():
     def get_message(parent, info, params):
         name = params.get("name", "Mr.None")
@@ -1444,6 +1548,32 @@ def test_exec_err_compute_raises():
     assert res.errors[0].message == "Error while executing Root.number"
 
 
+def test_exec_err_batch_compute_raises():
+    def get_message(parents, info, params):
+        raise TypeError("just some error here")
+
+    region = Entity(
+        "region",
+        fields=lambda: {
+            "message": compute(scalar.String, f=get_message, batch=True),
+        },
+    )
+    sch = schema(fields=lambda: {"region": query(q.region, region)})
+
+    res = execute(
+        sch,
+        """
+        query {
+            region {
+                message
+            }
+        }
+        """,
+    )
+    assert res.invalid
+    assert res.errors[0].message == "Error while executing region.message"
+
+
 def test_conf_err_unknown_field_via_second_path():
     with pytest.raises(Error):
         part = Entity(
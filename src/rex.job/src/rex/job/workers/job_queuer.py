@@ -2,6 +2,12 @@
 # Copyright (c) 2017, Prometheus Research, LLC
 #
 
+import heapq
+import json
+import time
+
+from htsql.core.connect import transaction
+
 from rex.asynctask import AsyncTaskWorker, get_transport
 from rex.core import get_settings
 from rex.db import get_db
@@ -12,33 +18,81 @@ __all__ = (
 )
 
 
-HTSQL_GET_NEW = '''
-/job{
+# Claims the new jobs that fit within the concurrency limits of their types,
+# oldest first. Jobs locked by another queuer are skipped.
+SQL_CLAIM_NEW = '''
+WITH limits AS (
+    SELECT
+        key AS type,
+        value::integer AS max_concurrency
+    FROM
+        json_each_text(%s::json)
+), running AS (
+    SELECT
+        type,
+        COUNT(*) AS num_running
+    FROM
+        job
+    WHERE
+        status IN ('started', 'queued')
+    GROUP BY
+        type
+), candidate AS (
+    SELECT
+        id,
         code,
         type,
-    }
-    .filter(
-        status='new'
-    )
-    .sort(
-        date_submitted,
-        code
-    )
-'''
-
-HTSQL_CHECK_RUNNING = '''
-/count(job.filter(
-    type = $job_type
-    & status = {'started', 'queued'}
-))
+        date_submitted
+    FROM
+        job
+    WHERE
+        status = 'new'
+    FOR UPDATE SKIP LOCKED
+), ranked AS (
+    SELECT
+        id,
+        type,
+        ROW_NUMBER() OVER (
+            PARTITION BY type
+            ORDER BY date_submitted, code
+        ) AS position
+    FROM
+        candidate
+), eligible AS (
+    SELECT
+        ranked.id
+    FROM
+        ranked
+        LEFT JOIN limits ON (limits.type = ranked.type)
+        LEFT JOIN running ON (running.type = ranked.type)
+    WHERE
+        limits.max_concurrency IS NULL
+        OR ranked.position + COALESCE(running.num_running, 0)
+            <= limits.max_concurrency
+)
+UPDATE
+    job
+SET
+    status = 'queued'
+FROM
+    eligible
+WHERE
+    job.id = eligible.id
+RETURNING
+    job.code,
+    job.date_submitted,
+    EXTRACT(EPOCH FROM LOCALTIMESTAMP - job.date_submitted)
 '''
 
-HTSQL_UPDATE_NEW = '''
-/job[$job]{
-        id(),
-        'queued' :as status,
-    }
-    /:update
+# Returns the claimed jobs that could not be submitted to their queue.
+SQL_RELEASE = '''
+UPDATE
+    job
+SET
+    status = 'new'
+WHERE
+    code = ANY(%s)
+    AND status = 'queued'
 '''
 
 
@@ -46,6 +100,10 @@ class JobQueuerWorker(AsyncTaskWorker):
     """
     This worker will find "new" jobs and submit them to rex.asynctask for
     execution.
+
+    The jobs are claimed with a single statement that honors the
+    ``max_concurrency`` limits of the ``job_limits`` setting, and each job is
+    sent to the queue with the fewest waiting tasks.
     """
 
     #:
@@ -54,24 +112,91 @@ class JobQueuerWorker(AsyncTaskWorker):
     def process(self, payload):
         database = get_db()
         transport = get_transport()
+        started = time.time()
+
+        limits = dict(
+            (job_type, limit['max_concurrency'])
+            for job_type, limit in get_settings().job_limits.items()
+            if limit['max_concurrency'] is not None
+        )
+
+        # The jobs are claimed in a transaction of their own, so a task is
+        # never submitted for a claim that is rolled back afterwards.
+        with database, database.transaction():
+            with transaction() as connection:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(SQL_CLAIM_NEW, (json.dumps(limits),))
+                    jobs = sorted(
+                        cursor.fetchall(),
+                        key=lambda job: (job[1], job[0]),
+                    )
+                finally:
+                    cursor.close()
+        if not jobs:
+            return
+
+        queue_names = self.get_queue_names()
+        tasks = [[] for _ in queue_names]
+        depths = [
+            (transport.poll_queue(queue_name), queue_num)
+            for queue_num, queue_name in enumerate(queue_names)
+        ]
+        heapq.heapify(depths)
+        latencies = {}
+        for code, _, latency in jobs:
+            depth, queue_num = heapq.heappop(depths)
+            tasks[queue_num].append({'code': code})
+            heapq.heappush(depths, (depth + 1, queue_num))
+            # The latency of a job is how long it waited since its submission.
+            latencies[code] = float(latency)
+
+        # The jobs of a queue that did not accept its tasks become new again,
+        # to be picked up by the next run.
+        released = []
+        for queue_name, queue_tasks in zip(queue_names, tasks):
+            if not queue_tasks:
+                continue
+            try:
+                transport.submit_tasks(queue_name, queue_tasks)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.exception(
+                    'Failed to submit %s jobs to queue %s',
+                    len(queue_tasks),
+                    queue_name,
+                )
+                released.extend(task['code'] for task in queue_tasks)
+        if released:
+            with database, database.transaction():
+                with transaction() as connection:
+                    cursor = connection.cursor()
+                    try:
+                        cursor.execute(SQL_RELEASE, (released,))
+                    finally:
+                        cursor.close()
+            for code in released:
+                del latencies[code]
+        if not latencies:
+            return
+
+        self.logger.info(
+            'Dispatched %s jobs in %.3fs; latency_avg=%.3fs, latency_max=%.3fs',
+            len(latencies),
+            time.time() - started,
+            sum(latencies.values()) / len(latencies),
+            max(latencies.values()),
+        )
+
+    def get_queue_names(self):
+        """
+        Returns the names of the queues the jobs are spread over.
+
+        :rtype: list of str
+        """
 
-        queue_num = 0
-        for job in database.produce(HTSQL_GET_NEW):
-            if job.type in get_settings().job_limits:
-                max_concurrency = get_settings() \
-                    .job_limits[job.type]['max_concurrency']
-                if max_concurrency is not None:
-                    num_type_running = database.produce(
-                        HTSQL_CHECK_RUNNING,
-                        job_type=job.type,
-                    )[0]
-                    if num_type_running >= max_concurrency:
-                        continue
-
-            transport.submit_task(
-                'rex_job_%s' % queue_num,
-                {'code': job.code},
-            )
-            database.produce(HTSQL_UPDATE_NEW, job=job.code)
-            queue_num = (queue_num + 1) % get_settings().job_queues
+        # pylint: disable=no-self-use
 
+        return [
+            'rex_job_%s' % (queue_num,)
+            for queue_num in range(get_settings().job_queues)
+        ]
@@ -3,8 +3,18 @@
 #
 
 
+import collections
+import hashlib
+import json
+
+from htsql.core.connect import transaction
+from htsql.core.model import ColumnArc
+from htsql.tweak.etl.cmd.copy import BuildCollectCopy
+from htsql.tweak.etl.cmd.insert import BuildExtractTable
+
+from rex.core import get_settings
 from rex.port import Port
-from rex.port.replace import adapt, flatten, match, patch
+from rex.port.replace import adapt, flatten, scalars, Reference, MISSING
 from rex.instrument import Assessment
 
 from .tables import PrimaryTable
@@ -12,13 +22,24 @@ from .tables import PrimaryTable
 
 __all__ = (
     'AssessmentLoader',
+    'prepare_digests',
 )
 
 
+# Bookkeeping of the loaded Assessments; hidden from the Mart model.
+DIGEST_SCHEMA = 'rexmart'
+DIGEST_TABLE = 'assessment_digest'
+
+
 class AssessmentLoader(object):
     def __init__(self, definition, database, parameters=None):
         self.definition = definition
         self.parameters = parameters or {}
+        self.num_rows = 0
+        self.num_added = 0
+        self.num_changed = 0
+        self.num_removed = 0
+        self.loaded_uids = []
         self.mapping = PrimaryTable(
             self.definition,
             database,
@@ -35,22 +56,50 @@ class AssessmentLoader(object):
         params['INSTRUMENT'] = self.definition['instrument']
         return params
 
-    def load(self, database):
+    def load(self, database, incremental=False):
+        """
+        Writes the selected Assessments to the Mart.
+
+        In incremental mode, only the Assessments that were added or changed
+        since the previous load are written, and the ones that are no longer
+        selected are removed.
+
+        :returns: the number of Assessments written
+        """
+
         tree = self.mapping.get_port_tree()
         port = Port(tree, database)
         assessment_impl = Assessment.get_implementation()
+        table_name = self.mapping.table_name
+
+        batch_size = get_settings().mart_load_batch_size
 
-        num_assessments = 0
+        self.num_rows = 0
+        self.num_added = 0
+        self.num_changed = 0
+        self.num_removed = 0
+        self.loaded_uids = []
         selected = database.produce(
             self.definition['selector']['query'],
             **self.get_selector_params()
         )
 
-        for i in range(0, len(selected), 100):
+        digests = {}
+        if incremental:
+            with database:
+                digests = _get_digests(table_name)
+            selected_uids = set([str(rec.assessment_uid) for rec in selected])
+            removed = [uid for uid in digests if uid not in selected_uids]
+            if removed:
+                with database, database.transaction():
+                    _delete_assessments(table_name, removed)
+                self.num_removed += len(removed)
+
+        for i in range(0, len(selected), batch_size):
             # Retrieve a batch of Assessments from the datastore
             selected_value_map = dict([
                 (str(rec.assessment_uid), rec)
-                for rec in selected[i:i + 100]
+                for rec in selected[i:i + batch_size]
             ])
             assessments = assessment_impl.bulk_retrieve(
                 list(selected_value_map.keys())
@@ -58,6 +107,12 @@ class AssessmentLoader(object):
 
             # Collect port data.
             dataset = []
+            new_digests = {}
+            stale = set(
+                uid
+                for uid in selected_value_map
+                if uid in digests
+            )
             for assessment in assessments:
                 if not assessment.data:
                     continue
@@ -70,16 +125,45 @@ class AssessmentLoader(object):
                 data['assessment_uid'] = assessment.uid
                 data['instrument_version_uid'] = \
                     assessment.instrument_version_uid
+
+                digest = _get_digest(data)
+                if assessment.uid in digests:
+                    stale.discard(assessment.uid)
+                    if digests[assessment.uid] == digest:
+                        continue
+                    self.num_changed += 1
+                else:
+                    self.num_added += 1
                 dataset.append(data)
+                new_digests[assessment.uid] = digest
 
-                num_assessments += 1
+            # Assessments that lost their data are removed.
+            self.num_removed += len(stale)
+
+            if not dataset and not stale:
+                continue
 
             # Submit port data.
-            _insert_into_port(port, dataset)
+            with database, database.transaction():
+                _delete_assessments(
+                    table_name,
+                    [uid for uid in new_digests if uid in digests]
+                    + sorted(stale),
+                )
+                self.num_rows += _copy_into_port(port, dataset)
+                _save_digests(table_name, new_digests)
+            self.loaded_uids.extend(new_digests)
+
+        return len(self.loaded_uids)
 
-        return num_assessments
+    def do_calculations(self, database, assessment_uids=None):
+        """
+        Performs the post-load calculations.
+
+        If ``assessment_uids`` is specified, only the records of these
+        Assessments are recalculated.
+        """
 
-    def do_calculations(self, database):
         if not self.definition['post_load_calculations']:
             return
 
@@ -87,16 +171,221 @@ class AssessmentLoader(object):
         params.update(self.parameters)
         params['INSTRUMENT'] = self.definition['instrument']
 
-        for statement in self.mapping.get_calculation_statements():
+        if assessment_uids is None:
+            statements = self.mapping.get_calculation_statements()
+        else:
+            batch_size = get_settings().mart_load_batch_size
+            statements = []
+            for i in range(0, len(assessment_uids), batch_size):
+                statements.extend(self.mapping.get_calculation_statements(
+                    assessment_uids=assessment_uids[i:i + batch_size],
+                ))
+
+        for statement in statements:
             database.produce(statement, **params)
 
 
-def _insert_into_port(port, dataset):
-    # Faster port.insert() without refetching and validation.
+def _copy_into_port(port, dataset):
+    # Faster port.insert() without refetching and validation; writes the
+    # records with COPY and returns the number of written rows.
+    num_rows = 0
     with port.db, port.db.transaction():
         tree = port.tree
-        old_map = flatten(tree, adapt(tree, None))
-        new_map = flatten(tree, adapt(tree, dataset))
-        pair_map = match(old_map, new_map)
-        patch(pair_map, port._command_cache)  # noqa: protected-access
+        cell_map = flatten(tree, adapt(tree, dataset))
+        # The `id` values assigned to the records, so that the nested
+        # records could refer to their parents.
+        reference_to_id = {}
+        for cells in cell_map.values():
+            # Records with the same set of fields are copied together.
+            cells_by_mask = collections.OrderedDict()
+            arcs_by_node = {}
+            for cell in cells:
+                if cell.node not in arcs_by_node:
+                    arcs_by_node[cell.node] = list(scalars(cell.node))
+                mask = tuple(
+                    _field_kind(arc, field)
+                    for arc, field in zip(arcs_by_node[cell.node], cell.fields)
+                )
+                cells_by_mask.setdefault((cell.node, mask), []).append(cell)
+            for (node, mask), group in cells_by_mask.items():
+                command = _build_copy(node, mask, port._command_cache)  # noqa
+                command(group, reference_to_id)
+                num_rows += len(group)
+    return num_rows
+
+
+def _arc_columns(arc):
+    # The table columns that store the value of a column or a link.
+    if isinstance(arc, ColumnArc):
+        return [arc.column]
+    return arc.joins[0].origin_columns
+
+
+def _field_kind(arc, field):
+    # Determines how a field is written: as a value, as a reference to
+    # a parent record, as NULL, or not at all.
+    if isinstance(field, Reference):
+        return 'reference'
+    if field is MISSING:
+        if any(column.has_default for column in _arc_columns(arc)):
+            return 'default'
+        return 'null'
+    return 'value'
+
+
+def _build_copy(node, mask, command_cache):
+    cache_key = (_build_copy, node, mask)
+    try:
+        return command_cache[cache_key]
+    except KeyError:
+        pass
+
+    arcs = list(scalars(node))
+    value_idxs = [
+        idx
+        for idx, kind in enumerate(mask)
+        if kind in ('value', 'null')
+    ]
+    reference_idxs = [
+        idx
+        for idx, kind in enumerate(mask)
+        if kind == 'reference'
+    ]
+    extract_table = BuildExtractTable.__invoke__(
+        node,
+        [arcs[idx] for idx in value_idxs],
+    )
+    table = extract_table.table
+    id_column = table.columns['id']
+    columns = list(extract_table.columns)
+    for idx in reference_idxs:
+        columns.extend(_arc_columns(arcs[idx]))
+    columns.append(id_column)
+    sql = "SELECT nextval(pg_get_serial_sequence(%s, 'id'))" \
+        " FROM generate_series(1, %s)"
+    name = '"%s"."%s"' % (table.schema.name, table.name)
+
+    def command(cells, reference_to_id):
+        # Allocate the `id` values upfront.
+        with transaction() as connection:
+            cursor = connection.cursor()
+            cursor.execute(sql, (name, len(cells)))
+            ids = [row[0] for row in cursor.fetchall()]
+
+        rows = [
+            [
+                cell.fields[idx] if cell.fields[idx] is not MISSING else None
+                for idx in value_idxs
+            ]
+            for cell in cells
+        ]
+        extract_table.preload(rows)
+        collect_copy = BuildCollectCopy.__invoke__(table, columns)
+        for cell, row, cell_id in zip(cells, rows, ids):
+            row = list(extract_table(row))
+            for idx in reference_idxs:
+                row.append(reference_to_id[cell.fields[idx]])
+            row.append(cell_id)
+            collect_copy(row)
+            reference_to_id[cell.reference] = cell_id
+        collect_copy.copy()
+
+    command_cache[cache_key] = command
+    return command
+
+
+def _execute(sql, parameters=None):
+    with transaction() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql, parameters)
+            if cursor.description is not None:
+                return cursor.fetchall()
+            return None
+        finally:
+            cursor.close()
+
+
+def prepare_digests(database):
+    """
+    Creates the table that keeps track of the Assessments loaded into the
+    Mart, if it does not exist yet.
+
+    :param database: the HTSQL instance connected to the Mart
+    :type database: rex.db.RexHTSQL
+    """
+
+    with database, database.transaction():
+        _execute(
+            'CREATE SCHEMA IF NOT EXISTS "%s";'
+            ' CREATE TABLE IF NOT EXISTS "%s"."%s" ('
+            ' "table_name" TEXT NOT NULL,'
+            ' "assessment_uid" TEXT NOT NULL,'
+            ' "digest" TEXT NOT NULL,'
+            ' PRIMARY KEY ("table_name", "assessment_uid"))' % (
+                DIGEST_SCHEMA,
+                DIGEST_SCHEMA,
+                DIGEST_TABLE,
+            )
+        )
+
+
+def _get_digest(data):
+    # Fingerprints the port data of an Assessment.
+    text = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _get_digests(table_name):
+    # Maps the UIDs of the Assessments in the table to their digests; the
+    # records loaded before the digests were kept are mapped to None.
+    rows = _execute(
+        'SELECT t."assessment_uid", d."digest"'
+        ' FROM "%s" AS t'
+        ' LEFT JOIN "%s"."%s" AS d'
+        ' ON (d."table_name" = %%s'
+        ' AND d."assessment_uid" = t."assessment_uid")' % (
+            table_name,
+            DIGEST_SCHEMA,
+            DIGEST_TABLE,
+        ),
+        (table_name,),
+    )
+    return dict(rows)
+
+
+def _delete_assessments(table_name, uids):
+    # Removes the records of the Assessments; the records of the facet and
+    # branch tables are removed with them.
+    if not uids:
+        return
+    _execute(
+        'DELETE FROM "%s" WHERE "assessment_uid" = ANY(%%s)' % (
+            table_name,
+        ),
+        (list(uids),),
+    )
+    _execute(
+        'DELETE FROM "%s"."%s"'
+        ' WHERE "table_name" = %%s AND "assessment_uid" = ANY(%%s)' % (
+            DIGEST_SCHEMA,
+            DIGEST_TABLE,
+        ),
+        (table_name, list(uids)),
+    )
+
 
+def _save_digests(table_name, digests):
+    if not digests:
+        return
+    uids = list(digests)
+    _execute(
+        'INSERT INTO "%s"."%s" ("table_name", "assessment_uid", "digest")'
+        ' SELECT %%s, UNNEST(%%s::TEXT[]), UNNEST(%%s::TEXT[])'
+        ' ON CONFLICT ("table_name", "assessment_uid")'
+        ' DO UPDATE SET "digest" = EXCLUDED."digest"' % (
+            DIGEST_SCHEMA,
+            DIGEST_TABLE,
+        ),
+        (table_name, uids, [digests[uid] for uid in uids]),
+    )
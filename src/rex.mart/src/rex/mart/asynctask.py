@@ -26,6 +26,7 @@ class MartCreateWorker(AsyncTaskWorker):
             leave_incomplete=payload.leave_incomplete,
             logger=self.logger.info,
             parameters=payload.parameters,
+            refresh=payload.refresh,
         )
 
 
@@ -46,6 +47,7 @@ class MartCreateExecutor(JobExecutor):
                 leave_incomplete=payload.leave_incomplete,
                 logger=log,
                 parameters=payload.parameters,
+                refresh=payload.refresh,
             )
         finally:
             self.update_facet('job_rexmart_create', id, log='\n'.join(output))
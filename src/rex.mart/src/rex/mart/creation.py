@@ -4,15 +4,19 @@
 
 
 import gc
+import json
+import queue
 import sys
+import threading
+import time
 
 from copy import deepcopy
 from datetime import datetime
 
-from rex.core import Error, get_settings
+from rex.core import Error, get_settings, get_rex
 from rex.deploy import model as deploy_model
 
-from .assessments import AssessmentLoader
+from .assessments import AssessmentLoader, prepare_digests
 from .config import get_definition, get_management_db_uri
 from .connections import get_management_db, get_hosting_cluster, \
     get_mart_etl_db, get_sql_connection
@@ -36,7 +40,8 @@ HTSQL_CREATE_INVENTORY = '''{
     owner:=$owner,
     name:='TBD',
     status:='creation',
-    date_creation_started:=$date_creation_started
+    date_creation_started:=$date_creation_started,
+    parameters:=$parameters
 } :as rexmart_inventory
 /:insert'''
 
@@ -66,6 +71,47 @@ HTSQL_UPDATE_COMPLETION_DETAILS = '''/rexmart_inventory{
 /:update'''
 
 
+HTSQL_UPDATE_SIZE = '''/rexmart_inventory{
+    id(),
+    size:=$size
+}.filter(
+    code=$code
+)
+/:update'''
+
+HTSQL_FIND_REFRESHABLE = '''/top(
+    rexmart_inventory
+        .filter(
+            owner=$owner
+            & definition=$definition
+            & parameters=$parameters
+            & status='complete'
+        )
+        .sort(
+            date_creation_completed-
+        )
+)'''
+
+HTSQL_CREATE_REFRESH = '''{
+    rexmart_inventory:=$code,
+    date_refresh_started:=$date_refresh_started
+} :as rexmart_inventory_refresh
+/:insert'''
+
+HTSQL_UPDATE_REFRESH = '''/rexmart_inventory_refresh{
+    id(),
+    status:=$status,
+    date_refresh_completed:=$date_completed,
+    assessments_added:=$added,
+    assessments_changed:=$changed,
+    assessments_removed:=$removed
+}.filter(
+    rexmart_inventory.code=$code
+    & date_refresh_started=$date_refresh_started
+)
+/:update'''
+
+
 class MartCreator(object):
     """
     A class that encapsulates the process of creating a Mart database.
@@ -100,7 +146,8 @@ class MartCreator(object):
             purge_on_failure=True,
             leave_incomplete=False,
             logger=None,
-            parameters=None):
+            parameters=None,
+            refresh=False):
         """
         Executes the creation of a Mart database.
 
@@ -121,6 +168,12 @@ class MartCreator(object):
         :param parameters:
             the values to the parameters defined in the Mart Definition
         :type parameters: dict
+        :param refresh:
+            whether or not to refresh the most recent complete Mart of this
+            owner and Definition instead of creating a new one (see
+            ``refresh()``); if there is no such Mart, a new one is created; if
+            not specified, defaults to False
+        :type refresh: bool
         :returns:
             a dict with the ``name`` of the newly-created Mart, as well as the
             ``code`` of the associated inventory record
@@ -129,6 +182,11 @@ class MartCreator(object):
         self.parameters = self.validate_parameters(parameters)
         self.close_mart()
 
+        if refresh:
+            mart = self.find_refreshable_mart()
+            if mart:
+                return self.refresh(mart, logger=logger)
+
         if not MartQuota.top().can_create_mart(self.owner, self.definition):
             raise Error(
                 'Creating a "%s" Mart for "%s" would exceed their quota' % (
@@ -143,15 +201,7 @@ class MartCreator(object):
                 self.start_date = datetime.now()
                 self.logger = logger
                 self.log('Mart creation began: %s' % (self.start_date,))
-                if self.parameters:
-                    self.log(
-                        'Parameters: %s' % (
-                            ', '.join([
-                                '%s=%r' % (key, value)
-                                for key, value in list(self.parameters.items())
-                            ]),
-                        )
-                    )
+                self._log_parameters()
                 self.code = self.create_inventory()
                 self.name = self.establish_name()
 
@@ -226,6 +276,95 @@ class MartCreator(object):
                 self.assessment_mappings = []
                 self.parameters = {}
 
+    def find_refreshable_mart(self):
+        """
+        Retrieves the most recent complete Mart of this owner and Definition
+        that was created with the same parameters as this MartCreator.
+
+        Marts of Definitions that have Post-Assessment ETL scripts or
+        Processors are never refreshed, since the output of those depends on
+        the whole of the loaded data.
+
+        :returns: the Mart, or None if there is no such Mart
+        :rtype: Mart
+        """
+
+        if self.definition['post_assessment_scripts'] \
+                or self.definition['processors']:
+            return None
+
+        database = get_management_db()
+        data = database.produce(
+            HTSQL_FIND_REFRESHABLE,
+            owner=self.owner,
+            definition=self.definition['id'],
+            parameters=self._encode_parameters(),
+        )
+        if not data:
+            return None
+        return Mart.from_record(data[0])
+
+    def refresh(self, mart, logger=None):
+        """
+        Brings the Assessment tables of an existing Mart up to date.
+
+        Only the Assessments that were added, changed, or removed since the
+        Mart was created or last refreshed are written to the Mart, and the
+        post-load calculations are only performed on the changed records. The
+        ETL scripts and Processors of the Definition are not executed again.
+        Each refresh is recorded in the ``rexmart_inventory_refresh`` table.
+
+        :param mart: the Mart to refresh
+        :type mart: Mart
+        :param logger:
+            the function to call to output a message about the progress of the
+            refresh
+        :type logger: function
+        :returns: the refreshed Mart
+        :rtype: Mart
+        """
+
+        with guarded('While refreshing Mart database:', mart.name):
+            try:
+                self.start_date = datetime.now()
+                self.logger = logger
+                self.code = mart.code
+                self.name = mart.name
+                self.log('Mart refresh began: %s' % (self.start_date,))
+                self.log('Refreshing database: %s' % (self.name,))
+                self._log_parameters()
+                self._create_refresh_record()
+
+                try:
+                    loaders = self.load_assessments(incremental=True)
+                except:  # noqa
+                    try:
+                        self._update_refresh_record('failed', [])
+                    except:  # noqa
+                        # Be quiet so the original exception can raised
+                        pass
+                    raise
+
+                self._update_refresh_record('complete', loaders)
+                self._update_size()
+
+                completed = datetime.now()
+                self.log('Mart refresh complete: %s' % (completed,))
+                self.log('Mart refresh duration: %s' % (
+                    completed - self.start_date,
+                ))
+
+                return self._get_mart()
+
+            finally:
+                self.start_date = None
+                self.code = None
+                self.name = None
+                self.close_mart()
+                self.logger = None
+                self.assessment_mappings = []
+                self.parameters = {}
+
     def validate_parameters(self, parameters):
         """
         Validates a set of parameters against those expected in this
@@ -267,6 +406,22 @@ class MartCreator(object):
             return
         self.logger(msg)
 
+    def _log_parameters(self):
+        if self.parameters:
+            self.log(
+                'Parameters: %s' % (
+                    ', '.join([
+                        '%s=%r' % (key, value)
+                        for key, value in list(self.parameters.items())
+                    ]),
+                )
+            )
+
+    def _encode_parameters(self):
+        # The parameters are kept in the inventory in a canonical form, so
+        # that they can be compared in a query.
+        return json.dumps(self.parameters, sort_keys=True, default=str)
+
     def _get_mart(self):
         database = get_management_db()
         data = database.produce('/rexmart_inventory[$code]', code=self.code)
@@ -292,7 +447,7 @@ class MartCreator(object):
                 status=status,
             )
 
-    def _update_completion_details(self):
+    def _get_size(self):
         size = None
         with guarded('While retrieving database size'):
             self.connect_mart()
@@ -305,6 +460,10 @@ class MartCreator(object):
                         size = rec[0]
                 finally:
                     cursor.close()
+        return size
+
+    def _update_completion_details(self):
+        size = self._get_size()
 
         with guarded('While updating inventory date'):
             self._do_update(
@@ -314,6 +473,37 @@ class MartCreator(object):
                 size=size,
             )
 
+    def _update_size(self):
+        size = self._get_size()
+
+        with guarded('While updating inventory size'):
+            self._do_update(
+                HTSQL_UPDATE_SIZE,
+                code=self.code,
+                size=size,
+            )
+
+    def _create_refresh_record(self):
+        with guarded('While creating refresh record'):
+            self._do_update(
+                HTSQL_CREATE_REFRESH,
+                code=self.code,
+                date_refresh_started=self.start_date,
+            )
+
+    def _update_refresh_record(self, status, loaders):
+        with guarded('While updating refresh record'):
+            self._do_update(
+                HTSQL_UPDATE_REFRESH,
+                code=self.code,
+                date_refresh_started=self.start_date,
+                status=status,
+                date_completed=datetime.now(),
+                added=sum([loader.num_added for loader in loaders]),
+                changed=sum([loader.num_changed for loader in loaders]),
+                removed=sum([loader.num_removed for loader in loaders]),
+            )
+
     def create_inventory(self):
         with guarded('While creating inventory record'):
             database = get_management_db()
@@ -322,6 +512,7 @@ class MartCreator(object):
                 definition=self.definition['id'],
                 owner=self.owner,
                 date_creation_started=self.start_date,
+                parameters=self._encode_parameters(),
             )
             return int(str(data.data))
 
@@ -490,9 +681,9 @@ class MartCreator(object):
                     script['type'],
                 ))
 
-    def load_assessments(self):
+    def load_assessments(self, incremental=False):
         if not self.definition['assessments']:
-            return
+            return []
 
         assessments = []
         for cfg in self.definition['assessments']:
@@ -505,32 +696,140 @@ class MartCreator(object):
             else:
                 assessments.append(cfg)
 
+        self.connect_mart()
+        prepare_digests(self.database)
+
+        parallelism = get_settings().mart_load_parallelism
+        if parallelism > 1 and len(assessments) > 1:
+            return self._load_assessments_concurrently(
+                assessments,
+                parallelism,
+                incremental,
+            )
+
+        loaders = []
         for idx, assessment in enumerate(assessments):
             idx_label = '#%s (%s)' % (idx + 1, assessment['name'])
             self.log('Processing Assessment %s' % (idx_label,))
 
             with guarded('While processing Assessment:', idx_label):
-                self.connect_mart()
-                params = self.get_query_params()
-                loader = AssessmentLoader(assessment, self.database, params)
-                self.assessment_mappings.append(loader.mapping)
-
-                with guarded('While deploying Assessment structures'):
-                    self.log('...deploying structures')
-                    self._do_deploy(loader.get_deploy_facts())
-
-                with guarded('While loading Assessments'):
-                    self.log('...loading Assessments')
-                    num_loaded = loader.load(self.database)
-                    self.log('...%s Assessments loaded' % (
-                        num_loaded,
-                    ))
+                loader = self._prepare_assessment(assessment)
+                self._load_assessment(
+                    loader,
+                    self.database,
+                    self.log,
+                    incremental,
+                )
+                loaders.append(loader)
 
-                with guarded('While performing Assessment calculations'):
-                    self.log('...performing calculations')
-                    loader.do_calculations(self.database)
+        return loaders
 
-                self.log('...complete')
+    def _load_assessments_concurrently(
+            self,
+            assessments,
+            parallelism,
+            incremental=False):
+        # The structures are deployed up front, one definition at a time;
+        # then the Assessments are loaded by a pool of workers, each with
+        # its own connection to the Mart.
+        loaders = []
+        for idx, assessment in enumerate(assessments):
+            idx_label = '#%s (%s)' % (idx + 1, assessment['name'])
+            self.log('Processing Assessment %s' % (idx_label,))
+
+            with guarded('While processing Assessment:', idx_label):
+                loaders.append((idx_label, self._prepare_assessment(
+                    assessment,
+                )))
+
+        app = get_rex()
+        log_lock = threading.Lock()
+        tasks = queue.Queue()
+        for task in loaders:
+            tasks.put(task)
+        failures = []
+
+        def work():
+            with app:
+                database = get_mart_etl_db(self.name)
+                while not failures:
+                    try:
+                        idx_label, loader = tasks.get_nowait()
+                    except queue.Empty:
+                        break
+
+                    def log(msg, idx_label=idx_label):
+                        with log_lock:
+                            self.log('Assessment %s: %s' % (idx_label, msg))
+
+                    try:
+                        with guarded(
+                                'While processing Assessment:',
+                                idx_label):
+                            self._load_assessment(
+                                loader,
+                                database,
+                                log,
+                                incremental,
+                            )
+                    except:  # noqa
+                        failures.append(sys.exc_info())
+
+        workers = [
+            threading.Thread(target=work)
+            for _ in range(min(parallelism, len(loaders)))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        if failures:
+            raise failures[0][1].with_traceback(failures[0][2])
+
+        return [loader for _, loader in loaders]
+
+    def _prepare_assessment(self, assessment):
+        self.connect_mart()
+        params = self.get_query_params()
+        loader = AssessmentLoader(assessment, self.database, params)
+        self.assessment_mappings.append(loader.mapping)
+
+        with guarded('While deploying Assessment structures'):
+            self.log('...deploying structures')
+            self._do_deploy(loader.get_deploy_facts())
+
+        return loader
+
+    def _load_assessment(self, loader, database, log, incremental=False):
+        # pylint: disable=no-self-use
+        with guarded('While loading Assessments'):
+            log('...loading Assessments')
+            started = time.monotonic()
+            num_loaded = loader.load(database, incremental=incremental)
+            if incremental:
+                log('...%s added, %s changed, %s removed' % (
+                    loader.num_added,
+                    loader.num_changed,
+                    loader.num_removed,
+                ))
+            log('...%s Assessments loaded, %s rows written in %.2fs' % (
+                num_loaded,
+                loader.num_rows,
+                time.monotonic() - started,
+            ))
+
+        with guarded('While performing Assessment calculations'):
+            log('...performing calculations')
+            if incremental:
+                loader.do_calculations(
+                    database,
+                    assessment_uids=loader.loaded_uids,
+                )
+            else:
+                loader.do_calculations(database)
+
+        log('...complete')
 
     def connect_mart(self):
         if not self.database:
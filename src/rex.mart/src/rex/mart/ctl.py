@@ -104,6 +104,16 @@ class MartCreateTask(RexTask):
             ' "complete", meaning they can be accessed by front-end users.',
         )
 
+        refresh = option(
+            None,
+            bool,
+            hint='Indicates whether or not to refresh the most recent complete'
+            ' Mart of the owner and Definition with the Assessments that'
+            ' were added, changed, or removed since it was last loaded,'
+            ' instead of creating a new Mart. If there is no such Mart, a new'
+            ' one is created.',
+        )
+
         param = option(
             'p',
             pair,
@@ -186,6 +196,7 @@ class MartCreateTask(RexTask):
                         'halt_on_failure': self.halt_on_failure,
                         'purge_on_failure': not self.keep_on_failure,
                         'leave_incomplete': self.leave_incomplete,
+                        'refresh': self.refresh,
                     }
                     if params:
                         entry['parameters'] = params
@@ -229,6 +240,7 @@ class MartCreateTask(RexTask):
             leave_incomplete=entry.leave_incomplete,
             logger=self.execution_log,
             parameters=entry.parameters,
+            refresh=entry.refresh,
         )
 
     def _execution_output(self, msg, writer):
@@ -20,6 +20,8 @@ __all__ = (
     'MartMaxMartsPerOwnerSetting',
     'MartDefaultMaxMartsPerOwnerDefinitionSetting',
     'MartHtsqlCacheDepthSetting',
+    'MartLoadBatchSizeSetting',
+    'MartLoadParallelismSetting',
 )
 
 
@@ -194,6 +196,32 @@ class MartHtsqlCacheDepthSetting(Setting):
     default = 20
 
 
+class MartLoadBatchSizeSetting(Setting):
+    """
+    Specifies how many Assessments are retrieved from the datastore and
+    written to the Mart database at a time.
+
+    If not specified, defaults to 100.
+    """
+
+    name = 'mart_load_batch_size'
+    validate = IntVal(min_bound=1)
+    default = 100
+
+
+class MartLoadParallelismSetting(Setting):
+    """
+    Specifies how many Assessment definitions of a Mart are loaded
+    concurrently.
+
+    If not specified, defaults to 1, which loads them one at a time.
+    """
+
+    name = 'mart_load_parallelism'
+    validate = IntVal(min_bound=1)
+    default = 1
+
+
 class MartDictionaryPresentationPrioritySetting(Setting):
     """
     Specifies the order of Presentation Types to consider when extracting
@@ -994,9 +994,11 @@ class PrimaryTable(MappingTable):
         for child in self.children.values():
             child.ensure_unique_fieldnames()
 
-    def get_calculation_statements(self):
+    def get_calculation_statements(self, assessment_uids=None):
         if not self.definition['post_load_calculations']:
             return []
+        if assessment_uids is not None and not assessment_uids:
+            return []
 
         defines = []
         assigns = []
@@ -1010,8 +1012,18 @@ class PrimaryTable(MappingTable):
                 calculation['name'],
             ))
 
+        table = self.table_name
+        if assessment_uids:
+            table = '%s.filter(assessment_uid={%s})' % (
+                table,
+                ', '.join([
+                    "'%s'" % (uid.replace("'", "''"),)
+                    for uid in assessment_uids
+                ]),
+            )
+
         statement = '/%s.define(%s){id(), %s}/:update' % (
-            self.table_name,
+            table,
             ', '.join(defines),
             ', '.join(assigns),
         )
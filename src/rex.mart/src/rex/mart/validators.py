@@ -892,6 +892,10 @@ class RunListEntryVal(FullyValidatingRecordVal):
 
             # The parameters to pass in during the creation of the Mart
             ('parameters', MapVal(), {}),
+
+            # Indicates whether or not to refresh the latest complete Mart of
+            # this owner and Definition instead of creating a new one
+            ('refresh', BoolVal(), False),
         )
 
 
@@ -12,9 +12,10 @@ from htsql.core.domain import Value
 from htsql.core.model import ColumnArc, ChainArc
 from htsql.core.classify import classify
 from htsql.tweak.etl.cmd.insert import (Clarify, BuildExtractTable,
-        BuildExecuteInsert, BuildResolveIdentity)
-from htsql.tweak.etl.cmd.merge import BuildResolveKey, BuildExecuteUpdate
-from htsql.tweak.etl.cmd.delete import BuildExecuteDelete
+        BuildExecuteInsertMany, BuildResolveIdentityMany)
+from htsql.tweak.etl.cmd.merge import (BuildResolveKeyMany,
+        BuildExecuteUpdateMany)
+from htsql.tweak.etl.cmd.delete import BuildExecuteDeleteMany
 import collections
 import json
 
@@ -390,6 +391,35 @@ def patch(pair_map, command_cache):
     identity_map = collections.OrderedDict()
 
     reference_to_identity = {}
+    # Consecutive changes of the same kind are applied together.
+    batch = []
+    batch_references = set()
+
+    def flush(identities):
+        # Applies the pending batch of changes.
+        if not batch:
+            return
+        operation, node, arcs = batch[0][:3]
+        records = [change[3] for change in batch]
+        rows = [change[4] for change in batch]
+        if operation is insert_many:
+            new_identities = insert_many(node, arcs, rows, command_cache)
+        elif operation is delete_many:
+            delete_many(node, records, command_cache)
+            new_identities = [None]*len(batch)
+        else:
+            new_identities = update_many(
+                    node, arcs, records, rows, command_cache)
+        for change, new_identity in zip(batch, new_identities):
+            new_cell = change[5]
+            if new_identity is not None:
+                reference_to_identity[new_cell.reference] = new_identity
+                identity_cell = Cell(new_cell.node, new_cell.reference,
+                                     new_identity, None)
+                identities.append(identity_cell)
+        del batch[:]
+        batch_references.clear()
+
     for schema_path in pair_map:
         pairs = pair_map[schema_path]
         identities = []
@@ -397,6 +427,7 @@ def patch(pair_map, command_cache):
 
         for old_cell, new_cell in pairs:
             node = old_cell.node if old_cell is not None else new_cell.node
+            arcs = None
             if old_cell is None:
                 identity = None
                 old_fields = None
@@ -413,6 +444,9 @@ def patch(pair_map, command_cache):
                 resolved_fields = []
                 for field in new_fields:
                     if isinstance(field, Reference):
+                        # The record may be a part of the pending batch.
+                        if field in batch_references:
+                            flush(identities)
                         if field not in reference_to_identity:
                             raise Error("Got unknown reference:", field)
                         field = reference_to_identity[field]
@@ -429,80 +463,96 @@ def patch(pair_map, command_cache):
                     if field is not MISSING:
                         arcs.append(arc)
                         trimmed_fields.append(field)
+                arcs = tuple(arcs)
                 new_fields = trimmed_fields
             if old_fields is None:
-                new_identity = insert(node, arcs, new_fields, command_cache)
+                operation = insert_many
             elif new_fields is None:
-                delete(node, identity, command_cache)
-                new_identity = None
+                operation = delete_many
             else:
-                new_identity = update(
-                        node, arcs, identity, new_fields, command_cache)
-            if new_identity is not None:
-                reference_to_identity[new_cell.reference] = new_identity
-                identity_cell = Cell(new_cell.node, new_cell.reference,
-                                     new_identity, None)
-                identities.append(identity_cell)
+                operation = update_many
+            # Links in a batch are resolved before any of its records are
+            # written, so a record linking to the same table may not see
+            # the records inserted or renamed earlier in the batch.
+            is_self_linked = (
+                    new_fields is not None and
+                    any(isinstance(arc, ChainArc) and arc.target == node and
+                        field is not None
+                        for arc, field in zip(arcs, new_fields)))
+            if batch and (batch[0][:3] != (operation, node, arcs) or
+                          is_self_linked):
+                flush(identities)
+            batch.append((operation, node, arcs, identity, new_fields,
+                          new_cell))
+            if new_cell is not None:
+                batch_references.add(new_cell.reference)
+        flush(identities)
     return identity_map
 
 
-def insert(node, arcs, fields, command_cache):
-    # Inserts a record.
-    cache_key = (insert, node, tuple(arcs))
+def extract_many(extract_table, rows):
+    # Converts a batch of rows to table rows resolving the links at once.
+    extract_table.preload(rows)
+    return [extract_table(row) for row in rows]
+
+
+def insert_many(node, arcs, rows, command_cache):
+    # Inserts a list of records; returns their identities.
+    cache_key = (insert_many, node, arcs)
     try:
         command = command_cache[cache_key]
     except KeyError:
         extract_table = BuildExtractTable.__invoke__(
-                node, arcs)
-        execute_insert = BuildExecuteInsert.__invoke__(
+                node, list(arcs))
+        execute_insert = BuildExecuteInsertMany.__invoke__(
                 extract_table.table, extract_table.columns)
-        resolve_identity = BuildResolveIdentity.__invoke__(
-                execute_insert.table, execute_insert.output_columns,
-                is_list=False)
+        resolve_identity = BuildResolveIdentityMany.__invoke__(
+                execute_insert.table, execute_insert.output_columns)
         command = command_cache[cache_key] = (
-                lambda fields:
-                    resolve_identity(execute_insert(extract_table(fields))))
-    return command(fields)
+                lambda rows:
+                    resolve_identity(
+                        execute_insert(
+                            extract_many(extract_table, rows))))
+    return command(rows)
 
 
-def update(node, arcs, identity, fields, command_cache):
-    # Updates a record.
-    cache_key = (update, node, tuple(arcs))
+def update_many(node, arcs, identities, rows, command_cache):
+    # Updates a list of records; returns their new identities.
+    cache_key = (update_many, node, arcs)
     try:
         command = command_cache[cache_key]
     except KeyError:
-        resolve_key = BuildResolveKey.__invoke__(
-                node, arcs)
+        resolve_key = BuildResolveKeyMany.__invoke__(
+                node, list(arcs))
         extract_table = BuildExtractTable.__invoke__(
-                node, arcs)
-        execute_update = BuildExecuteUpdate.__invoke__(
+                node, list(arcs))
+        execute_update = BuildExecuteUpdateMany.__invoke__(
                 extract_table.table, extract_table.columns)
-        resolve_identity = BuildResolveIdentity.__invoke__(
-                execute_update.table, execute_update.output_columns,
-                is_list=False)
+        resolve_identity = BuildResolveIdentityMany.__invoke__(
+                execute_update.table, execute_update.output_columns)
         command = command_cache[cache_key] = (
-                lambda identity, fields:
+                lambda identities, rows:
                     resolve_identity(
                         execute_update(
-                            resolve_key(identity),
-                            extract_table(fields))))
-    return command(identity, fields)
+                            resolve_key(identities),
+                            extract_many(extract_table, rows))))
+    return command(identities, rows)
 
 
-def delete(node, identity, command_cache):
-    # Deletes a record.
-    cache_key = (delete, node)
+def delete_many(node, identities, command_cache):
+    # Deletes a list of records.
+    cache_key = (delete_many, node)
     try:
         command = command_cache[cache_key]
     except KeyError:
-        resolve_key = BuildResolveKey.__invoke__(
+        resolve_key = BuildResolveKeyMany.__invoke__(
                 node, [])
-        execute_delete = BuildExecuteDelete.__invoke__(
+        execute_delete = BuildExecuteDeleteMany.__invoke__(
                 node.table)
         command = command_cache[cache_key] = (
-                lambda identity:
-                    execute_delete(resolve_key(identity)))
-    return command(identity)
+                lambda identities:
+                    execute_delete(resolve_key(identities)))
+    return command(identities)
 
 
 def verify(identity_map, actual_map):
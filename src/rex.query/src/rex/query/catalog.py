@@ -4,7 +4,9 @@
 
 
 from rex.deploy import label_to_title
+from htsql.core.context import context
 from htsql.core.error import Error as HTSQLError
+from htsql.core.introspect import introspect
 from htsql.core.model import HomeNode, TableArc, ColumnArc, ChainArc, SyntaxArc
 from htsql.core.classify import classify, relabel, localize
 from htsql.core.domain import (
@@ -16,7 +18,11 @@ from htsql.core.tr.binding import (
         RootBinding, LiteralRecipe, ClosedRecipe, SubstitutionRecipe)
 from htsql.core.tr.lookup import prescribe
 from htsql.core.tr.decorate import decorate_void
+from htsql.core.fmt.format import Format, DefaultFormat
+from htsql.core.fmt.accept import Accept
+from htsql.core.fmt.emit import emit, emit_headers
 from htsql_rex_deploy.classify import get_meta
+import hashlib
 
 
 def profile(tag, domain):
@@ -179,3 +185,65 @@ def produce_catalog(ignore_entities=None):
     return Product(meta, data)
 
 
+class CatalogEntry(object):
+    # Cached catalog product and its rendered outputs.
+
+    def __init__(self, catalog, product):
+        self.catalog = catalog
+        self.product = product
+        self.outputs = {}
+
+
+def get_catalog_entry(ignore_entities=None):
+    # Finds or produces the catalog entry for the active HTSQL application.
+    catalog = introspect()
+    cache = context.app.htsql.cache
+    key = frozenset(ignore_entities or [])
+    with cache.lock(get_catalog_entry):
+        entries = cache.values.setdefault(get_catalog_entry, {})
+        entry = entries.get(key)
+        # The entry is stale if the HTSQL catalog has been replaced.
+        if entry is None or entry.catalog is not catalog:
+            product = produce_catalog(ignore_entities=ignore_entities)
+            entry = entries[key] = CatalogEntry(catalog, product)
+        return entry
+
+
+def get_catalog(ignore_entities=None):
+    """
+    Returns the catalog product.
+
+    The product is cached per HTSQL catalog and the set of ignored entities.
+    """
+    return get_catalog_entry(ignore_entities).product
+
+
+def format_key(format):
+    # Identifies the output format by its type and parameters.
+    return (format.__class__,) + tuple(
+            (name, format_key(value) if isinstance(value, Format) else value)
+            for name, value in sorted(vars(format).items()))
+
+
+def render_catalog(format, ignore_entities=None):
+    """
+    Renders the catalog in the given format.
+
+    Returns a list of HTTP headers, the response body and a strong ETag
+    computed from the body.  The output is cached together with
+    the catalog product.
+    """
+    if isinstance(format, str):
+        format = Accept.__invoke__(format)
+        assert not isinstance(format, DefaultFormat), "unknown format"
+    entry = get_catalog_entry(ignore_entities)
+    key = format_key(format)
+    cache = context.app.htsql.cache
+    with cache.lock(get_catalog_entry):
+        output = entry.outputs.get(key)
+        if output is None:
+            headerlist = emit_headers(format, entry.product)
+            body = b''.join(emit(format, entry.product))
+            etag = hashlib.sha1(body).hexdigest()
+            output = entry.outputs[key] = (headerlist, body, etag)
+        return output
@@ -4,12 +4,12 @@
 
 
 from webob import Response
-from webob.exc import HTTPMethodNotAllowed, HTTPBadRequest
+from webob.exc import HTTPMethodNotAllowed, HTTPBadRequest, HTTPNotModified
 from rex.core import Error
 from rex.db import get_db
 from .query import QueryVal
 from .bind import RexBindingState
-from .catalog import produce_catalog
+from .catalog import get_catalog, render_catalog
 from htsql import HTSQL
 from htsql.core.domain import Product
 from htsql.core.cmd.act import produce
@@ -41,7 +41,7 @@ class Database(object):
         query = self.parse(query)
         with self.db:
             if query.is_catalog():
-                return produce_catalog(
+                return get_catalog(
                     ignore_entities=self.ignore_catalog_entities,
                 )
             pipe = self.translate(query, vars=vars)
@@ -52,7 +52,7 @@ class Database(object):
         query = self.parse(query)
         with self.db:
             if query.is_catalog():
-                return produce_catalog(
+                return get_catalog(
                     ignore_entities=self.ignore_catalog_entities,
                 )
             pipe = self.translate(query, vars=vars)
@@ -70,17 +70,26 @@ class Database(object):
         except Error as exc:
             raise HTTPBadRequest(str(exc))
         with self.db:
+            format = query.format or accept(req.environ)
             if query.is_catalog():
-                product = produce_catalog(
+                # The catalog rarely changes, so let the client revalidate
+                # its copy with `If-None-Match`.  WebOb handles conditional
+                # requests only for `GET` and `HEAD`, so we check it here.
+                headerlist, body, etag = render_catalog(
+                    format,
                     ignore_entities=self.ignore_catalog_entities,
                 )
+                if etag in req.if_none_match:
+                    return HTTPNotModified(
+                            etag=etag, cache_control='private, no-cache')
+                return Response(
+                        headerlist=list(headerlist), body=body, etag=etag,
+                        cache_control='private, no-cache')
+            pipe = self.translate(query, vars=None)
+            if 'dry-run' in req.GET:
+                product = Product(pipe.meta, None)
             else:
-                pipe = self.translate(query, vars=None)
-                if 'dry-run' in req.GET:
-                    product = Product(pipe.meta, None)
-                else:
-                    product = pipe()(None)
-            format = query.format or accept(req.environ)
+                product = pipe()(None)
             headerlist = emit_headers(format, product)
             app_iter = list(emit(format, product))
             return Response(headerlist=headerlist, app_iter=app_iter)
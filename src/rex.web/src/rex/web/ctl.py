@@ -6,13 +6,17 @@
 from rex.setup import watch
 from rex.core import (
         get_packages, get_settings, Error, PythonPackage, StrVal, PIntVal,
-        BoolVal, MaybeVal, MapVal, Validate)
+        BoolVal, FloatVal, MaybeVal, MapVal, Validate)
 from rex.ctl import (
         env, RexTaskWithProject, Global, Topic, argument, option, log, fail,
         exe, COLORS)
+from .stats import make_stats_token
 import sys
 import os
+import re
 import time
+import queue
+import threading
 import tempfile
 import shlex
 import hashlib
@@ -29,6 +33,8 @@ import math
 import marshal
 import io
 import cProfile
+import urllib.request
+import urllib.error
 
 
 def wsgi_file(app):
@@ -711,6 +717,80 @@ class StatusTask(RexTaskWithProject):
                 log("{}", form.log_path)
 
 
+class CacheStatsTask(RexTaskWithProject):
+    """show cache statistics of a running application
+
+    The `cache-stats` task requests cache statistics from a running HTTP
+    server and lists the cached functions with the number of cache hits,
+    misses, evictions, the number of cached values and the cache capacity.
+
+    Use options `--host` and `--port` or settings `http-host` and
+    `http-port` to specify the address of the HTTP server.
+
+    The request is authorized with a token derived from the `secret`
+    setting, so the application must be configured with the same secret
+    as the server.  Under a multi-process server, the statistics come
+    from the process that served the request.
+    """
+
+    name = 'cache-stats'
+
+    class options:
+        host = option(
+                'h', str, default=None,
+                value_name="HOSTNAME",
+                hint="address of the HTTP server")
+        port = option(
+                'p', int, default=None,
+                value_name="PORT",
+                hint="port of the HTTP server")
+
+    def __call__(self):
+        app = self.make(initialize=False)
+        host = self.host or env.http_host
+        port = self.port or env.http_port
+        with app:
+            if not get_settings().secret:
+                raise fail("setting `secret` is not configured")
+            segment = get_settings().mount['rex.web']
+            token = make_stats_token()
+        path = '/%s/cache-stats' % segment if segment else '/cache-stats'
+        url = 'http://%s:%s%s' % (host, port, path)
+        req = urllib.request.Request(url, headers={'X-Rex-Stats-Token': token})
+        try:
+            with urllib.request.urlopen(req) as resp:
+                statistics = json.loads(resp.read().decode('utf-8'))
+        except urllib.error.HTTPError as exc:
+            raise fail("failed to get cache statistics from {}: {}",
+                       url, exc)
+        except urllib.error.URLError as exc:
+            raise fail("cannot connect to {}: {}", url, exc.reason)
+        for entry in statistics:
+            log("`[{}]`", entry['name'])
+            log("  hits: {}, misses: {}, evictions: {}",
+                entry['hits'], entry['misses'], entry['evictions'])
+            if entry['maxsize'] is not None:
+                log("  size: {} of {}", entry['size'], entry['maxsize'])
+            else:
+                log("  size: {}", entry['size'])
+
+
+def replay_pattern(path):
+    # Groups similar URLs by masking numeric and hash-like path segments.
+    return '/'.join(
+            '*' if re.match(r'^(?:[0-9]+|[0-9a-fA-F-]{16,})$', segment)
+            else segment
+            for segment in path.split('/'))
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of a sorted list.
+    if not values:
+        return None
+    k = max(int(math.ceil(p / 100.0 * len(values))) - 1, 0)
+    return values[k]
+
+
 class ReplayHandler:
 
     def __init__(self, app):
@@ -723,14 +803,12 @@ class ReplayHandler:
         self.user = None
         self.date = None
         self.method = None
+        self.path = None
         self.query = None
         self.protocol = None
         self.size = None
         self.started = None
         self.finished = None
-        self.elapsed = datetime.timedelta()
-        self.total = 0
-        self.errors = 0
 
     def reset(self, environ):
         self.status = None
@@ -740,7 +818,8 @@ class ReplayHandler:
         self.host = environ.get('REMOTE_HOST') or environ.get('REMOTE_ADDR')
         self.user = environ.get('REMOTE_USER') or '-'
         self.method = environ['REQUEST_METHOD']
-        self.query = environ.get('PATH_INFO', '')
+        self.path = environ.get('PATH_INFO', '')
+        self.query = self.path
         if environ.get('QUERY_STRING'):
             self.query += '?' + environ['QUERY_STRING']
         self.protocol = environ.get('SERVER_PROTOCOL') or '-'
@@ -758,9 +837,6 @@ class ReplayHandler:
             self.code = self.status.split()[0]
         self.size = len(self.body.getvalue())
         self.finished = datetime.datetime.now()
-        self.elapsed += self.finished - self.started
-        self.total += 1
-        self.errors += self.code >= '400'
 
     def __call__(self, environ):
         self.reset(environ)
@@ -779,7 +855,7 @@ class ReplayHandler:
         COLORS.styles['benchmark'] = []
         if benchmark > 0:
             COLORS.styles['benchmark'] = [48, 5, 17 + 36*benchmark]
-        if self.code < '400':
+        if self.code is not None and self.code < '400':
             line = "{} - {} [:benchmark:`{}`] \"`{} {} {}`\" {} {}"
         else:
             line = "{} - {} [:benchmark:`{}`] \"`{} {} {}`\" :warning:`{}` {}"
@@ -794,16 +870,101 @@ class ReplayHandler:
             self.size)
         del COLORS.styles['benchmark']
 
+
+class ReplayStats:
+    # Collects latencies of replayed requests grouped by URL pattern.
+
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.monotonic()
+
+    def stop(self):
+        self.finished = time.monotonic()
+
+    def add(self, handler, latency):
+        # `latency` is counted from the time the request was due, so that
+        # requests delayed by busy workers are not reported as fast.
+        pattern = "%s %s" % (handler.method, replay_pattern(handler.path))
+        with self.lock:
+            self.latencies.setdefault(pattern, []).append(latency)
+            self.errors.setdefault(pattern, 0)
+            # No status means the request failed before it could respond.
+            if handler.code is None or handler.code >= '400':
+                self.errors[pattern] += 1
+
+    def digest(self, latencies, errors):
+        latencies = sorted(latencies)
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else None,
+        }
+
+    def report(self):
+        # Generates a JSON-compatible summary.
+        elapsed = (self.finished or time.monotonic()) - self.started
+        latencies = []
+        for pattern in self.latencies:
+            latencies.extend(self.latencies[pattern])
+        total = self.digest(latencies, sum(self.errors.values()))
+        return {
+            'concurrency': self.concurrency,
+            'elapsed': elapsed,
+            'requests': total['requests'],
+            'errors': total['errors'],
+            'throughput': total['requests'] / elapsed if elapsed else None,
+            'latency': total,
+            'patterns': {
+                pattern: self.digest(self.latencies[pattern],
+                                     self.errors[pattern])
+                for pattern in sorted(self.latencies)
+            },
+        }
+
     def summary(self):
+        report = self.report()
         log("---")
-        log("TIME ELAPSED: {}", self.elapsed)
-        log("REQUESTS: {}", self.total)
-        if self.errors:
-            log("ERRORS: :warning:`{}`", self.errors)
+        log("TIME ELAPSED: {}", datetime.timedelta(seconds=report['elapsed']))
+        log("REQUESTS: {}", report['requests'])
+        if report['errors']:
+            log("ERRORS: :warning:`{}`", report['errors'])
+        if report['throughput'] is not None:
+            log("THROUGHPUT: {:.2f} req/s", report['throughput'])
+        if report['patterns']:
+            log("LATENCY (p50 / p90 / p99):")
+        for pattern, digest in sorted(report['patterns'].items()):
+            log("  `{}`: {:.3f}s / {:.3f}s / {:.3f}s ({} requests)",
+                pattern, digest['p50'], digest['p90'], digest['p99'],
+                digest['requests'])
+        return report
 
 
 class ReplayTask(RexTaskWithProject):
-    """replay WSGI requests from the log"""
+    """replay WSGI requests from the log
+
+    The `replay` task replays requests saved in the replay log (see global
+    option `--replay-log`) and reports the latency of the requests grouped
+    by URL pattern.
+
+    By default, requests are replayed one by one.  Use option
+    `--concurrency` to replay requests with several worker threads.  Option
+    `--rate` sends requests at the given number of requests per second,
+    and with toggle `--realtime`, requests keep the intervals with which
+    they were originally received.
+
+    Use option `--summary` to save the statistics in JSON format.
+    """
 
     name = 'replay'
 
@@ -812,8 +973,25 @@ class ReplayTask(RexTaskWithProject):
         profile = option(None, str, default=None,
                 value_name="FILE",
                 hint="write profile information")
+        concurrency = option('c', PIntVal(), default=1,
+                value_name="N",
+                hint="number of worker threads")
+        rate = option(None, FloatVal(), default=None,
+                value_name="RPS",
+                hint="send requests at a fixed rate")
+        realtime = option(None, bool,
+                hint="keep the original intervals between requests")
+        summary = option(None, str, default=None,
+                value_name="FILE",
+                hint="write JSON summary")
 
     def __call__(self):
+        if self.rate is not None and self.rate <= 0:
+            raise fail("request rate must be positive: {}", self.rate)
+        if self.rate is not None and self.realtime:
+            raise fail("options --rate and --realtime are incompatible")
+        if self.profile is not None and self.concurrency > 1:
+            raise fail("option --profile requires --concurrency=1")
         # Open the replay log.
         app = self.make(initialize=False)
         with app:
@@ -827,25 +1005,87 @@ class ReplayTask(RexTaskWithProject):
         if self.profile is not None:
             profile = cProfile.Profile()
         app = self.make(extra_parameters={'replay_log': None})
-        handler = ReplayHandler(app)
-        while True:
-            try:
-                environ = marshal.load(replay_log)
-            except EOFError:
-                break
-            wsgi_input = environ.get('wsgi.input')
-            if isinstance(wsgi_input, str):
-                environ['wsgi.input'] = io.StringIO(wsgi_input)
-            if self.profile is not None:
-                profile.enable()
-            handler(environ)
-            if self.profile is not None:
-                profile.disable()
-            if not self.quiet:
-                handler.log()
+        stats = ReplayStats(self.concurrency)
+        log_lock = threading.Lock()
+        # Requests scheduled for replay; `None` stops a worker.
+        requests = queue.Queue(2*self.concurrency)
+
+        def work():
+            handler = ReplayHandler(app)
+            while True:
+                request = requests.get()
+                if request is None:
+                    break
+                due, environ = request
+                # Keep draining the queue even if a request fails here;
+                # otherwise the reader blocks on the full queue forever.
+                try:
+                    if due is not None:
+                        delay = due - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                        started = due
+                    else:
+                        started = time.monotonic()
+                    if self.profile is not None:
+                        profile.enable()
+                    try:
+                        handler(environ)
+                    finally:
+                        if self.profile is not None:
+                            profile.disable()
+                    stats.add(handler, time.monotonic() - started)
+                    if not self.quiet:
+                        with log_lock:
+                            handler.log()
+                except Exception:
+                    with log_lock:
+                        log(":warning:`{}`",
+                            traceback.format_exc().rstrip())
+
+        workers = [threading.Thread(target=work)
+                   for k in range(self.concurrency)]
+        stats.start()
+        for worker in workers:
+            worker.start()
+        try:
+            origin = None
+            count = 0
+            while True:
+                try:
+                    environ = marshal.load(replay_log)
+                except EOFError:
+                    break
+                wsgi_input = environ.get('wsgi.input')
+                if isinstance(wsgi_input, str):
+                    environ['wsgi.input'] = io.StringIO(wsgi_input)
+                elif isinstance(wsgi_input, bytes):
+                    environ['wsgi.input'] = io.BytesIO(wsgi_input)
+                timestamp = environ.pop('rex.time', None)
+                due = None
+                if self.rate is not None:
+                    due = stats.started + count / self.rate
+                elif self.realtime:
+                    if timestamp is None:
+                        raise fail("replay log has no request timestamps")
+                    if origin is None:
+                        origin = timestamp
+                    due = stats.started + (timestamp - origin)
+                requests.put((due, environ))
+                count += 1
+        finally:
+            for worker in workers:
+                requests.put(None)
+            for worker in workers:
+                worker.join()
+        stats.stop()
         if self.profile is not None:
             profile.dump_stats(self.profile)
-        handler.summary()
+        report = stats.summary()
+        if self.summary is not None:
+            with open(self.summary, 'w') as stream:
+                json.dump(report, stream, indent=2, sort_keys=True)
+                stream.write("\n")
 
 
 class DeploymentTopic(Topic):
@@ -4,8 +4,8 @@
 
 
 from rex.core import (Setting, Extension, WSGI, get_packages, get_settings,
-        MaybeVal, MapVal, OMapVal, ChoiceVal, StrVal, Error, cached,
-        autoreload, get_rex, get_sentry)
+        MaybeVal, MapVal, OMapVal, ChoiceVal, StrVal, PIntVal, SeqVal, Error,
+        cached, autoreload, get_rex, get_sentry)
 from .handle import HandleFile, HandleLocation, HandleError
 from .auth import authenticate, authorize, confine
 from .path import PathMap, PathMask
@@ -17,6 +17,10 @@ from webob.static import FileIter, BLOCK_SIZE
 import sys
 import copy
 import os
+import re
+import time
+import hashlib
+import threading
 import fnmatch
 import json
 import datetime
@@ -26,7 +30,11 @@ import mimetypes
 import marshal
 import fcntl
 import io
+import queue
+import atexit
+import itertools
 import socket
+from stat import S_ISREG
 import urllib.parse
 import raven.utils.wsgi
 
@@ -48,6 +56,56 @@ class ReplayLogSetting(Setting):
     default = None
 
 
+class ReplayLogSampleSetting(Setting):
+    """
+    Record only one of every N requests to the replay log.
+
+    Example::
+
+        replay_log_sample: 10
+    """
+
+    name = 'replay_log_sample'
+    validate = PIntVal()
+    default = 1
+
+
+class ReplayLogPathsSetting(Setting):
+    """
+    Record only requests that match the given URL patterns.
+
+    The patterns are matched against the request path and may contain
+    shell-style wildcards.
+
+    Example::
+
+        replay_log_paths:
+        - /db/*
+        - /query/*
+    """
+
+    name = 'replay_log_paths'
+    validate = MaybeVal(SeqVal(StrVal))
+    default = None
+
+
+class ReplayLogMaxSizeSetting(Setting):
+    """
+    Maximum size of the replay log, in bytes.
+
+    When the log grows larger, it is renamed with ``.1`` suffix, replacing
+    the previous one, and a new log is started.
+
+    Example::
+
+        replay_log_max_size: 104857600
+    """
+
+    name = 'replay_log_max_size'
+    validate = MaybeVal(PIntVal)
+    default = None
+
+
 class MountSetting(Setting):
     """
     Mount table that maps package names to path segments.
@@ -273,34 +331,40 @@ class RoutingTable:
         return self.fallback(req)
 
 
-class StaticGuard:
-    # Verifies if the path can be handled by `StaticServer`.
-
-    def __init__(self, package):
-        self.package = package
-
-    def __call__(self, path):
-        # Normalize the URL.
-        if path.endswith('/'):
-            path += StaticServer.index_file
-        path = os.path.normpath(path)
-
-        # Immediately reject anything starting with `.` or `_`.
-        if any(segment.startswith('.') for segment in path.split('/')):
-            return False
-        if not self.package.exists('www.yaml'):
-            if any(segment.startswith('_') for segment in path.split('/')):
-                return False
-
-        # Convert the URL into the filesystem path.
-        local_path = StaticServer.www_root + path
-        real_path = self.package.abspath(local_path)
-
-        return os.path.isfile(real_path)
-
-
-class StaticServer:
-    # Handles static resources.
+class StaticEntry:
+    # Metadata of a static file.
+
+    __slots__ = ('url', 'local_path', 'real_path', 'stat', 'checked',
+                 'access', 'content_type', 'content_encoding', 'etag',
+                 'is_immutable', 'variants')
+
+    def __init__(self, url, local_path, real_path, stat, checked, access,
+                 content_type, content_encoding, etag, is_immutable,
+                 variants):
+        # Normalized URL of the file.
+        self.url = url
+        # Path to the file relative to the package.
+        self.local_path = local_path
+        # Path to the file in the filesystem.
+        self.real_path = real_path
+        # `os.stat()` of the file.
+        self.stat = stat
+        # When the stat was taken.
+        self.checked = checked
+        # Access permissions or `None`.
+        self.access = access
+        self.content_type = content_type
+        self.content_encoding = content_encoding
+        # Content hash or `None` if not calculated yet.
+        self.etag = etag
+        # Set for files with a content hash in the name.
+        self.is_immutable = is_immutable
+        # Precompressed variants: a list of `(encoding, path, stat)`.
+        self.variants = variants
+
+
+class StaticIndex:
+    # Caches metadata of static files of a package.
 
     # Directory index.
     index_file = 'index.html'
@@ -310,71 +374,213 @@ class StaticServer:
     access_val = OMapVal(StrVal(), StrVal())
     # Directory published on HTTP.
     www_root = '/www'
-
-    def __init__(self, package, file_handler_map):
+    # How often to check if a file has changed, in seconds.
+    interval = 1.0
+    # Precompressed variants of a file: suffix and encoding.
+    variants = [('.br', 'br'), ('.gz', 'gzip')]
+    # Matches file names with a content hash, e.g. `main.3b7f9a1c.js`;
+    # the hash must mix digits and letters, so that dates and numbers
+    # such as `report-20230101.pdf` are not taken for hashes.
+    immutable_re = re.compile(
+            r'[.-](?=[0-9]*[a-fA-F])(?=[a-fA-F]*[0-9])[0-9a-fA-F]{8,}[.]')
+
+    def __init__(self, package, open=open):
         self.package = package
-        # Maps file extensions to handler types.
-        self.file_handler_map = file_handler_map
+        self.lock = threading.Lock()
+        # Maps URLs to entries.
+        self.entries = {}
+        # Compiled access patterns: a list of `(regex, access)`.
+        self.access_patterns = []
+        # Without `www.yaml`, files starting with `_` are not published.
+        self.has_www = package.exists('www.yaml')
+        if not self.has_www:
+            access_path = self.www_root + self.access_file
+            if package.exists(access_path):
+                access_map = self.access_val.parse(
+                        open(package.abspath(access_path)))
+                for pattern in access_map:
+                    self.access_patterns.append(
+                            (re.compile(fnmatch.translate(pattern)),
+                             access_map[pattern]))
 
-    def __call__(self, req):
-        # Normalize the URL.
-        url = req.path_info
+    def normalize(self, url):
+        # Normalizes the URL; returns `None` if the URL is not permitted.
         if url.endswith('/'):
             url += self.index_file
         url = os.path.normpath(url)
-
-        # Path containing `/.` should have been rejected by the guard.
-        assert not any(segment.startswith('.')
-                       for segment in url.split('/'))
-
-        # Convert the URL into the filesystem path.
+        # Immediately reject anything starting with `.` or `_`.
+        segments = url.split('/')
+        if any(segment.startswith('.') for segment in segments):
+            return None
+        if not self.has_www:
+            if any(segment.startswith('_') for segment in segments):
+                return None
+        return url
+
+    def __call__(self, url):
+        # Finds the entry for the given URL; returns `None` if the URL
+        # does not correspond to a published file.
+        url = self.normalize(url)
+        if url is None:
+            return None
+        now = time.monotonic()
+        entry = self.entries.get(url)
+        if entry is not None and now < entry.checked+self.interval:
+            return entry
         local_path = self.www_root + url
         real_path = self.package.abspath(local_path)
-        assert os.path.isfile(real_path)
-
-        # Detemine and check access permissions for the requested URL.
+        try:
+            stat = os.stat(real_path)
+        except OSError:
+            stat = None
+        if stat is None or not S_ISREG(stat.st_mode):
+            with self.lock:
+                self.entries.pop(url, None)
+            return None
+        if (entry is not None and
+                (entry.stat.st_mtime, entry.stat.st_size) ==
+                (stat.st_mtime, stat.st_size)):
+            entry.checked = now
+            return entry
+        entry = self.build(url, local_path, real_path, stat, now)
+        with self.lock:
+            self.entries[url] = entry
+        return entry
+
+    def build(self, url, local_path, real_path, stat, now):
+        # Generates a new entry.
         access = None
-        if not self.package.exists('www.yaml'):
-            access_path = self.www_root + self.access_file
-            if self.package.exists(access_path):
-                access_map = self.access_val.parse(
-                        self.package.open(access_path))
-                for pattern in access_map:
-                    if fnmatch.fnmatchcase(url, pattern):
-                        access = access_map[pattern]
-                        break
+        for regex, pattern_access in self.access_patterns:
+            if regex.match(url):
+                access = pattern_access
+                break
+        content_type, content_encoding = mimetypes.guess_type(real_path)
+        variants = []
+        if content_encoding is None:
+            for suffix, encoding in self.variants:
+                try:
+                    variant_stat = os.stat(real_path+suffix)
+                except OSError:
+                    continue
+                # Skip variants left over from an older version of the file.
+                if (S_ISREG(variant_stat.st_mode) and
+                        variant_stat.st_mtime >= stat.st_mtime):
+                    variants.append(
+                            (encoding, real_path+suffix, variant_stat))
+        is_immutable = bool(self.immutable_re.search(os.path.basename(url)))
+        return StaticEntry(
+                url, local_path, real_path, stat, now, access,
+                content_type, content_encoding, None, is_immutable, variants)
+
+    def etag(self, entry):
+        # Returns the content hash of the file.
+        if entry.etag is None:
+            digest = hashlib.sha1()
+            with open(entry.real_path, 'rb') as stream:
+                for block in iter(lambda: stream.read(BLOCK_SIZE), b''):
+                    digest.update(block)
+            entry.etag = digest.hexdigest()
+        return entry.etag
+
+
+class StaticGuard:
+    # Verifies if the path can be handled by `StaticServer`.
+
+    def __init__(self, index):
+        self.index = index
+
+    def __call__(self, path):
+        return (self.index(path) is not None)
+
+
+class StaticServer:
+    # Handles static resources.
+
+    # `Cache-Control` for files with a content hash in the name.
+    immutable_cache_control = 'max-age=31536000, immutable'
+
+    def __init__(self, index, file_handler_map):
+        self.index = index
+        self.package = index.package
+        # Maps file extensions to handler types.
+        self.file_handler_map = file_handler_map
+
+    def __call__(self, req):
+        # Find the file; it should have been checked by the guard.
+        entry = self.index(req.path_info)
+        if entry is None:
+            raise HTTPNotFound()
+
+        # Check access permissions for the requested URL.
+        access = entry.access
         if access is None:
             access = self.package
         if not authorize(req, access):
             raise HTTPUnauthorized()
         # Find and execute the handler by file extension.
-        ext = os.path.splitext(real_path)[1]
+        ext = os.path.splitext(entry.real_path)[1]
         if ext in self.file_handler_map:
-            package_path = "%s:%s" % (self.package.name, local_path)
+            package_path = "%s:%s" % (self.package.name, entry.local_path)
             handler = self.file_handler_map[ext](package_path)
             with confine(req, access):
                 return handler(req)
         else:
             if req.method not in ('GET', 'HEAD'):
                 raise HTTPMethodNotAllowed()
-            stream = open(real_path, 'rb')
+            # Pick a precompressed variant if the client accepts it.
+            stream = None
+            stat = entry.stat
+            content_encoding = entry.content_encoding
+            etag = self.index.etag(entry)
+            if entry.variants and 'Accept-Encoding' in req.headers:
+                paths = dict((encoding, variant_path)
+                             for encoding, variant_path, variant_stat
+                             in entry.variants)
+                accepted = req.accept_encoding.acceptable_offers(
+                        [encoding for encoding, variant_path, variant_stat
+                                  in entry.variants])
+                for encoding, quality in accepted:
+                    # The variant may have been removed or left stale
+                    # since the entry was built; then try the next one.
+                    try:
+                        variant_stream = open(paths[encoding], 'rb')
+                    except OSError:
+                        continue
+                    variant_stat = os.fstat(variant_stream.fileno())
+                    if variant_stat.st_mtime < entry.stat.st_mtime:
+                        variant_stream.close()
+                        continue
+                    stream = variant_stream
+                    stat = variant_stat
+                    content_encoding = encoding
+                    etag = "%s-%s" % (etag, encoding)
+                    break
+            if stream is None:
+                stream = open(entry.real_path, 'rb')
             if 'wsgi.file_wrapper' in req.environ:
                 app_iter = req.environ['wsgi.file_wrapper'] \
                         (stream, BLOCK_SIZE)
             else:
                 app_iter = FileIter(stream)
-            content_type, content_encoding = \
-                    mimetypes.guess_type(real_path)
-            stat = os.fstat(stream.fileno())
-            return Response(
+            # Shared caches may keep only the files open to anybody.
+            cache_control = 'public' if access == 'anybody' else 'private'
+            if entry.is_immutable:
+                cache_control = "%s, %s" % (cache_control,
+                                            self.immutable_cache_control)
+            resp = Response(
                     app_iter=app_iter,
-                    content_type=content_type or 'application/octet-stream',
+                    content_type=entry.content_type or
+                                 'application/octet-stream',
                     content_encoding=content_encoding,
                     last_modified=stat.st_mtime,
                     content_length=stat.st_size,
+                    etag=etag,
                     accept_ranges='bytes',
-                    cache_control='private',
+                    cache_control=cache_control,
                     conditional_response=True)
+            if entry.variants:
+                resp.vary = ('Accept-Encoding',)
+            return resp
 
 
 class CommandDispatcher:
@@ -420,10 +626,11 @@ class RouteFiles(Route):
 
     def __call__(self, package):
         path_map = PathMap()
-        if package.exists(StaticServer.www_root):
+        if package.exists(StaticIndex.www_root):
             file_handler_map = HandleFile.mapped()
-            server = StaticServer(package, file_handler_map)
-            guard = StaticGuard(package)
+            index = StaticIndex(package, self.open)
+            server = StaticServer(index, file_handler_map)
+            guard = StaticGuard(index)
             mask = PathMask('/**', guard)
             path_map.add(mask, server)
         return path_map
@@ -441,6 +648,176 @@ class RouteCommands(Route):
         return path_map
 
 
+class ReplayLogWriter:
+    # Records incoming requests to the replay log.
+    #
+    # Requests are passed to a background thread through a bounded queue,
+    # so that the request thread never waits for the disk; when the queue
+    # is full, the entry is dropped and counted.  The log is shared with
+    # other processes, so the writer thread locks the file for every batch.
+
+    queue_size = 1024
+    batch_size = 256
+
+    # Writers by the log path; shared by the application instances.
+    writers = {}
+    writers_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, path, sample=1, paths=None, max_size=None):
+        key = (os.path.abspath(path), sample,
+               tuple(paths) if paths is not None else None, max_size)
+        with cls.writers_lock:
+            if key not in cls.writers:
+                cls.writers[key] = cls(path, sample, paths, max_size)
+            return cls.writers[key]
+
+    def __init__(self, path, sample=1, paths=None, max_size=None):
+        self.path = path
+        self.sample = sample
+        self.paths_re = None
+        if paths is not None:
+            self.paths_re = re.compile(
+                    '|'.join(fnmatch.translate(pattern)
+                             for pattern in paths))
+        self.max_size = max_size
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.queue = None
+        self.thread = None
+        self.stream = None
+        self.pid = None
+        self.written = 0
+        self.dropped = 0
+        atexit.register(self.close)
+
+    def start(self):
+        # Starts the writer thread; also after `fork()`, which does not
+        # preserve threads.
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.queue = queue.Queue(self.queue_size)
+            if self.stream is not None:
+                self.stream.close()
+            self.stream = open(self.path, 'ab')
+            self.thread = threading.Thread(
+                    target=self.run, name="replay-log", daemon=True)
+            self.thread.start()
+
+    def __call__(self, environ):
+        # Adds the request to the log if it is selected by the filters.
+        if (self.paths_re is not None and
+                not self.paths_re.match(environ.get('PATH_INFO', ''))):
+            return
+        if self.sample > 1 and next(self.counter) % self.sample:
+            return
+        if self.pid != os.getpid():
+            self.start()
+        # Arrival time is used by `rex replay --realtime`.
+        entry = {'rex.time': time.time()}
+        for key, value in list(environ.items()):
+            if isinstance(value, (str, int, bool, tuple)):
+                entry[key] = value
+            elif key == 'wsgi.input':
+                try:
+                    content_length = int(environ.get('CONTENT_LENGTH', 0))
+                except ValueError:
+                    content_length = 0
+                if content_length > 0:
+                    data = value.read(content_length)
+                    entry[key] = data
+                    environ[key] = io.BytesIO(data)
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+
+    def run(self):
+        # Writes queued entries in batches; `None` stops the thread.
+        is_done = False
+        while not is_done:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = [entry for entry in batch if entry is not None]
+                is_done = True
+            if not batch:
+                continue
+            try:
+                self.write(b"".join(marshal.dumps(entry) for entry in batch))
+            except (OSError, ValueError):
+                with self.lock:
+                    self.dropped += len(batch)
+            else:
+                with self.lock:
+                    self.written += len(batch)
+
+    def write(self, data):
+        self.lock_stream()
+        try:
+            size = os.fstat(self.stream.fileno()).st_size
+            if (self.max_size is not None and size > 0 and
+                    size + len(data) > self.max_size):
+                # Rotate the log while holding the lock on the old file;
+                # other processes will notice and reopen it.
+                os.replace(self.path, self.path + '.1')
+                stream = open(self.path, 'ab')
+                fcntl.flock(stream, fcntl.LOCK_EX)
+                fcntl.flock(self.stream, fcntl.LOCK_UN)
+                self.stream.close()
+                self.stream = stream
+            self.stream.write(data)
+            self.stream.flush()
+        finally:
+            fcntl.flock(self.stream, fcntl.LOCK_UN)
+
+    def lock_stream(self):
+        # Locks the log, reopening it if it was rotated by another process.
+        while True:
+            fcntl.flock(self.stream, fcntl.LOCK_EX)
+            try:
+                is_current = os.path.samestat(
+                        os.stat(self.path), os.fstat(self.stream.fileno()))
+            except FileNotFoundError:
+                is_current = False
+            if is_current:
+                return
+            fcntl.flock(self.stream, fcntl.LOCK_UN)
+            self.stream.close()
+            self.stream = open(self.path, 'ab')
+
+    def close(self, timeout=5.0):
+        # Writes the pending entries and stops the writer thread.
+        if self.pid != os.getpid() or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+        stats = self.stats()
+        if stats['dropped']:
+            sys.stderr.write("replay log %s: dropped %s of %s requests\n"
+                             % (self.path, stats['dropped'],
+                                stats['written']+stats['dropped']))
+
+    def stats(self):
+        # Returns the number of written, dropped and pending entries.
+        with self.lock:
+            return {
+                'written': self.written,
+                'dropped': self.dropped,
+                'queued': self.queue.qsize() if self.queue is not None else 0,
+            }
+
+
 class StandardWSGI(WSGI):
 
     @classmethod
@@ -467,7 +844,11 @@ class StandardWSGI(WSGI):
         settings = get_settings()
         self.replay_log = None
         if settings.replay_log:
-            self.replay_log = open(settings.replay_log, 'ab')
+            self.replay_log = ReplayLogWriter.get(
+                    settings.replay_log,
+                    sample=settings.replay_log_sample,
+                    paths=settings.replay_log_paths,
+                    max_size=settings.replay_log_max_size)
 
     def __call__(self, environ, start_response):
         # Fix for uWSGI not stripping SCRIPT_NAME from PATH_INFO.
@@ -486,25 +867,7 @@ class StandardWSGI(WSGI):
             environ['PATH_INFO'] = ''
         # Update replay log.
         if self.replay_log is not None:
-            entry = {}
-            for key, value in list(environ.items()):
-                if isinstance(value, (str, int, bool, tuple)):
-                    entry[key] = value
-                elif key == 'wsgi.input':
-                    try:
-                        content_length = int(environ.get('CONTENT_LENGTH', 0))
-                    except ValueError:
-                        content_length = 0
-                    if content_length > 0:
-                        data = value.read(content_length)
-                        entry[key] = data
-                        environ[key] = io.StringIO(data)
-            try:
-                fcntl.flock(self.replay_log, fcntl.LOCK_EX)
-                marshal.dump(entry, self.replay_log)
-                self.replay_log.flush()
-            finally:
-                fcntl.flock(self.replay_log, fcntl.LOCK_UN)
+            self.replay_log(environ)
         # Sentry configuration.
         self.sentry.user_context({
             'id': environ.get('REMOTE_USER'),
@@ -0,0 +1,58 @@
+#
+# Copyright (c) 2015, Prometheus Research, LLC
+#
+
+
+from rex.core import get_rex
+from .command import Command
+from .secret import encrypt_and_sign, validate_and_decrypt
+from webob import Response
+from webob.exc import HTTPUnauthorized
+import time
+
+
+# Salt for the keys that sign the statistics tokens.
+STATS_SALT = 'cache-stats'
+
+# How long a statistics token is valid, in seconds.
+STATS_TOKEN_TTL = 60
+
+
+def make_stats_token():
+    """
+    Generates a token that grants access to the cache statistics.
+
+    The token could only be validated by an application with the same
+    ``secret`` setting.
+    """
+    return encrypt_and_sign(repr(time.time()), STATS_SALT)
+
+
+def check_stats_token(token):
+    # Verifies that the token is genuine and fresh.
+    text = validate_and_decrypt(token, STATS_SALT)
+    if text is None:
+        return False
+    try:
+        issued = float(text)
+    except ValueError:
+        return False
+    return (abs(time.time() - issued) <= STATS_TOKEN_TTL)
+
+
+class CacheStatsCmd(Command):
+    # Reports the cache statistics of the application process that serves
+    # the request; used by `rex cache-stats`.  The request must carry
+    # a token signed with the application secret in `X-Rex-Stats-Token`
+    # header.
+
+    path = '/cache-stats'
+    access = 'anybody'
+    parameters = []
+
+    def render(self, req):
+        if not check_stats_token(req.headers.get('X-Rex-Stats-Token')):
+            raise HTTPUnauthorized()
+        return Response(
+                json=get_rex().cache.statistics(),
+                cache_control='no-store')